@@ -0,0 +1,279 @@
+"""
+Scan inside archives (zip/jar/war/whl/apk, tar, tar.gz/bz2/xz, .gz) without
+extracting anything to disk.
+
+Archives are walked member by member in memory: zip through zipfile on a
+seekable handle (the file itself, or the blob's bytes), tar in tarfile's
+streaming "r|*" mode. Each member is read up to a size limit and scanned
+with rules.scan_bytes; members that are archives themselves are walked
+recursively up to MAX_DEPTH. Findings carry the nested path, e.g.
+"dist/app.war!/WEB-INF/lib/core.jar!/config/app.properties".
+
+Limits guard against zip bombs: per-member bytes, total uncompressed bytes
+per top-level archive, member count and nesting depth. Anything over a limit
+is skipped and counted, not scanned partially.
+
+Works for working-tree files (scan_tree_archives) and for every archive
+blob in a clone's history (scan_history_archives, with the introducing
+commit's metadata filled in).
+
+    python archive_scan.py path/to/checkout [--history] [--entropy]
+"""
+import argparse
+import copy
+import gzip
+import io
+import json
+import os
+import subprocess
+import tarfile
+import zipfile
+from collections import namedtuple
+
+from path_filter import PathFilter, ScanStats, binary_kind, enumerate_tree
+from rules import scan_bytes
+
+MAX_DEPTH = 3
+MAX_MEMBER_BYTES = 50 * 1024 * 1024
+MAX_TOTAL_BYTES = 512 * 1024 * 1024
+MAX_MEMBERS = 20000
+ARCHIVE_SUFFIXES = (".zip", ".jar", ".war", ".ear", ".whl", ".apk", ".aar", ".nupkg", ".egg",
+                    ".tar", ".tgz", ".tar.gz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz", ".gz")
+
+Limits = namedtuple("Limits", "max_depth max_member_bytes max_total_bytes max_members",
+                    defaults=(MAX_DEPTH, MAX_MEMBER_BYTES, MAX_TOTAL_BYTES, MAX_MEMBERS))
+
+
+def archive_kind(head: bytes):
+    """'zip', 'tar' or 'compressed' (gzip/bzip2/xz) from the first bytes (>= 262 for tar), else None."""
+    if head.startswith(b"PK\x03\x04") or head.startswith(b"PK\x05\x06"):
+        return "zip"
+    if head.startswith((b"\x1f\x8b", b"BZh", b"\xfd7zXZ\x00")):
+        return "compressed"
+    if len(head) >= 262 and head[257:262] == b"ustar":
+        return "tar"
+    return None
+
+
+def looks_like_archive(path):
+    return path.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+class _Budget:
+    """Uncompressed bytes and members left for one top-level archive."""
+
+    def __init__(self, limits, stats):
+        self.limits = limits
+        self.stats = stats
+        self.bytes_left = limits.max_total_bytes
+        self.members_left = limits.max_members
+
+    def take(self, size):
+        if self.members_left <= 0 or size > self.limits.max_member_bytes or size > self.bytes_left:
+            self.stats.skip("size", size)
+            return False
+        self.members_left -= 1
+        self.bytes_left -= size
+        return True
+
+
+def _read_capped(fileobj, cap):
+    """Read at most cap bytes; None if the stream is longer (declared sizes can lie)."""
+    data = fileobj.read(cap + 1)
+    return None if len(data) > cap else data
+
+
+def iter_members(fileobj, name, kind, limits=Limits(), stats=None, path_filter=None, depth=1, budget=None):
+    """
+    Yield (nested_path, bytes) for every scannable leaf member of an archive.
+    `fileobj` must be seekable for zip; tar/compressed input is read as a stream.
+    """
+    stats = stats if stats is not None else ScanStats()
+    budget = budget or _Budget(limits, stats)
+    for member_name, size, opener in _members(fileobj, kind, name):
+        nested = f"{name}!/{member_name}"
+        if path_filter is not None and path_filter.path_excluded(member_name):
+            stats.skip("path", size)
+            continue
+        if not budget.take(size):
+            continue
+        with opener() as member:
+            data = _read_capped(member, min(limits.max_member_bytes, budget.bytes_left + size))
+        if data is None:
+            stats.skip("size", size)
+            continue
+        # Charge what was actually inflated, not the (possibly forged) declared size
+        budget.bytes_left -= len(data) - size
+        inner = archive_kind(data[:512])
+        if inner and depth < limits.max_depth:
+            yield from iter_members(io.BytesIO(data), nested, inner, limits, stats, path_filter, depth + 1, budget)
+        elif inner or binary_kind(data[:8000]):
+            stats.skip("binary", len(data))
+        else:
+            stats.scan(len(data))
+            yield nested, data
+
+
+def _members(fileobj, kind, name):
+    """(member_name, declared_size, opener) per regular member."""
+    if kind == "zip":
+        with zipfile.ZipFile(fileobj) as zf:
+            for info in zf.infolist():
+                if not info.is_dir():
+                    yield info.filename, info.file_size, (lambda info=info: zf.open(info))
+    elif kind == "tar":
+        yield from _tar_members(fileobj)
+    else:
+        # A compressed tar, unless the first block is not a tar header: then a single .gz file
+        start = fileobj.tell()
+        try:
+            tarfile.open(fileobj=fileobj, mode="r|*").next()
+            is_tar = True
+        except tarfile.ReadError:
+            is_tar = False
+        fileobj.seek(start)
+        if is_tar:
+            yield from _tar_members(fileobj)
+        elif fileobj.read(2) == b"\x1f\x8b":
+            fileobj.seek(start)
+            inner = os.path.basename(name.rsplit("!/", 1)[-1])
+            yield (inner[:-3] if inner.endswith(".gz") else inner), 0, lambda: gzip.GzipFile(fileobj=fileobj)
+
+
+def _tar_members(fileobj):
+    with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+        for info in tf:
+            if info.isfile():
+                yield info.name, info.size, (lambda info=info: tf.extractfile(info))
+
+
+def scan_archive(fileobj, name, kind, limits=Limits(), stats=None, path_filter=None, entropy=False, **extra):
+    findings = []
+    try:
+        for nested, data in iter_members(fileobj, name, kind, limits, stats, path_filter):
+            findings.extend(scan_bytes(data, nested, entropy=entropy, **extra))
+    except (zipfile.BadZipFile, tarfile.TarError, OSError, EOFError, ValueError, RuntimeError):
+        # Corrupt, truncated or encrypted archive: keep what was found before the error
+        pass
+    return findings
+
+
+def scan_tree_archives(root, path_filter=None, limits=Limits(), stats=None, entropy=False):
+    """Findings inside every archive of a working tree (paths relative to root)."""
+    stats = stats if stats is not None else ScanStats()
+    path_filter = path_filter or PathFilter.for_repo(root)
+    # Same path rules, but archives are binary and may be large: no sniffing or size cutoff
+    walker = copy.copy(path_filter)
+    walker.max_bytes, walker.sniff_binary = 0, False
+    findings = []
+    for rel, _ in enumerate_tree(root, walker, ScanStats()):
+        if not looks_like_archive(rel):
+            continue
+        with open(os.path.join(root, rel), "rb") as f:
+            kind = archive_kind(f.read(512))
+            if kind is None:
+                continue
+            f.seek(0)
+            findings.extend(scan_archive(f, rel, kind, limits, stats, path_filter, entropy))
+    return findings
+
+
+def _introducing_commit(repo, blob_sha):
+    out = subprocess.run(
+        ["git", "log", "--all", "--reverse", "--format=%H%x00%an%x00%ae%x00%aI%x00%s", f"--find-object={blob_sha}"],
+        cwd=repo, capture_output=True, text=True,
+    ).stdout.split("\n", 1)[0]
+    if not out:
+        return {}
+    commit, author, email, date, message = (out.split("\x00") + [""] * 5)[:5]
+    return {"Commit": commit, "Author": author, "Email": email, "Date": date, "Message": message}
+
+
+def scan_history_archives(repo, path_filter=None, limits=Limits(), stats=None, entropy=False):
+    """Findings inside every distinct archive blob reachable from any ref of a clone."""
+    stats = stats if stats is not None else ScanStats()
+    path_filter = path_filter or PathFilter.for_repo(repo)
+    listing = subprocess.run(
+        "git rev-list --objects --all | git cat-file --batch-check='%(objecttype) %(objectname) %(objectsize) %(rest)'",
+        cwd=repo, shell=True, capture_output=True, text=True, check=True,
+    ).stdout
+    blobs = []
+    for line in listing.splitlines():
+        kind, sha, size, *rest = line.split(" ", 3)
+        path = rest[0] if rest else ""
+        if kind == "blob" and looks_like_archive(path) and not path_filter.path_excluded(path):
+            if int(size) > limits.max_total_bytes:
+                stats.skip("size", int(size))
+            else:
+                blobs.append((sha, path, int(size)))
+
+    findings = []
+    proc = subprocess.Popen(["git", "cat-file", "--batch"], cwd=repo, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    try:
+        for sha, path, size in blobs:
+            proc.stdin.write(sha.encode() + b"\n")
+            proc.stdin.flush()
+            proc.stdout.readline()
+            data = proc.stdout.read(size)
+            proc.stdout.read(1)
+            kind = archive_kind(data[:512])
+            if kind is None:
+                continue
+            found = scan_archive(io.BytesIO(data), path, kind, limits, stats, path_filter, entropy)
+            if found:
+                meta = _introducing_commit(repo, sha)
+                remote = _remote_url(repo)
+                for f in found:
+                    f.update(meta)
+                    if meta.get("Commit"):
+                        f["Fingerprint"] = f"{meta['Commit']}:{f['File']}:{f['RuleID']}:{f['StartLine']}"
+                        if remote:
+                            f["Link"] = f"{remote}/blob/{meta['Commit']}/{path}"
+                findings.extend(found)
+    finally:
+        proc.stdin.close()
+        proc.wait()
+    return findings
+
+
+def _remote_url(repo):
+    url = subprocess.run(["git", "config", "--get", "remote.origin.url"], cwd=repo,
+                         capture_output=True, text=True).stdout.strip()
+    if url.startswith("http"):
+        return url[:-4] if url.endswith(".git") else url
+    return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan inside archives without extracting them.")
+    parser.add_argument("source", help="Directory / checkout, or a single archive file")
+    parser.add_argument("--history", action="store_true", help="Scan archive blobs from the whole git history")
+    parser.add_argument("--entropy", action="store_true", help="Also report high-entropy tokens")
+    parser.add_argument("--max-depth", type=int, default=MAX_DEPTH)
+    parser.add_argument("--report-path", default=None, help="Write findings as JSON (default: print)")
+    args = parser.parse_args()
+
+    limits = Limits(max_depth=args.max_depth)
+    stats = ScanStats()
+    if os.path.isfile(args.source):
+        with open(args.source, "rb") as f:
+            kind = archive_kind(f.read(512))
+            f.seek(0)
+            findings = scan_archive(f, os.path.basename(args.source), kind, limits, stats,
+                                    entropy=args.entropy) if kind else []
+    elif args.history:
+        findings = scan_history_archives(args.source, limits=limits, stats=stats, entropy=args.entropy)
+    else:
+        findings = scan_tree_archives(args.source, limits=limits, stats=stats, entropy=args.entropy)
+
+    if args.report_path:
+        with open(args.report_path, "w", encoding="utf-8") as f:
+            json.dump(findings, f, indent=1)
+    else:
+        for f in findings:
+            print(f"{f['RuleID']:24s} {f['File']}:{f['StartLine']}")
+    print(f"[✓] {len(findings)} findings inside archives; members {stats.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""
+Compressed, append-only store for scan artifacts.
+
+Replaces the three loose files per scan (pretty JSON, CSV, raw engine text)
+with:
+    scan_artifacts/store/repo=<repo_key>/date=<YYYY-MM-DD>/<scan_id>.parquet      findings, zstd
+    scan_artifacts/store/repo=<repo_key>/date=<YYYY-MM-DD>/<scan_id>.engine.txt.gz raw engine output
+    scan_artifacts/store/index.db                                                  scan index (SQLite)
+
+Each scan appends one partition file; nothing is rewritten. The index
+answers "scans of repo X" / "files of scan Y" without listing directories,
+and retention evicts the oldest scans by age and/or total size. Scans
+imported from the legacy files are exempt from the age limit (they are
+older than it by definition) but still count towards the size limit.
+
+    python artifact_store.py list [--repo URL]
+    python artifact_store.py prune --max-age-days 30 --max-total-mb 500
+    python artifact_store.py import scan_artifacts [--repo URL]   # ingest legacy files
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from scan_cache import normalize_repo_url
+
+STORE_DIR = Path("scan_artifacts") / "store"
+DEFAULT_MAX_AGE_DAYS = 90
+DEFAULT_MAX_TOTAL_MB = 2048
+
+# Gitleaks finding fields kept as columns (Tags is stored JSON-encoded)
+FINDING_COLUMNS = [
+    "RuleID", "Description", "StartLine", "EndLine", "StartColumn", "EndColumn",
+    "Match", "Secret", "File", "SymlinkFile", "Commit", "Link", "Entropy",
+    "Author", "Email", "Date", "Message", "Tags", "Fingerprint",
+]
+INT_COLUMNS = {"StartLine", "EndLine", "StartColumn", "EndColumn"}
+# Repeated across a repo's history: dictionary-encoded in Parquet
+DICT_COLUMNS = ["RuleID", "Description", "File", "Commit", "Author", "Email", "Message", "Date"]
+# What the findings table in the UI shows
+UI_COLUMNS = ["RuleID", "File", "StartLine", "Match", "Secret", "Commit", "Link"]
+
+
+def repo_key(repo_url: str) -> str:
+    """
+    Filesystem-safe, stable partition key for a repo URL: a readable slug
+    plus a hash of the normalized URL, so repos whose slugs collide
+    (a_b/c vs a/b_c) still get distinct keys.
+    """
+    url = normalize_repo_url(repo_url)
+    slug = re.sub(r"[^a-z0-9._-]+", "_", url.lower()).strip("_")[:80]
+    return f"{slug}-{hashlib.sha256(url.encode()).hexdigest()[:10]}"
+
+
+def _findings_table(findings, scan_id, repo_url, scanned_at):
+    import pyarrow as pa
+
+    columns = {name: [] for name in FINDING_COLUMNS}
+    for f in findings:
+        for name in FINDING_COLUMNS:
+            v = f.get(name)
+            if name == "Tags":
+                v = json.dumps(v or [])
+            elif name in INT_COLUMNS:
+                v = int(v) if v not in (None, "") else None
+            elif name == "Entropy":
+                v = float(v) if v not in (None, "") else None
+            else:
+                v = "" if v is None else str(v)
+            columns[name].append(v)
+    n = len(findings)
+    arrays = {
+        "scan_id": pa.array([scan_id] * n, pa.string()).dictionary_encode(),
+        "repo": pa.array([repo_url] * n, pa.string()).dictionary_encode(),
+        "scanned_at": pa.array([scanned_at] * n, pa.timestamp("s")),
+    }
+    for name in FINDING_COLUMNS:
+        if name in INT_COLUMNS:
+            arrays[name] = pa.array(columns[name], pa.int32())
+        elif name == "Entropy":
+            arrays[name] = pa.array(columns[name], pa.float32())
+        else:
+            arr = pa.array(columns[name], pa.string())
+            arrays[name] = arr.dictionary_encode() if name in DICT_COLUMNS else arr
+    return pa.table(arrays)
+
+
+class ArtifactStore:
+    def __init__(self, root=STORE_DIR, max_age_days=DEFAULT_MAX_AGE_DAYS, max_total_mb=DEFAULT_MAX_TOTAL_MB):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_age_days = max_age_days
+        self.max_total_mb = max_total_mb
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS scans (
+                    scan_id TEXT PRIMARY KEY,
+                    repo TEXT NOT NULL,
+                    repo_key TEXT NOT NULL,
+                    scanned_at TEXT NOT NULL,
+                    findings_path TEXT,
+                    engine_path TEXT,
+                    n_findings INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    timings TEXT,
+                    imported INTEGER NOT NULL DEFAULT 0
+                )""")
+            # Indexes created before per-stage timings / legacy imports were recorded lack the columns
+            existing = {row[1] for row in db.execute("PRAGMA table_info(scans)")}
+            if "timings" not in existing:
+                db.execute("ALTER TABLE scans ADD COLUMN timings TEXT")
+            if "imported" not in existing:
+                db.execute("ALTER TABLE scans ADD COLUMN imported INTEGER NOT NULL DEFAULT 0")
+            # Keys of indexes written before repo_key carried a URL hash are recomputed from the stored URL
+            if db.execute("PRAGMA user_version").fetchone()[0] < 1:
+                for scan_id, repo in db.execute("SELECT scan_id, repo FROM scans").fetchall():
+                    db.execute("UPDATE scans SET repo_key = ? WHERE scan_id = ?", (repo_key(repo), scan_id))
+                db.execute("PRAGMA user_version = 1")
+            db.execute("CREATE INDEX IF NOT EXISTS scans_repo ON scans (repo_key, scanned_at)")
+            db.execute("CREATE INDEX IF NOT EXISTS scans_time ON scans (scanned_at)")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.root / "index.db", timeout=30)
+        try:
+            with db:  # commit on success, roll back on error
+                yield db
+        finally:
+            db.close()
+
+    # ---- write ----
+    def save_scan(self, repo_url, engine_output, findings, scanned_at=None, scan_id=None, timer=None,
+                  imported=False):
+        """
+        Append one scan; returns its scan_id. Applies retention afterwards.
+        With a metrics.ScanTimer, the write is timed as "artifact_write" and
+        the timer's per-stage breakdown is stored with the scan. `imported`
+        scans (import_legacy) are exempt from the age limit.
+        """
+        import pyarrow.parquet as pq
+
+        scanned_at = (scanned_at or datetime.now()).replace(microsecond=0)
+        scan_id = scan_id or f"{scanned_at.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        key = repo_key(repo_url)
+        part = self.root / f"repo={key}" / f"date={scanned_at.strftime('%Y-%m-%d')}"
+        part.mkdir(parents=True, exist_ok=True)
+
+        findings_path = engine_path = None
+        with timer.stage("artifact_write") if timer else nullcontext({}) as rec:
+            if findings:
+                findings_path = part / f"{scan_id}.parquet"
+                tmp = findings_path.with_suffix(".tmp")
+                pq.write_table(_findings_table(findings, scan_id, repo_url, scanned_at), tmp,
+                               compression="zstd", use_dictionary=True)
+                os.replace(tmp, findings_path)
+            if engine_output:
+                engine_path = part / f"{scan_id}.engine.txt.gz"
+                with gzip.open(engine_path, "wt", encoding="utf-8") as f:
+                    f.write(engine_output)
+            size = sum(p.stat().st_size for p in (findings_path, engine_path) if p)
+            rec["bytes"], rec["findings"] = size, len(findings)
+
+        with self._lock, self._connect() as db:
+            db.execute(
+                "INSERT INTO scans (scan_id, repo, repo_key, scanned_at, findings_path, engine_path, "
+                "n_findings, bytes, timings, imported) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (scan_id, repo_url, key, scanned_at.isoformat(),
+                 str(findings_path.relative_to(self.root)) if findings_path else None,
+                 str(engine_path.relative_to(self.root)) if engine_path else None,
+                 len(findings), size, json.dumps(timer.timings) if timer else None, int(imported)),
+            )
+        self.prune()
+        return scan_id
+
+    # ---- read ----
+    def list_scans(self, repo_url=None, limit=None):
+        query = "SELECT scan_id, repo, scanned_at, n_findings, bytes FROM scans"
+        params = []
+        if repo_url:
+            query += " WHERE repo_key = ?"
+            params.append(repo_key(repo_url))
+        query += " ORDER BY scanned_at DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        with self._connect() as db:
+            rows = db.execute(query, params).fetchall()
+        return [dict(zip(("scan_id", "repo", "scanned_at", "n_findings", "bytes"), r)) for r in rows]
+
+    def get_scan(self, scan_id):
+        """Index record of one scan, with its per-stage timings (dict, empty if not recorded)."""
+        with self._connect() as db:
+            row = db.execute("SELECT scan_id, repo, scanned_at, n_findings, bytes, timings FROM scans WHERE scan_id = ?",
+                             (scan_id,)).fetchone()
+        if not row:
+            return None
+        scan = dict(zip(("scan_id", "repo", "scanned_at", "n_findings", "bytes"), row))
+        scan["timings"] = json.loads(row[5]) if row[5] else {}
+        return scan
+
+    def update_timings(self, scan_id, timings):
+        """Merge stages measured after the scan was saved (e.g. ML classification)."""
+        with self._lock, self._connect() as db:
+            row = db.execute("SELECT timings FROM scans WHERE scan_id = ?", (scan_id,)).fetchone()
+            if row is None:
+                return
+            merged = json.loads(row[0]) if row[0] else {}
+            merged.update(timings)
+            db.execute("UPDATE scans SET timings = ? WHERE scan_id = ?", (json.dumps(merged), scan_id))
+
+    def _paths(self, repo_url=None, scan_id=None):
+        query, params = "SELECT findings_path FROM scans WHERE findings_path IS NOT NULL", []
+        if scan_id:
+            query += " AND scan_id = ?"
+            params.append(scan_id)
+        if repo_url:
+            query += " AND repo_key = ?"
+            params.append(repo_key(repo_url))
+        with self._connect() as db:
+            return [str(self.root / p) for (p,) in db.execute(query + " ORDER BY scanned_at", params)]
+
+    def read_findings(self, repo_url=None, scan_id=None, columns=None):
+        """
+        Findings as a DataFrame, reading only `columns` from disk (default:
+        UI_COLUMNS). Pass columns=FINDING_COLUMNS for the full record.
+        """
+        import pandas as pd
+        import pyarrow.parquet as pq
+
+        columns = list(columns or UI_COLUMNS)
+        paths = self._paths(repo_url, scan_id)
+        if not paths:
+            return pd.DataFrame(columns=columns)
+        df = pq.ParquetDataset(paths, partitioning=None).read(columns=columns).to_pandas()
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(str)
+        if "Tags" in df.columns:
+            df["Tags"] = df["Tags"].map(json.loads)
+        return df
+
+    def iter_findings(self, scan_id, columns=None, batch_size=10_000):
+        """Stream one scan's findings as dicts, one row group batch at a time."""
+        import pyarrow.parquet as pq
+
+        for path in self._paths(scan_id=scan_id):
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+                for row in batch.to_pylist():
+                    if "Tags" in row:
+                        row["Tags"] = json.loads(row["Tags"])
+                    yield row
+
+    def read_engine_output(self, scan_id):
+        with self._connect() as db:
+            row = db.execute("SELECT engine_path FROM scans WHERE scan_id = ?", (scan_id,)).fetchone()
+        if not row or not row[0]:
+            return ""
+        with gzip.open(self.root / row[0], "rt", encoding="utf-8") as f:
+            return f.read()
+
+    # ---- retention ----
+    def _delete(self, db, scan_id, findings_path, engine_path):
+        for rel in (findings_path, engine_path):
+            if rel:
+                path = self.root / rel
+                path.unlink(missing_ok=True)
+                for parent in (path.parent, path.parent.parent):
+                    try:
+                        parent.rmdir()  # only succeeds once the partition is empty
+                    except OSError:
+                        break
+        db.execute("DELETE FROM scans WHERE scan_id = ?", (scan_id,))
+
+    def prune(self, max_age_days=None, max_total_mb=None):
+        """Evict scans older than max_age_days, then oldest-first down to max_total_mb."""
+        max_age_days = self.max_age_days if max_age_days is None else max_age_days
+        max_total_mb = self.max_total_mb if max_total_mb is None else max_total_mb
+        removed = 0
+        with self._lock, self._connect() as db:
+            if max_age_days:
+                cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+                for row in db.execute("SELECT scan_id, findings_path, engine_path FROM scans "
+                                      "WHERE scanned_at < ? AND NOT imported", (cutoff,)).fetchall():
+                    self._delete(db, *row)
+                    removed += 1
+            if max_total_mb:
+                total = db.execute("SELECT COALESCE(SUM(bytes), 0) FROM scans").fetchone()[0]
+                limit = max_total_mb * 1024 * 1024
+                if total > limit:
+                    for scan_id, fp, ep, size in db.execute(
+                            "SELECT scan_id, findings_path, engine_path, bytes FROM scans "
+                            "ORDER BY scanned_at").fetchall():
+                        if total <= limit:
+                            break
+                        self._delete(db, scan_id, fp, ep)
+                        total -= size
+                        removed += 1
+        return removed
+
+    def total_bytes(self):
+        with self._connect() as db:
+            return db.execute("SELECT COALESCE(SUM(bytes), 0) FROM scans").fetchone()[0]
+
+
+def legacy_safe_name(repo_url):
+    """How the old per-scan files spelled a repo URL in their names."""
+    return repo_url.replace("://", "_").replace("/", "_")
+
+
+def legacy_repo_url(safe_name, known_urls=()):
+    """
+    Repo URL from a legacy file name's legacy_safe_name(). The mangling is
+    lossy, so a known URL that mangles to `safe_name` wins. Otherwise GitHub
+    names are split exactly (owners cannot contain "_"), and on other hosts
+    every "_" is taken for a "/", which is a guess.
+    """
+    for url in known_urls:
+        if legacy_safe_name(url) == safe_name:
+            return url
+    m = re.match(r"^(https?|ssh|git)_(.+)$", safe_name)
+    if not m:
+        return safe_name
+    scheme, rest = m.groups()
+    github = re.match(r"^(github\.com)_([A-Za-z0-9-]+)_(.+)$", rest)
+    if github:
+        return f"{scheme}://{'/'.join(github.groups())}"
+    return f"{scheme}://{rest.replace('_', '/')}"
+
+
+def import_legacy(store, directory, repo_urls=()):
+    """
+    Ingest gitleaks_<repo>_<ts>.json (+ matching trufflehog_<repo>_<ts>.txt)
+    files. `repo_urls` (and repos already in the store) resolve names the
+    legacy mangling made ambiguous.
+    """
+    known = list(repo_urls) + sorted({s["repo"] for s in store.list_scans()})
+    imported = 0
+    for path in sorted(Path(directory).glob("gitleaks_*.json")):
+        m = re.match(r"gitleaks_(?!compact_)(.+)_(\d{8}-\d{6})\.json$", path.name)
+        if not m:
+            continue
+        safe_name, ts = m.groups()
+        findings = json.loads(path.read_text(encoding="utf-8") or "[]")
+        engine = path.with_name(f"trufflehog_{safe_name}_{ts}.txt")
+        store.save_scan(
+            legacy_repo_url(safe_name, known), engine.read_text(encoding="utf-8") if engine.exists() else "",
+            findings if isinstance(findings, list) else [findings],
+            scanned_at=datetime.strptime(ts, "%Y%m%d-%H%M%S"), imported=True,
+        )
+        imported += 1
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and maintain the LeakHawk artifact store.")
+    parser.add_argument("--root", default=str(STORE_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_list = sub.add_parser("list")
+    p_list.add_argument("--repo", default=None)
+    p_prune = sub.add_parser("prune")
+    p_prune.add_argument("--max-age-days", type=float, default=None,
+                         help=f"Default {DEFAULT_MAX_AGE_DAYS}; 0 disables the age limit")
+    p_prune.add_argument("--max-total-mb", type=float, default=None,
+                         help=f"Default {DEFAULT_MAX_TOTAL_MB}; 0 disables the size limit")
+    p_import = sub.add_parser("import", help="Ingest legacy per-scan files")
+    p_import.add_argument("directory")
+    p_import.add_argument("--repo", action="append", default=[],
+                          help="Repo URL of some legacy files, when their names are ambiguous (repeatable)")
+    args = parser.parse_args()
+
+    store = ArtifactStore(args.root, max_age_days=None, max_total_mb=None)
+    if args.command == "list":
+        for s in store.list_scans(args.repo):
+            print(f"{s['scanned_at']}  {s['scan_id']}  {s['n_findings']:>6} findings  {s['bytes']:>10,} B  {s['repo']}")
+        print(f"Total: {store.total_bytes():,} bytes")
+    elif args.command == "prune":
+        removed = store.prune(DEFAULT_MAX_AGE_DAYS if args.max_age_days is None else args.max_age_days,
+                              DEFAULT_MAX_TOTAL_MB if args.max_total_mb is None else args.max_total_mb)
+        print(f"[🧹] Removed {removed} scan(s); {store.total_bytes():,} bytes remain")
+    else:
+        print(f"[✓] Imported {import_legacy(store, args.directory, args.repo)} scan(s)")
+
+
+if __name__ == "__main__":
+    main()
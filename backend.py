@@ -1,11 +1,47 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+import argparse
 import json
 import os
-import subprocess
+import threading
+from pathlib import Path
+
+from registry import ModelRegistry
+from scan_cache import is_remote_url
 
 app = Flask(__name__)
 
 RESULTS_FILE = "latest_scan.json"  # Your scan script should update this
+DATA_DIR = Path("scan_artifacts")
+SCAN_WORKERS = int(os.environ.get("LEAKHAWK_SCAN_WORKERS", 2))
+# Queued jobs beyond this are refused with 429 instead of piling up
+MAX_QUEUED = int(os.environ.get("LEAKHAWK_MAX_QUEUED", 1000))
+
+# Active model, hot-swapped in the background when models/manifest.json changes
+model_registry = ModelRegistry().start()
+
+# Job queue, runner pool and artifact store; created on first use or by main()
+_jobs = None
+_jobs_lock = threading.Lock()
+
+
+def start_jobs(data_dir=DATA_DIR, scanner=None, workers=SCAN_WORKERS, baseline_path=None):
+    global _jobs
+    from artifact_store import ArtifactStore
+    from baseline import DEFAULT_BASELINE, Baseline
+    from jobstore import JobRunner, JobStore, scan_subprocess
+
+    artifacts = ArtifactStore(Path(data_dir) / "store")
+    store = JobStore(Path(data_dir) / "jobs.db")
+    baseline = Baseline.load(baseline_path or DEFAULT_BASELINE)
+    runner = JobRunner(store, scanner or scan_subprocess, artifacts, workers, baseline=baseline).start()
+    _jobs = (store, runner, artifacts)
+    return _jobs
+
+
+def get_jobs():
+    with _jobs_lock:
+        return _jobs or start_jobs()
+
 
 @app.route("/scan", methods=["POST"])
 def scan_repo():
@@ -14,18 +50,39 @@ def scan_repo():
 
     if not repo_url:
         return jsonify({"status": "error", "message": "Missing repo_url"}), 400
+    # Local paths and file:// URLs would scan this server's own filesystem
+    if not is_remote_url(repo_url):
+        return jsonify({"status": "error", "message": "repo_url must be a remote http(s), ssh or git URL"}), 400
 
+    store, runner, _ = get_jobs()
+    if MAX_QUEUED and store.depth()["queued"] >= MAX_QUEUED:
+        return jsonify({"status": "error", "message": "Scan queue is full, retry later"}), 429
     try:
-        # Run scan.py in background
-        subprocess.Popen(
-            ["python3", "scan.py", repo_url],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
+        # Archive members are opt-in, as in the UI: walking every archive blob of the history is slow
+        job = store.submit(repo_url, options={"archives": True} if data.get("archives") else None)
+        runner.notify()
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
-    return jsonify({"status": "started", "message": f"Scan started for {repo_url}"}), 200
+    return jsonify({"status": "queued", "job_id": job["job_id"], "message": f"Scan queued for {repo_url}"}), 200
+
+
+@app.route("/jobs", methods=["GET"])
+def list_jobs():
+    store, _, _ = get_jobs()
+    status = request.args.get("status")
+    limit = request.args.get("limit", 50, type=int)
+    jobs = store.list_jobs(status, limit) if limit else []
+    return jsonify({"depth": store.depth(), "jobs": jobs})
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    store, _, _ = get_jobs()
+    job = store.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+    return jsonify(job)
 
 
 @app.route("/results", methods=["GET"])
@@ -38,5 +95,97 @@ def get_results():
     return jsonify(results)
 
 
+@app.route("/scans/<scan_id>", methods=["GET"])
+def get_scan(scan_id):
+    _, _, store = get_jobs()
+    scan = store.get_scan(scan_id)
+    if scan is None:
+        return jsonify({"status": "error", "message": "Unknown scan"}), 404
+    return jsonify(scan)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    from metrics import render
+
+    store, _, _ = get_jobs()
+    depth = store.depth()
+    lines = ["# HELP leakhawk_jobs Scan jobs per status.", "# TYPE leakhawk_jobs gauge"]
+    lines += [f'leakhawk_jobs{{status="{status}"}} {n}' for status, n in depth.items()]
+    return Response(render(lines), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/scans/<scan_id>/report", methods=["GET"])
+def scan_report(scan_id):
+    from report_writers import FORMATS, stream_report
+
+    fmt = request.args.get("format", "jsonl")
+    if fmt not in FORMATS:
+        return jsonify({"status": "error", "message": f"Unknown format {fmt}"}), 400
+    _, _, store = get_jobs()
+    if not store.get_scan(scan_id):
+        return jsonify({"status": "error", "message": "Unknown scan"}), 404
+    # Findings are read one row group at a time and streamed out in 64 KB chunks
+    _, mime, ext = FORMATS[fmt]
+    return Response(
+        stream_report(store.iter_findings(scan_id), fmt),
+        mimetype=mime,
+        headers={"Content-Disposition": f"attachment; filename=leakhawk_{scan_id}{ext}"},
+    )
+
+
+@app.route("/model", methods=["GET"])
+def get_model():
+    return jsonify(model_registry.status())
+
+
+@app.route("/classify", methods=["POST"])
+def classify():
+    from classifier import findings_to_frame, predict_findings
+    from metrics import ScanTimer
+
+    findings = request.json
+    if isinstance(findings, dict):
+        findings = [findings]
+    if not isinstance(findings, list):
+        return jsonify({"status": "error", "message": "Expected a list of Gitleaks findings"}), 400
+
+    # One snapshot per request: a concurrent swap never mixes versions
+    active = model_registry.get()
+    if active is None:
+        return jsonify({"status": "error", "message": "No model available"}), 503
+    timer = ScanTimer()
+    try:
+        with timer.stage("ml_featurize") as rec:
+            frame = findings_to_frame(findings)
+            rec["findings"] = len(findings)
+        with timer.stage("ml_predict") as rec:
+            predictions = predict_findings(active.model, active.label_encoder, findings, frame=frame)
+            rec["findings"] = len(predictions)
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify({"model_version": active.version, "predictions": predictions})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LeakHawk API server.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=SCAN_WORKERS, help="Concurrent scan jobs")
+    parser.add_argument("--data-dir", default=str(DATA_DIR), help="Job queue and artifact store location")
+    parser.add_argument("--baseline", default=None, help="Baseline of accepted fingerprints (see baseline.py)")
+    parser.add_argument("--fake-scanner-ms", type=float, default=None,
+                        help="Replace real scans with a fake one taking this long (load tests)")
+    args = parser.parse_args()
+
+    scanner = None
+    if args.fake_scanner_ms is not None:
+        from jobstore import fake_scanner
+        scanner = fake_scanner(args.fake_scanner_ms)
+    with _jobs_lock:
+        start_jobs(args.data_dir, scanner, args.workers, args.baseline)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000)
+    main()
@@ -0,0 +1,139 @@
+"""
+Baseline of accepted findings, suppressed right after detection.
+
+A baseline is a text file of Gitleaks fingerprints
+("<commit>:<file>:<rule>:<line>", or "<file>:<rule>:<line>" for non-git
+scans), one per line, '#' comments allowed. It is loaded into a frozenset
+and applied to an engine's findings before anything else sees them.
+Baselined findings never reach ML classification, the artifact store or
+the UI. Only the count of suppressed findings is kept.
+
+Two files are read when present: the local DEFAULT_BASELINE (per machine)
+and a .leakhawkbaseline committed in the scanned repo (per repo), like
+.leakhawkignore.
+
+    python baseline.py generate gitleaks-report.json          # accept every current finding
+    python baseline.py generate --scan 20250814-173155-ab12cd34
+    python baseline.py update new-report.json [--prune]       # add new ones, optionally drop stale
+    python baseline.py new gitleaks-report.json                # findings not in the baseline
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+DEFAULT_BASELINE = "leakhawk-baseline.txt"
+REPO_BASELINE_FILE = ".leakhawkbaseline"
+
+
+def fingerprint(finding):
+    """A finding's Gitleaks fingerprint, rebuilt from its fields when missing."""
+    fp = finding.get("Fingerprint")
+    if fp:
+        return fp
+    prefix = f"{finding.get('Commit')}:" if finding.get("Commit") else ""
+    return f"{prefix}{finding.get('File')}:{finding.get('RuleID')}:{finding.get('StartLine')}"
+
+
+def parse_fingerprints(lines):
+    return {line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")}
+
+
+def read_fingerprints(path):
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return parse_fingerprints(f)
+
+
+def write_fingerprints(path, fingerprints, source=""):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("# LeakHawk baseline: accepted findings, one Gitleaks fingerprint per line.\n")
+        f.write(f"# Updated {datetime.now().isoformat(timespec='seconds')}{' from ' + source if source else ''}\n")
+        for fp in sorted(fingerprints):
+            f.write(fp + "\n")
+    os.replace(tmp, path)
+
+
+class Baseline:
+    """Frozen set of accepted fingerprints."""
+
+    def __init__(self, fingerprints=()):
+        self.fingerprints = frozenset(fingerprints)
+
+    @classmethod
+    def load(cls, *paths):
+        fps = set()
+        for path in paths:
+            fps |= read_fingerprints(path)
+        return cls(fps)
+
+    @classmethod
+    def for_repo(cls, root=None, path=DEFAULT_BASELINE):
+        """The local baseline plus the scanned repo's own .leakhawkbaseline, if any."""
+        return cls.load(path, os.path.join(root, REPO_BASELINE_FILE) if root else None)
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def __contains__(self, finding):
+        return fingerprint(finding) in self.fingerprints
+
+    def split(self, findings):
+        """(new findings as a list, number suppressed). Order is preserved."""
+        if not self.fingerprints:
+            return list(findings), 0
+        fps = self.fingerprints
+        new = [f for f in findings if fingerprint(f) not in fps]
+        return new, len(findings) - len(new)
+
+
+def _load_report(args):
+    if getattr(args, "scan", None):
+        from artifact_store import ArtifactStore
+        store = ArtifactStore()
+        if store.get_scan(args.scan) is None:
+            raise SystemExit(f"[✗] Unknown scan {args.scan}")
+        return list(store.iter_findings(args.scan, columns=["Commit", "File", "RuleID", "StartLine", "Fingerprint"])), args.scan
+    from finding_record import load_findings
+    return load_findings(args.report), args.report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the LeakHawk baseline of accepted findings.")
+    parser.add_argument("-b", "--baseline", default=DEFAULT_BASELINE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("generate", "Write a baseline accepting every finding of a scan"),
+                            ("update", "Add a scan's findings to the baseline"),
+                            ("new", "Print the findings of a scan that are not baselined")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("report", nargs="?", default="gitleaks-report.json", help="Gitleaks JSON report")
+        p.add_argument("--scan", default=None, help="Stored scan id (artifact store) instead of a report")
+        if name == "update":
+            p.add_argument("--prune", action="store_true", help="Drop fingerprints this scan no longer reports")
+        if name == "new":
+            p.add_argument("--format", choices=("json", "jsonl", "sarif", "csv"), default="json")
+    args = parser.parse_args()
+
+    findings, source = _load_report(args)
+    current = {fingerprint(f) for f in findings}
+    if args.command == "generate":
+        write_fingerprints(args.baseline, current, source)
+        print(f"[✓] Baseline {args.baseline}: {len(current)} fingerprints")
+    elif args.command == "update":
+        before = read_fingerprints(args.baseline)
+        after = (before & current if args.prune else before) | current
+        write_fingerprints(args.baseline, after, source)
+        print(f"[✓] Baseline {args.baseline}: {len(after)} fingerprints "
+              f"(+{len(after - before)}, -{len(before - after)})")
+    else:
+        from report_writers import write_report
+        new, suppressed = Baseline.load(args.baseline).split(findings)
+        write_report(new, sys.stdout, args.format)
+        print(f"\n[✓] {len(new)} new since baseline, {suppressed} suppressed", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Offline batch classification of saved Gitleaks JSON reports.
+
+Walks scan_artifacts/*.json (or any globs), packs the findings into
+fixed-size shards across worker processes that each load the model once, and writes the predictions
+next to every input as <name>.predictions.jsonl (or .csv). Inputs whose
+output is already newer are skipped, so re-running over an archive only
+classifies new scans. Files that are not Gitleaks reports, and files with
+findings in a shard that failed, are reported and counted as failed; the
+rest of the batch carries on.
+
+    python batch_classify.py                      # scan_artifacts/*.json
+    python batch_classify.py "archive/**/*.json" --format csv --workers 8
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from finding_record import load_findings
+
+# Finding fields copied into each prediction row
+FINDING_FIELDS = ["RuleID", "File", "StartLine", "EndLine", "Commit", "Author", "Date", "Fingerprint", "Link"]
+PREDICTION_FIELDS = ["Predicted_Type", "Confidence", "Risk_Score(1-10)", "Anomaly_Flag"]
+# Fields every Gitleaks finding has; anything without them is not a report
+REQUIRED_FIELDS = ("RuleID", "File")
+
+_model = None
+_label_encoder = None
+
+
+def _init_worker(model_path, encoder_path):
+    global _model, _label_encoder
+    from classifier import load_model
+    _model, _label_encoder = load_model(model_path, encoder_path)
+
+
+def _classify_shard(findings):
+    from classifier import predict_findings
+    return predict_findings(_model, _label_encoder, findings)
+
+
+def check_findings(findings):
+    """Raise ValueError unless every finding looks like a Gitleaks finding."""
+    for i, finding in enumerate(findings):
+        missing = [k for k in REQUIRED_FIELDS if k not in finding]
+        if missing:
+            raise ValueError(f"not a Gitleaks report (finding {i} has no {', '.join(missing)})")
+
+
+def output_path(input_path, fmt):
+    root, _ = os.path.splitext(input_path)
+    return f"{root}.predictions.{fmt}"
+
+
+def is_up_to_date(input_path, fmt):
+    out = output_path(input_path, fmt)
+    return os.path.exists(out) and os.path.getmtime(out) >= os.path.getmtime(input_path)
+
+
+def write_predictions(path, fmt, findings, predictions):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=FINDING_FIELDS + PREDICTION_FIELDS)
+            writer.writeheader()
+        for finding, pred in zip(findings, predictions):
+            row = {k: finding.get(k, "") for k in FINDING_FIELDS}
+            row.update(pred)
+            if fmt == "csv":
+                writer.writerow(row)
+            else:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+
+
+def expand_inputs(patterns, fmt, force=False):
+    """Matching JSON reports, with stale-check applied; returns (todo, skipped)."""
+    paths = sorted({p for pat in patterns for p in glob.glob(pat, recursive=True) if os.path.isfile(p)})
+    todo, skipped = [], 0
+    for p in paths:
+        if not force and is_up_to_date(p, fmt):
+            skipped += 1
+        else:
+            todo.append(p)
+    return todo, skipped
+
+
+def run(patterns, fmt="jsonl", workers=None, shard_size=2000, force=False,
+        model_path="leakhawk_model.pkl", encoder_path="label_encoder.pkl"):
+    todo, skipped = expand_inputs(patterns, fmt, force)
+    stats = {"files": len(todo), "skipped": skipped, "failed": 0, "findings": 0}
+    if not todo:
+        return stats
+    workers = workers or os.cpu_count() or 1
+
+    # Findings of many small files are packed into shared shards so each
+    # worker call amortises its fixed preprocessing cost; a file is written
+    # as soon as all of its findings are back.
+    open_files = {}
+    max_in_flight = workers * 4
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, encoder_path)) as pool:
+        # future -> (shard number, [(path, start, end), ...])
+        pending = {}
+        segments, batch = [], []
+        shard_no = 0
+
+        def drain(block):
+            if block:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            else:
+                done = [f for f in pending if f.done()]
+            for fut in done:
+                shard, shard_segments = pending.pop(fut)
+                try:
+                    results = fut.result()
+                except Exception as e:
+                    paths = sorted({path for path, _, _ in shard_segments if path in open_files})
+                    print(f"[✗] Shard {shard} ({sum(end - start for _, start, end in shard_segments):,} findings) "
+                          f"failed: {e!r}; not written: {', '.join(paths) or 'none'}", file=sys.stderr)
+                    for path in paths:
+                        del open_files[path]
+                        stats["failed"] += 1
+                    continue
+                offset = 0
+                for path, start, end in shard_segments:
+                    entry = open_files.get(path)
+                    # None: another shard holding findings of this file failed
+                    if entry is not None:
+                        entry["predictions"][start:end] = results[offset:offset + end - start]
+                        entry["left"] -= end - start
+                        if entry["left"] == 0:
+                            write_predictions(output_path(path, fmt), fmt, entry["findings"], entry["predictions"])
+                            stats["findings"] += len(entry["findings"])
+                            del open_files[path]
+                    offset += end - start
+
+        def flush():
+            nonlocal shard_no
+            while len(pending) >= max_in_flight:
+                drain(block=True)
+            pending[pool.submit(_classify_shard, list(batch))] = (shard_no, list(segments))
+            shard_no += 1
+            segments.clear()
+            batch.clear()
+
+        for path in todo:
+            try:
+                findings = load_findings(path)
+                check_findings(findings)
+            except (OSError, ValueError) as e:
+                print(f"[✗] {path}: {e}", file=sys.stderr)
+                stats["failed"] += 1
+                continue
+            if not findings:
+                write_predictions(output_path(path, fmt), fmt, [], [])
+                continue
+            open_files[path] = {"findings": findings, "predictions": [None] * len(findings),
+                                "left": len(findings)}
+            start = 0
+            while start < len(findings):
+                end = min(len(findings), start + shard_size - len(batch))
+                segments.append((path, start, end))
+                batch.extend(findings[start:end])
+                start = end
+                if len(batch) >= shard_size:
+                    flush()
+            drain(block=False)
+        if batch:
+            flush()
+        while pending:
+            drain(block=True)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify saved Gitleaks JSON reports in bulk.")
+    parser.add_argument("patterns", nargs="*", default=["scan_artifacts/*.json"],
+                        help="Glob(s) of Gitleaks JSON reports ('**' is recursive)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--shard-size", type=int, default=2000, help="Findings per worker task")
+    parser.add_argument("--force", action="store_true", help="Reclassify even if outputs are newer than inputs")
+    parser.add_argument("--model", default="leakhawk_model.pkl")
+    parser.add_argument("--encoder", default="label_encoder.pkl")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    stats = run(args.patterns, args.format, args.workers, args.shard_size, args.force, args.model, args.encoder)
+    elapsed = time.perf_counter() - t0
+    print(f"[✓] Classified {stats['findings']:,} findings from {stats['files'] - stats['failed']} file(s) "
+          f"in {elapsed:.1f}s ({stats['findings'] / elapsed if elapsed else 0:,.0f} findings/s); "
+          f"{stats['skipped']} up to date, {stats['failed']} failed")
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""
+End-to-end benchmark on synthetic git repositories.
+
+generate_repo() builds a local repo through `git fast-import` (thousands of
+commits in seconds) with a configurable number of commits, file pool, blob
+size and planted secrets. The secrets are modelled on the Leak_Type classes
+of leakhawk_dataset.csv, seeded from their Data_Snippet values, and recorded
+as ground truth.
+
+run_pipeline() then runs the scan.py stages against the repo's file:// URL:
+
+    clone     git clone                               commits/s
+    filter    path_filter blob enumeration            MB/s
+    engine    gitleaks, or LeakHawk's rules as a      MB/s, findings/s
+              stub when the binary is absent
+    trufflehog  only when installed                   commits/s
+    ml        classifier.predict_findings             rows/s
+
+plus per-type recall of the planted secrets. Every run is appended to
+benchmarks/history.jsonl; --compare prints the change against the previous
+run with the same parameters.
+
+    python benchmark.py                                   # default repo size
+    python benchmark.py --commits 5000 --blob-kb 64 --compare
+    python benchmark.py --keep /tmp/bench-repo            # keep the generated repo
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import string
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from entropy import synthetic_text
+from path_filter import PathFilter, ScanStats, enumerate_history, gitleaks_args
+from rules import scan_bytes
+
+DATASET_PATH = "leakhawk_dataset.csv"
+HISTORY_PATH = os.path.join("benchmarks", "history.jsonl")
+# Filler text is sliced from one corpus of this size instead of generated per blob
+CORPUS_BYTES = 4 * 1024 * 1024
+ALNUM = string.ascii_letters + string.digits
+
+# Directories of the generated tree; vendored ones exercise the path filter
+DIRS = ["src", "src/app", "config", "scripts", "docs", "vendor/lib", "node_modules/pkg"]
+
+
+def _rand(rng, n, alphabet=ALNUM):
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+def _plant(leak_type, snippet, rng):
+    """(line to insert, needle a detector should report) for one Leak_Type."""
+    snippet = str(snippet)
+    if leak_type == "API Key":
+        key = "AIzaSy" + _rand(rng, 33, ALNUM + "_-")
+        return f'GOOGLE_API_KEY = "{key}"', key
+    if leak_type == "Config File":
+        value = _rand(rng, 20)
+        return f"{snippet.split('=', 1)[0]}={value}", value
+    if leak_type == "Credentials":
+        key = "AKIA" + _rand(rng, 16, string.ascii_uppercase + string.digits)
+        return f"aws_access_key_id = {key}  # {snippet.split(':', 1)[0]}", key
+    if leak_type == "Source Code":
+        token = "ghp_" + _rand(rng, 36)
+        return snippet.replace("return true;", f'const t = "{token}"; return true;'), token
+    if leak_type == "Payment Info":
+        number = snippet.replace(" ", "")
+        return f'card_number = "{number}"', number
+    # Personal Data, Database Dump, Confidential Document: plain snippets
+    return snippet, snippet
+
+
+def generate_repo(path, commits=500, files=200, files_per_commit=4, blob_kb=8, secrets=100,
+                  dataset=DATASET_PATH, seed=0):
+    """
+    Create a git repo at `path` and return the planted secrets as a list of
+    {"Leak_Type", "File", "Needle"}.
+    """
+    rng = random.Random(seed)
+    corpus = synthetic_text(CORPUS_BYTES, seed=seed)
+    snippets = pd.read_csv(dataset, usecols=["Leak_Type", "Data_Snippet"])
+    pool = [f"{rng.choice(DIRS)}/file_{i}.{rng.choice(['py', 'js', 'env', 'yml', 'txt'])}" for i in range(files)]
+    plantable = [p for p in pool if not p.startswith(("vendor/", "node_modules/"))]
+    plant_at = {}
+    for i in range(secrets):
+        plant_at.setdefault(rng.randrange(commits), []).append(i)
+
+    def blob():
+        start = corpus.find(b"\n", rng.randrange(len(corpus) - blob_kb * 1024)) + 1
+        return corpus[start:start + blob_kb * 1024]
+
+    planted = []
+    os.makedirs(path, exist_ok=True)
+    subprocess.run(["git", "init", "-q", path], check=True)
+    proc = subprocess.Popen(["git", "fast-import", "--quiet"], cwd=path, stdin=subprocess.PIPE)
+    out = proc.stdin
+    when = 1_600_000_000
+    for c in range(commits):
+        changes = {}
+        for name in rng.sample(pool, min(files_per_commit, len(pool))):
+            changes[name] = blob()
+        for _ in plant_at.get(c, []):
+            row = snippets.iloc[rng.randrange(len(snippets))]
+            line, needle = _plant(row.Leak_Type, row.Data_Snippet, rng)
+            # Only where a scan is expected to look; vendored paths are filtered out
+            name = rng.choice(plantable)
+            data = changes.get(name) or blob()
+            cut = data.find(b"\n", len(data) // 2) + 1
+            changes[name] = data[:cut] + line.encode() + b"\n" + data[cut:]
+            planted.append({"Leak_Type": row.Leak_Type, "File": name, "Needle": needle})
+        message = f"commit {c}".encode()
+        out.write(b"commit refs/heads/main\n")
+        out.write(b"committer Bench <bench@example.com> %d +0000\n" % (when + c * 60))
+        out.write(b"data %d\n%s\n" % (len(message), message))
+        for name, data in changes.items():
+            out.write(b"M 100644 inline %s\ndata %d\n%s\n" % (name.encode(), len(data), data))
+    out.close()
+    if proc.wait() != 0:
+        raise RuntimeError("git fast-import failed")
+    subprocess.run(["git", "symbolic-ref", "HEAD", "refs/heads/main"], cwd=path, check=True)
+    return planted
+
+
+def _timed(stages, name, fn, **rates):
+    """Run fn(), store seconds and the given per-second rates (value or callable of the result)."""
+    t0 = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - t0
+    entry = {"seconds": round(seconds, 4)}
+    for key, amount in rates.items():
+        amount = amount(result) if callable(amount) else amount
+        entry[key] = round(amount / seconds, 2) if seconds else None
+    stages[name] = entry
+    return result
+
+
+def stub_engine(repo, path_filter):
+    """LeakHawk's rules over every filtered history blob; stands in for gitleaks."""
+    blobs = list(enumerate_history(repo, path_filter))
+    findings = []
+    proc = subprocess.Popen(["git", "cat-file", "--batch"], cwd=repo, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    try:
+        for sha, path, size in blobs:
+            proc.stdin.write(sha.encode() + b"\n")
+            proc.stdin.flush()
+            proc.stdout.readline()
+            data = proc.stdout.read(size)
+            proc.stdout.read(1)
+            findings.extend(scan_bytes(data, path))
+    finally:
+        proc.stdin.close()
+        proc.wait()
+    return findings
+
+
+def gitleaks_engine(repo, path_filter):
+    from finding_record import load_findings
+
+    extra_args = gitleaks_args(path_filter)
+    report = os.path.join(tempfile.gettempdir(), f"leakhawk-bench-{os.getpid()}.json")
+    try:
+        subprocess.run(["gitleaks", "detect", "--source", repo, "--report-format", "json",
+                        "--report-path", report] + extra_args, capture_output=True)
+        return list(load_findings(report)) if os.path.exists(report) else []
+    finally:
+        os.remove(extra_args[1])
+        if os.path.exists(report):
+            os.remove(report)
+
+
+def recall_by_type(planted, findings):
+    """Share of planted secrets, per Leak_Type, that some finding in the same file reports."""
+    by_file = {}
+    for f in findings:
+        by_file.setdefault(f["File"], []).append(f.get("Match", "") + " " + f.get("Secret", ""))
+    hits, totals = {}, {}
+    for p in planted:
+        totals[p["Leak_Type"]] = totals.get(p["Leak_Type"], 0) + 1
+        if any(p["Needle"] in text for text in by_file.get(p["File"], ())):
+            hits[p["Leak_Type"]] = hits.get(p["Leak_Type"], 0) + 1
+    return {t: round(hits.get(t, 0) / n, 3) for t, n in sorted(totals.items())}
+
+
+def run_pipeline(repo, planted, workdir, ml_rows=5000):
+    """Time each scan stage against file://<repo>; returns the result record."""
+    stages, notes = {}, {}
+    n_commits = int(subprocess.run(["git", "rev-list", "--count", "--all"], cwd=repo,
+                                   capture_output=True, text=True, check=True).stdout)
+    url = "file://" + os.path.abspath(repo)
+    clone_dir = os.path.join(workdir, "repo-temp")
+    _timed(stages, "clone", lambda: subprocess.run(["git", "clone", "-q", url, clone_dir], check=True),
+           commits_per_s=n_commits)
+
+    path_filter = PathFilter.for_repo(clone_dir)
+    stats = ScanStats()
+    _timed(stages, "filter", lambda: list(enumerate_history(clone_dir, path_filter, stats)),
+           blobs_per_s=lambda blobs: len(blobs), mb_per_s=lambda _: (stats.scanned_bytes + stats.skipped_bytes) / 1e6)
+    stages["filter"]["scanned_mb"] = round(stats.scanned_bytes / 1e6, 2)
+    stages["filter"]["skipped_mb"] = round(stats.skipped_bytes / 1e6, 2)
+
+    engine = gitleaks_engine if shutil.which("gitleaks") else stub_engine
+    notes["engine"] = "gitleaks" if engine is gitleaks_engine else "leakhawk rules (gitleaks not installed)"
+    findings = _timed(stages, "engine", lambda: engine(clone_dir, path_filter),
+                      mb_per_s=stats.scanned_bytes / 1e6, findings_per_s=len)
+    stages["engine"]["findings"] = len(findings)
+
+    if shutil.which("trufflehog"):
+        _timed(stages, "trufflehog", lambda: subprocess.run(["trufflehog", "git", url], capture_output=True),
+               commits_per_s=n_commits)
+    else:
+        notes["trufflehog"] = "skipped (not installed)"
+
+    try:
+        from classifier import load_model, predict_findings
+        model, label_encoder = load_model()
+        rows = (findings * (ml_rows // max(len(findings), 1) + 1))[:ml_rows] if findings else []
+        _timed(stages, "ml", lambda: predict_findings(model, label_encoder, rows), rows_per_s=len(rows))
+    except Exception as e:
+        notes["ml"] = f"skipped ({e.__class__.__name__}: {e})"
+
+    return {"n_commits": n_commits, "stages": stages, "notes": notes,
+            "recall": recall_by_type(planted, findings)}
+
+
+def _leakhawk_version():
+    out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return out.stdout.strip() or "unknown"
+
+
+def save_result(record, path=HISTORY_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def previous_result(params, path=HISTORY_PATH):
+    """Most recent saved run with the same generator parameters, or None."""
+    if not os.path.exists(path):
+        return None
+    last = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("params") == params:
+                last = record
+    return last
+
+
+def print_report(record, baseline=None):
+    print(f"[✓] {record['n_commits']:,} commits, LeakHawk {record['version']}")
+    for name, entry in record["stages"].items():
+        rates = {k: v for k, v in entry.items() if k.endswith("_per_s")}
+        line = "  ".join(f"{v:>12,.1f} {k[:-6].replace('mb', 'MB')}/s" for k, v in rates.items() if v is not None)
+        delta = ""
+        if baseline and name in baseline["stages"]:
+            key = next(iter(rates), None)
+            old = baseline["stages"][name].get(key) if key else None
+            if old and rates.get(key):
+                delta = f"   ({(rates[key] - old) / old * 100:+.1f}% vs {baseline['version']})"
+        print(f"    {name:10s} {entry['seconds']:8.2f}s  {line}{delta}")
+    for stage, note in record["notes"].items():
+        print(f"    {stage:10s} {note}")
+    print("    recall     " + ", ".join(f"{t} {r:.0%}" for t, r in record["recall"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scan pipeline on a synthetic git repository.")
+    parser.add_argument("--commits", type=int, default=500)
+    parser.add_argument("--files", type=int, default=200, help="Size of the file pool commits modify")
+    parser.add_argument("--files-per-commit", type=int, default=4)
+    parser.add_argument("--blob-kb", type=int, default=8, help="Size of each file version")
+    parser.add_argument("--secrets", type=int, default=100, help="Planted secrets (Leak_Type classes of the dataset)")
+    parser.add_argument("--ml-rows", type=int, default=5000, help="Findings classified in the ML stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", default=HISTORY_PATH, help="Where results are appended")
+    parser.add_argument("--compare", action="store_true", help="Show the change vs the previous comparable run")
+    parser.add_argument("--keep", default=None, help="Generate the repo here and keep it")
+    args = parser.parse_args()
+
+    params = {k: getattr(args, k) for k in ("commits", "files", "files_per_commit", "blob_kb", "secrets", "ml_rows", "seed")}
+    workdir = tempfile.mkdtemp(prefix="leakhawk-bench-")
+    repo = args.keep or os.path.join(workdir, "source")
+    try:
+        t0 = time.perf_counter()
+        planted = generate_repo(repo, args.commits, args.files, args.files_per_commit, args.blob_kb,
+                                args.secrets, seed=args.seed)
+        print(f"[✓] Generated {args.commits:,} commits with {len(planted)} planted secrets "
+              f"in {time.perf_counter() - t0:.1f}s")
+        record = run_pipeline(repo, planted, workdir, args.ml_rows)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    record.update({
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "version": _leakhawk_version(),
+        "host": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "params": params,
+    })
+    baseline = previous_result(params, args.history) if args.compare else None
+    print_report(record, baseline)
+    save_result(record, args.history)
+    print(f"[✓] Result appended to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
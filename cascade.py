@@ -0,0 +1,245 @@
+"""
+Two-tier cascade classifier for LeakHawk findings.
+
+Tier 0: deterministic RuleID -> Leak_Type lookup (e.g. aws-access-token is
+        always an API Key).
+Tier 1: tiny linear model on hashed character n-grams of Data_Snippet.
+Tier 2: the full TF-IDF + XGBoost pipeline (leakhawk_model.pkl), only for
+        findings where tier 1 is below the confidence threshold.
+
+Run `python cascade.py` to train tier 1 on leakhawk_dataset.csv, print the
+per-threshold tuning report and save leakhawk_cascade.pkl.
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+CASCADE_PATH = "leakhawk_cascade.pkl"
+DEFAULT_THRESHOLD = 0.9
+TIER_NAMES = ("rule", "linear", "full")
+
+# Gitleaks rule IDs whose Leak_Type is fixed by the rule itself.
+# Generic rules (generic-api-key, high-entropy, ...) are deliberately absent.
+# leakhawk_dataset.csv has its own pattern names (api_key_regex, email_regex,
+# ...) that say nothing about Leak_Type (each is spread evenly over all
+# types), so the rule tier never fires in the tuning report below; it only
+# answers findings from real Gitleaks scans.
+RULE_TYPE_MAP = {
+    "aws-access-token": "API Key",
+    "gcp-api-key": "API Key",
+    "github-pat": "API Key",
+    "github-fine-grained-pat": "API Key",
+    "github-oauth": "API Key",
+    "github-app-token": "API Key",
+    "gitlab-pat": "API Key",
+    "slack-bot-token": "API Key",
+    "slack-user-token": "API Key",
+    "slack-webhook-url": "API Key",
+    "stripe-access-token": "API Key",
+    "sendgrid-api-token": "API Key",
+    "twilio-api-key": "API Key",
+    "openai-api-key": "API Key",
+    "npm-access-token": "API Key",
+    "pypi-upload-token": "API Key",
+    "private-key": "Credentials",
+    "jwt": "Credentials",
+    "basic-auth": "Credentials",
+    "hashicorp-tf-password": "Credentials",
+    "credit-card": "Payment Info",
+}
+
+
+def build_linear_model(n_features=2 ** 16):
+    """Hashed char n-grams + logistic SGD: no vocabulary, microseconds per row."""
+    return Pipeline([
+        ("hash", HashingVectorizer(analyzer="char_wb", ngram_range=(2, 4),
+                                   n_features=n_features, alternate_sign=False)),
+        ("clf", SGDClassifier(loss="log_loss", alpha=1e-5, max_iter=50,
+                              tol=1e-4, random_state=42)),
+    ])
+
+
+class CascadeClassifier:
+    """
+    Routes each finding through the cheapest tier that is confident enough.
+
+    `predict_proba` returns probabilities aligned with `label_encoder.classes_`
+    (same contract as the full pipeline); with return_tiers=True it also
+    returns the tier that answered each row. One instance is shared by every
+    thread of a process (registry.py), so nothing per call is kept on it;
+    `stats` accumulates tier counts under a lock.
+    """
+
+    def __init__(self, full_model, label_encoder, linear_model=None,
+                 threshold=DEFAULT_THRESHOLD, rule_map=None):
+        self.full_model = full_model
+        self.label_encoder = label_encoder
+        self.linear_model = linear_model
+        self.threshold = threshold
+        self.rule_map = RULE_TYPE_MAP if rule_map is None else rule_map
+        self.n_classes = len(label_encoder.classes_)
+        self._class_index = {c: i for i, c in enumerate(label_encoder.classes_)}
+        self.stats = dict.fromkeys(TIER_NAMES, 0)
+        self._stats_lock = threading.Lock()
+
+    def fit_linear(self, X: pd.DataFrame, y):
+        """Fit tier 1 on the Data_Snippet column with encoded labels `y`."""
+        if self.linear_model is None:
+            self.linear_model = build_linear_model()
+        self.linear_model.fit(X["Data_Snippet"].astype(str), y)
+        return self
+
+    def _rule_tier(self, X: pd.DataFrame):
+        idx = np.full(len(X), -1, dtype=np.int64)
+        for i, rid in enumerate(X["Pattern_Matched"].astype(str).str.lower()):
+            leak_type = self.rule_map.get(rid)
+            if leak_type in self._class_index:
+                idx[i] = self._class_index[leak_type]
+        return idx
+
+    def _linear_proba(self, X: pd.DataFrame):
+        proba = np.zeros((len(X), self.n_classes))
+        if len(X):
+            # SGDClassifier only knows the classes it saw during fit
+            cols = self.linear_model.classes_.astype(np.int64)
+            proba[:, cols] = self.linear_model.predict_proba(X["Data_Snippet"].astype(str))
+        return proba
+
+    def predict_proba(self, X: pd.DataFrame, threshold=None, return_tiers=False):
+        threshold = self.threshold if threshold is None else threshold
+        X = X.reset_index(drop=True)
+        proba = np.zeros((len(X), self.n_classes))
+        tiers = np.empty(len(X), dtype=object)
+
+        rule_idx = self._rule_tier(X)
+        hit = rule_idx >= 0
+        proba[np.flatnonzero(hit), rule_idx[hit]] = 1.0
+        tiers[hit] = "rule"
+
+        pending = np.flatnonzero(~hit)
+        if len(pending) and self.linear_model is not None:
+            lin = self._linear_proba(X.iloc[pending])
+            confident = lin.max(axis=1) >= threshold
+            proba[pending[confident]] = lin[confident]
+            tiers[pending[confident]] = "linear"
+            pending = pending[~confident]
+
+        if len(pending):
+            proba[pending] = self.full_model.predict_proba(X.iloc[pending])
+            tiers[pending] = "full"
+
+        counts = {name: int((tiers == name).sum()) for name in TIER_NAMES}
+        with self._stats_lock:
+            for name, n in counts.items():
+                self.stats[name] += n
+        return (proba, tiers) if return_tiers else proba
+
+    def predict(self, X: pd.DataFrame, threshold=None):
+        return self.predict_proba(X, threshold=threshold).argmax(axis=1)
+
+    def hit_rates(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        total = sum(stats.values()) or 1
+        return {name: stats[name] / total for name in TIER_NAMES}
+
+
+def evaluate(cascade: CascadeClassifier, X: pd.DataFrame, y, thresholds):
+    """
+    Compare the cascade against the full pipeline for each threshold.
+
+    Returns one row per threshold with tier hit rates, accuracy, the accuracy
+    delta versus always running the full model, and wall time.
+    """
+    y = np.asarray(y)
+    t0 = time.perf_counter()
+    full_pred = cascade.full_model.predict(X)
+    full_time = time.perf_counter() - t0
+    full_acc = float((full_pred == y).mean())
+
+    rows = []
+    for thr in thresholds:
+        t0 = time.perf_counter()
+        proba, tiers = cascade.predict_proba(X, threshold=thr, return_tiers=True)
+        pred = proba.argmax(axis=1)
+        elapsed = time.perf_counter() - t0
+        row = {"threshold": thr}
+        for name in TIER_NAMES:
+            mask = tiers == name
+            row[f"{name}_hit_rate"] = float(mask.mean())
+            # Accuracy on the rows this tier answered, and what the full model would have scored there
+            row[f"{name}_acc"] = float((pred[mask] == y[mask]).mean()) if mask.any() else np.nan
+            row[f"{name}_full_acc"] = float((full_pred[mask] == y[mask]).mean()) if mask.any() else np.nan
+        row["cascade_acc"] = float((pred == y).mean())
+        row["full_acc"] = full_acc
+        row["acc_delta"] = row["cascade_acc"] - full_acc
+        row["cascade_s"] = elapsed
+        row["full_s"] = full_time
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def load_cascade(full_model, label_encoder, path=CASCADE_PATH, threshold=None):
+    """Load a saved cascade config and attach the already-loaded full pipeline."""
+    import joblib
+    saved = joblib.load(path)
+    return CascadeClassifier(
+        full_model, label_encoder,
+        linear_model=saved["linear_model"],
+        threshold=saved["threshold"] if threshold is None else threshold,
+        rule_map=saved["rule_map"],
+    )
+
+
+def main():
+    import joblib
+    from sklearn.model_selection import train_test_split
+
+    parser = argparse.ArgumentParser(description="Train and tune the LeakHawk cascade classifier.")
+    parser.add_argument("--data", default="leakhawk_dataset.csv")
+    parser.add_argument("--model", default="leakhawk_model.pkl")
+    parser.add_argument("--encoder", default="label_encoder.pkl")
+    parser.add_argument("--out", default=CASCADE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Confidence below which tier 1 escalates to the full model")
+    parser.add_argument("--thresholds", default="0.5,0.7,0.8,0.9,0.95,0.99",
+                        help="Comma-separated thresholds for the tuning report")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    full_model = joblib.load(args.model)
+    label_encoder = joblib.load(args.encoder)
+    y = label_encoder.transform(df["Leak_Type"])
+    X = df[["Data_Snippet", "Pattern_Matched", "Risk_Score", "Anomaly_Flag"]]
+    # Same split as leak-hawk-ml.py so the full model is scored on unseen rows
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+
+    cascade = CascadeClassifier(full_model, label_encoder, threshold=args.threshold)
+    cascade.fit_linear(X_train, y_train)
+
+    thresholds = [float(t) for t in args.thresholds.split(",") if t.strip()]
+    report = evaluate(cascade, X_test, y_test, thresholds)
+    cols = ["threshold", "rule_hit_rate", "linear_hit_rate", "full_hit_rate",
+            "linear_acc", "linear_full_acc", "cascade_acc", "full_acc", "acc_delta",
+            "cascade_s", "full_s"]
+    with pd.option_context("display.width", 200, "display.float_format", "{:.4f}".format):
+        print(report[cols].to_string(index=False))
+
+    joblib.dump({
+        "linear_model": cascade.linear_model,
+        "threshold": args.threshold,
+        "rule_map": cascade.rule_map,
+    }, args.out)
+    print(f"✅ Cascade saved as {args.out} (threshold={args.threshold})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Shared ML helpers for LeakHawk.
+
+Turns Gitleaks findings into the 4-column frame the trained pipeline expects
+and post-processes predictions (risk score, anomaly flag). Kept free of any
+Streamlit code so the UI, CLIs and the API can all import it.
+"""
+import pandas as pd
+
+FEATURE_COLUMNS = ["Data_Snippet", "Pattern_Matched", "Risk_Score", "Anomaly_Flag"]
+
+
+def extract_text_for_ml(finding: dict) -> str:
+    """
+    Build the text fed to the ML model from a LeakHawk finding.
+    Prioritize matched content, then context.
+    """
+    parts = []
+    for key in ("Match", "Secret", "Description"):
+        v = finding.get(key)
+        if v:
+            parts.append(str(v))
+    for k in ("RuleID", "File", "Message", "Commit"):
+        v = finding.get(k)
+        if v:
+            parts.append(str(v))
+    text = " | ".join(parts).strip()
+    return text if text else str(finding)
+
+
+def findings_to_frame(findings) -> pd.DataFrame:
+    """Build the feature frame (4 features expected by the model) for a list of findings."""
+    ml_data = []
+    for f in findings:
+        ml_data.append({
+            "Data_Snippet": extract_text_for_ml(f),
+            "Pattern_Matched": f.get("RuleID", "unknown"),
+            # No risk/anomaly signal in raw findings yet: medium risk, not anomalous
+            "Risk_Score": 5,
+            "Anomaly_Flag": "No",
+        })
+    return pd.DataFrame(ml_data, columns=FEATURE_COLUMNS)
+
+
+def prob_to_risk(prob: float) -> int:
+    if prob >= 0.90: return 10
+    if prob >= 0.80: return 9
+    if prob >= 0.70: return 8
+    if prob >= 0.60: return 7
+    if prob >= 0.50: return 6
+    if prob >= 0.40: return 5
+    if prob >= 0.30: return 4
+    if prob >= 0.20: return 3
+    if prob >= 0.10: return 2
+    return 1
+
+
+def flag_anomaly(rule_id: str, pred_label: str, confidence: float) -> bool:
+    if confidence < 0.25:
+        return True
+    if rule_id and pred_label:
+        rid = str(rule_id).lower()
+        weird_pairs = [
+            ("generic-api-key", "Payment Info"),
+            ("high-entropy", "Payment Info"),
+            ("password", "Payment Info"),
+        ]
+        if any(rid.startswith(p0) and pred_label == p1 for p0, p1 in weird_pairs):
+            return True
+    return False
+
+
+def load_model(model_path="leakhawk_model.pkl", encoder_path="label_encoder.pkl", compiled=True):
+    """Load the pipeline + label encoder, using the array-compiled booster when possible."""
+    import joblib
+    model = joblib.load(model_path)
+    label_encoder = joblib.load(encoder_path)
+    if compiled:
+        try:
+            from treecompile import compile_pipeline
+            model = compile_pipeline(model)
+        except Exception:
+            pass
+    return model, label_encoder
+
+
+def predict_findings(model, label_encoder, findings, frame=None) -> list:
+    """
+    Classify findings; one dict per finding with Predicted_Type, Confidence,
+    Risk_Score(1-10) and Anomaly_Flag, in input order. `frame` is the
+    findings_to_frame() output, if the caller already built it.
+    """
+    if not findings:
+        return []
+    proba = model.predict_proba(findings_to_frame(findings) if frame is None else frame)
+    best = proba.argmax(axis=1)
+    labels = label_encoder.classes_[best]
+    results = []
+    for finding, label, conf in zip(findings, labels, proba.max(axis=1)):
+        conf = float(conf)
+        results.append({
+            "Predicted_Type": str(label),
+            "Confidence": round(conf, 3),
+            "Risk_Score(1-10)": prob_to_risk(conf),
+            "Anomaly_Flag": flag_anomaly(finding.get("RuleID", ""), str(label), conf),
+        })
+    return results
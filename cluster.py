@@ -0,0 +1,530 @@
+"""
+Distributed scanning: a coordinator and worker nodes on the local network.
+
+The coordinator claims jobs from the job store (jobstore.py, the same queue
+backend.py's /scan feeds), lists each repository's commits with a blobless
+bare clone and splits them into shards of SHARD_COMMITS commits. Workers
+ask for shards, scan the added lines of exactly those commits with the
+rules (diff_scan.py) in their own cached bare clone, and send the findings
+back. When every shard of a repository is in, the findings are baselined
+and saved to the artifact store, and the job is finished, as a JobRunner
+would. Run backend.py with --workers 0 to leave its /scan jobs to the
+cluster.
+
+As in diff_scan.scan_changes, the repository's own .leakhawkignore and
+.leakhawkbaseline apply: the coordinator reads both from HEAD when planning,
+ships the ignore patterns with every shard and merges the repo baseline
+with its own. Job options the cluster cannot honour (archives: it scans
+diffs, not blobs) fail the job instead of being dropped.
+
+Work stealing: a worker that takes a repository from the shared queue gets
+a batch of its shards (so they reuse its clone); a worker that runs dry
+steals not-yet-started shards from the tail of the busiest worker's batch.
+
+Workers send a heartbeat every HEARTBEAT_SECONDS. One silent for
+DEAD_AFTER_SECONDS is dropped: its running shard and its batch go back to
+the front of the queue (a shard is given up on after MAX_ATTEMPTS, failing
+its job). Results carry a lease, so a late reply from a worker whose shard
+was reassigned is ignored.
+
+The protocol is one JSON line per TCP connection in each direction. It is
+meant for a trusted network; set --token (or LEAKHAWK_CLUSTER_TOKEN) on
+every node to reject strangers.
+
+    python cluster.py coordinator --host 0.0.0.0 --data-dir scan_artifacts
+    python cluster.py worker --coordinator 10.0.0.5:7878 --workdir /var/tmp/leakhawk
+    python cluster.py submit https://github.com/org/repo ... [--from-file repos.txt]
+    python cluster.py status
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from pathlib import Path
+
+DEFAULT_PORT = 7878
+SHARD_COMMITS = 500
+# Shards of one repository handed to a worker at once (stealable until started)
+BATCH_SHARDS = 8
+HEARTBEAT_SECONDS = 5.0
+DEAD_AFTER_SECONDS = 20.0
+MAX_ATTEMPTS = 3
+# Workers with nothing to do ask again after this long
+IDLE_WAIT_SECONDS = 1.0
+TOKEN = os.environ.get("LEAKHAWK_CLUSTER_TOKEN", "")
+
+
+def request(address, message, token=TOKEN, timeout=60):
+    """Send one JSON message to host:port and return the JSON reply."""
+    host, _, port = address.rpartition(":")
+    with socket.create_connection((host or "127.0.0.1", int(port)), timeout=timeout) as sock:
+        sock.sendall(json.dumps(dict(message, token=token)).encode() + b"\n")
+        sock.shutdown(socket.SHUT_WR)
+        data = sock.makefile("rb").read()
+    reply = json.loads(data)
+    if "error" in reply:
+        raise RuntimeError(reply["error"])
+    return reply
+
+
+def list_commits(repo_url, workdir):
+    """
+    (every commit reachable from the repo's refs, oldest first; path of the
+    blobless bare clone they were listed from: commits and trees only).
+    """
+    clone = os.path.join(workdir, "plan.git")
+    subprocess.run(["git", "clone", "--quiet", "--bare", "--filter=blob:none", repo_url, clone],
+                   check=True, capture_output=True, text=True)
+    out = subprocess.run(["git", "-C", clone, "rev-list", "--all", "--reverse", "--topo-order"],
+                         check=True, capture_output=True, text=True).stdout
+    return out.split(), clone
+
+
+def head_file(repo, name):
+    """Lines of `name` in the HEAD tree of a (bare, possibly blobless) clone; [] if there is none."""
+    result = subprocess.run(["git", "-C", repo, "show", f"HEAD:{name}"], capture_output=True, text=True)
+    return result.stdout.splitlines() if result.returncode == 0 else []
+
+
+# ---------- coordinator ----------
+
+class Coordinator:
+    """Shard queue, per-worker batches, liveness and result merging (thread-safe)."""
+
+    def __init__(self, store, artifact_store=None, baseline=None, shard_commits=SHARD_COMMITS,
+                 name="cluster", dead_after=DEAD_AFTER_SECONDS):
+        self.store = store
+        self.artifact_store = artifact_store
+        self.baseline = baseline
+        self.shard_commits = shard_commits
+        self.name = name
+        self.dead_after = dead_after
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.queue = deque()    # shards nobody holds
+        self.batches = {}       # worker -> deque of its not-yet-started shards
+        self.running = {}       # shard_id -> (worker, lease, shard)
+        self.workers = {}       # worker -> {"last_seen", "done", "stolen"}
+        self.jobs = {}          # job_id -> progress, findings and timings of one repository
+        self.planning = None    # job_id being cloned and split
+
+    # ---- planning ----
+
+    def plan(self, job):
+        """Split one claimed job into shards and queue them."""
+        from baseline import REPO_BASELINE_FILE, parse_fingerprints
+        from metrics import ScanTimer
+        from path_filter import IGNORE_FILE, parse_ignore
+
+        unsupported = sorted(k for k, v in (job["options"] or {}).items() if v)
+        if unsupported:
+            self.store.fail(job["job_id"], f"not supported by the cluster: {', '.join(unsupported)}; "
+                                           "leave such jobs to a JobRunner")
+            return
+        timer = ScanTimer()
+        self.planning = job["job_id"]
+        workdir = tempfile.mkdtemp(prefix="leakhawk-plan-")
+        try:
+            with timer.stage("plan"):
+                commits, clone = list_commits(job["repo_url"], workdir)
+                ignore = parse_ignore(head_file(clone, IGNORE_FILE))
+                repo_baseline = parse_fingerprints(head_file(clone, REPO_BASELINE_FILE))
+        except subprocess.CalledProcessError as e:
+            self.store.fail(job["job_id"], f"clone failed: {(e.stderr or '').strip()[:500]}")
+            return
+        finally:
+            self.planning = None
+            shutil.rmtree(workdir, ignore_errors=True)
+        chunks = [commits[i:i + self.shard_commits] for i in range(0, len(commits), self.shard_commits)]
+        shards = [{"shard_id": f"{job['job_id']}-{i}", "job_id": job["job_id"], "repo_url": job["repo_url"],
+                   "commits": chunk, "ignore": ignore, "attempt": 0} for i, chunk in enumerate(chunks)]
+        with self._lock:
+            self.jobs[job["job_id"]] = {"job": job, "total": len(shards), "done": 0, "findings": [],
+                                        "timer": timer, "stage_totals": {}, "log": [],
+                                        "repo_baseline": repo_baseline}
+            self.queue.extend(shards)
+        if not shards:
+            self._complete(job["job_id"])
+
+    def _planner(self):
+        while not self._stop.is_set():
+            with self._lock:
+                backlog = len(self.queue) + sum(len(b) for b in self.batches.values())
+                # Keep roughly one batch per live worker queued, no more: later jobs stay claimable elsewhere
+                wanted = backlog < BATCH_SHARDS * max(1, len(self.workers))
+            job = self.store.claim(self.name) if wanted else None
+            if job is None:
+                self._stop.wait(IDLE_WAIT_SECONDS)
+                continue
+            try:
+                self.plan(job)
+            except Exception as e:
+                self.store.fail(job["job_id"], f"{e.__class__.__name__}: {e}")
+                traceback.print_exc()
+
+    # ---- shard assignment ----
+
+    def _seen(self, worker):
+        w = self.workers.setdefault(worker, {"last_seen": 0.0, "done": 0, "stolen": 0})
+        w["last_seen"] = time.monotonic()
+        return w
+
+    def _take(self, worker):
+        """Next shard for `worker`: its own batch, then the shared queue, then stolen. Caller holds the lock."""
+        own = self.batches.setdefault(worker, deque())
+        while own:
+            shard = own.popleft()
+            if shard["job_id"] in self.jobs:
+                return shard
+        while self.queue:
+            shard = self.queue.popleft()
+            if shard["job_id"] not in self.jobs:
+                continue  # its job already failed
+            # The rest of this repository's leading shards come along, to reuse the worker's clone
+            while self.queue and len(own) < BATCH_SHARDS - 1 and self.queue[0]["job_id"] == shard["job_id"]:
+                own.append(self.queue.popleft())
+            return shard
+        victim = max((w for w in self.batches if w != worker), key=lambda w: len(self.batches[w]), default=None)
+        if victim is not None and self.batches[victim]:
+            self.workers[worker]["stolen"] += 1
+            return self.batches[victim].pop()
+        return None
+
+    def next_shard(self, worker):
+        with self._lock:
+            self._seen(worker)
+            shard = self._take(worker)
+            if shard is None:
+                return None
+            lease = uuid.uuid4().hex[:12]
+            self.running[shard["shard_id"]] = (worker, lease, shard)
+        self.store.heartbeat(shard["job_id"])
+        return dict(shard, lease=lease)
+
+    def heartbeat(self, worker, shard_id=None, lease=None):
+        """Record liveness; tells the worker to drop its shard if it was reassigned meanwhile."""
+        with self._lock:
+            self._seen(worker)
+            held = self.running.get(shard_id)
+            owned = shard_id is None or (held is not None and held[:2] == (worker, lease))
+        return {"cancel": not owned}
+
+    def result(self, worker, shard_id, lease, findings=(), timings=None, error=None):
+        with self._lock:
+            w = self._seen(worker)
+            held = self.running.get(shard_id)
+            if held is None or held[:2] != (worker, lease):
+                return {"accepted": False}  # reassigned after this worker was declared dead
+            del self.running[shard_id]
+            shard = held[2]
+            progress = self.jobs.get(shard["job_id"])
+            if progress is None:
+                return {"accepted": False}
+            if error:
+                self._retry(shard, f"{worker}: {error}")
+                return {"accepted": True}
+            w["done"] += 1
+            progress["done"] += 1
+            progress["findings"].extend(findings)
+            progress["log"].append(f"{shard_id}: {len(shard['commits'])} commits, {len(findings)} findings on {worker}")
+            for stage, rec in (timings or {}).items():
+                total = progress["stage_totals"].setdefault(stage, {"seconds": 0.0, "bytes": 0, "findings": 0})
+                for k in total:
+                    total[k] += rec.get(k) or 0
+            complete = progress["done"] == progress["total"]
+        self.store.heartbeat(shard["job_id"])
+        if complete:
+            self._complete(shard["job_id"])
+        return {"accepted": True}
+
+    def _retry(self, shard, reason):
+        """Requeue a shard that failed or lost its worker; fail the job after MAX_ATTEMPTS. Caller holds the lock."""
+        shard["attempt"] += 1
+        if shard["attempt"] < MAX_ATTEMPTS:
+            self.queue.appendleft(shard)
+            return
+        self.jobs.pop(shard["job_id"], None)
+        self.store.fail(shard["job_id"], f"shard {shard['shard_id']} failed {MAX_ATTEMPTS} times, last: {reason}")
+
+    def _complete(self, job_id):
+        """Merge a finished repository into the job store (and artifact store), like JobRunner.run_job."""
+        from baseline import Baseline
+
+        with self._lock:
+            progress = self.jobs.pop(job_id, None)
+        if progress is None:
+            return  # failed meanwhile
+        job, timer, findings = progress["job"], progress["timer"], progress["findings"]
+        try:
+            for stage, total in progress["stage_totals"].items():
+                timer.record(stage, total["seconds"], bytes=total["bytes"] or None, findings=total["findings"])
+            # The coordinator's baseline plus the repository's own .leakhawkbaseline
+            baseline = Baseline(progress["repo_baseline"] | (self.baseline.fingerprints if self.baseline is not None else set()))
+            if len(baseline):
+                with timer.stage("baseline") as rec:
+                    findings, rec["findings"] = baseline.split(findings)
+            scan_id = None
+            if self.artifact_store is not None:
+                scan_id = self.artifact_store.save_scan(job["repo_url"], "\n".join(progress["log"]) + "\n",
+                                                        findings, timer=timer)
+            self.store.finish(job_id, len(findings), scan_id)
+        except Exception as e:
+            self.store.fail(job_id, f"{e.__class__.__name__}: {e}")
+            traceback.print_exc()
+
+    # ---- liveness ----
+
+    def reap(self):
+        """Drop workers silent for dead_after seconds and requeue everything they held."""
+        now = time.monotonic()
+        with self._lock:
+            dead = [w for w, s in self.workers.items() if now - s["last_seen"] > self.dead_after]
+            for worker in dead:
+                del self.workers[worker]
+                # Unstarted shards first keep their order at the front of the queue
+                self.queue.extendleft(reversed(self.batches.pop(worker, deque())))
+                for shard_id, (holder, _, shard) in list(self.running.items()):
+                    if holder == worker:
+                        del self.running[shard_id]
+                        self._retry(shard, f"worker {worker} stopped sending heartbeats")
+        for worker in dead:
+            print(f"[✗] Worker {worker} is gone; its shards were requeued", flush=True)
+        return dead
+
+    def _reaper(self):
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            self.reap()
+            # Jobs claimed by this coordinator's previous run never finish: start them over
+            self.store.requeue_stale(self.dead_after * 3, self.name)
+            with self._lock:
+                active = list(self.jobs) + ([self.planning] if self.planning else [])
+            for job_id in active:
+                self.store.heartbeat(job_id)
+
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "queued_shards": len(self.queue),
+                "running_shards": len(self.running),
+                "workers": {w: {"idle_seconds": round(now - s["last_seen"], 1), "done": s["done"],
+                                "stolen": s["stolen"], "batch": len(self.batches.get(w, ()))}
+                            for w, s in self.workers.items()},
+                "jobs": {job_id: {"repo_url": p["job"]["repo_url"], "shards_done": p["done"], "shards": p["total"]}
+                         for job_id, p in self.jobs.items()},
+            }
+
+    def start(self):
+        for target in (self._planner, self._reaper):
+            threading.Thread(target=target, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def handle(self, msg):
+        op = msg.get("op")
+        if op == "next":
+            shard = self.next_shard(msg["worker"])
+            return {"shard": shard, "wait": IDLE_WAIT_SECONDS, "heartbeat": HEARTBEAT_SECONDS}
+        if op == "heartbeat":
+            return self.heartbeat(msg["worker"], msg.get("shard_id"), msg.get("lease"))
+        if op == "result":
+            return self.result(msg["worker"], msg["shard_id"], msg["lease"], msg.get("findings") or [],
+                               msg.get("timings"), msg.get("error"))
+        if op == "submit":
+            return {"jobs": [self.store.submit(url)["job_id"] for url in msg["repo_urls"]]}
+        if op == "status":
+            return self.status()
+        return {"error": f"unknown op {op!r}"}
+
+
+def serve_coordinator(coordinator, host, port, token=TOKEN):
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                msg = json.loads(self.rfile.read())
+                if token and msg.get("token") != token:
+                    reply = {"error": "bad token"}
+                else:
+                    reply = coordinator.handle(msg)
+            except Exception as e:
+                reply = {"error": f"{e.__class__.__name__}: {e}"}
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer((host, port), Handler)
+    server.daemon_threads = True
+    coordinator.start()
+    print(f"[✓] Coordinator listening on {host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        coordinator.stop()
+        server.server_close()
+
+
+# ---------- worker ----------
+
+class Worker:
+    """Pulls shards from a coordinator and scans them in cached bare clones under `workdir`."""
+
+    def __init__(self, coordinator, workdir, name=None, token=TOKEN):
+        self.coordinator = coordinator
+        self.workdir = Path(workdir)
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.token = token
+        self.heartbeat_seconds = HEARTBEAT_SECONDS
+        self._stop = threading.Event()
+
+    def _send(self, message):
+        return request(self.coordinator, dict(message, worker=self.name), self.token)
+
+    def clone_for(self, repo_url, commits):
+        """Bare clone of repo_url, fetched again only when the shard's commits are missing."""
+        from artifact_store import repo_key
+
+        path = self.workdir / f"{repo_key(repo_url)}.git"
+        if not path.exists():
+            tmp = path.with_suffix(f".tmp-{os.getpid()}")
+            shutil.rmtree(tmp, ignore_errors=True)
+            subprocess.run(["git", "clone", "--quiet", "--bare", repo_url, str(tmp)], check=True,
+                           capture_output=True, text=True)
+            try:
+                os.replace(tmp, path)
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)  # another worker sharing workdir cloned it first
+        elif subprocess.run(["git", "-C", str(path), "cat-file", "-e", f"{commits[-1]}^{{commit}}"],
+                            capture_output=True).returncode != 0:
+            subprocess.run(["git", "-C", str(path), "fetch", "--quiet", "--prune", "origin",
+                            "+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*"],
+                           check=True, capture_output=True, text=True)
+        return path
+
+    def scan_shard(self, shard):
+        """(findings, timings) for the added lines of the shard's commits, after the repo's path filter."""
+        from diff_scan import git_diff, scan_patch
+        from metrics import ScanTimer
+        from path_filter import PathFilter
+
+        timer = ScanTimer()
+        with timer.stage("clone"):
+            repo = self.clone_for(shard["repo_url"], shard["commits"])
+        with timer.stage("engine") as rec:
+            patch = git_diff(str(repo), commits=shard["commits"])
+            findings = scan_patch(patch, PathFilter(shard.get("ignore", ())))
+            rec["bytes"], rec["findings"] = len(patch), len(findings)
+        return findings, timer.timings
+
+    def _heartbeats(self, shard, cancelled, done):
+        while not done.wait(self.heartbeat_seconds):
+            try:
+                if self._send({"op": "heartbeat", "shard_id": shard["shard_id"], "lease": shard["lease"]})["cancel"]:
+                    cancelled.set()
+            except (OSError, ValueError, RuntimeError):
+                pass  # coordinator briefly unreachable: keep scanning, the result send will retry
+
+    def run_shard(self, shard):
+        cancelled, done = threading.Event(), threading.Event()
+        beat = threading.Thread(target=self._heartbeats, args=(shard, cancelled, done), daemon=True)
+        beat.start()
+        reply = {"op": "result", "shard_id": shard["shard_id"], "lease": shard["lease"]}
+        try:
+            reply["findings"], reply["timings"] = self.scan_shard(shard)
+        except Exception as e:
+            reply["error"] = f"{e.__class__.__name__}: {getattr(e, 'stderr', None) or e}"[:2000]
+        finally:
+            done.set()
+        if cancelled.is_set():
+            return
+        for attempt in range(5):
+            try:
+                self._send(reply)
+                return
+            except (OSError, ValueError):
+                time.sleep(2 ** attempt)
+
+    def run(self):
+        print(f"[✓] Worker {self.name} polling {self.coordinator}", flush=True)
+        while not self._stop.is_set():
+            try:
+                reply = self._send({"op": "next"})
+            except (OSError, ValueError) as e:
+                print(f"[✗] Coordinator unreachable: {e}", flush=True)
+                self._stop.wait(HEARTBEAT_SECONDS)
+                continue
+            self.heartbeat_seconds = reply.get("heartbeat", HEARTBEAT_SECONDS)
+            if reply["shard"] is None:
+                self._stop.wait(reply.get("wait", IDLE_WAIT_SECONDS))
+                continue
+            self.run_shard(reply["shard"])
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed LeakHawk scanning.")
+    parser.add_argument("--token", default=TOKEN, help="Shared secret required on every message")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_coord = sub.add_parser("coordinator", help="Split queued jobs into shards and serve them")
+    p_coord.add_argument("--host", default="127.0.0.1")
+    p_coord.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p_coord.add_argument("--data-dir", default="scan_artifacts", help="Holds jobs.db and the artifact store")
+    p_coord.add_argument("--shard-commits", type=int, default=SHARD_COMMITS)
+    p_coord.add_argument("--baseline", default=None, help="Baseline of accepted fingerprints (see baseline.py)")
+    p_worker = sub.add_parser("worker", help="Scan shards handed out by a coordinator")
+    p_worker.add_argument("--coordinator", default=f"127.0.0.1:{DEFAULT_PORT}")
+    p_worker.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "leakhawk-worker"),
+                          help="Cached bare clones")
+    p_worker.add_argument("--name", default=None)
+    p_submit = sub.add_parser("submit", help="Queue repositories for the cluster")
+    p_submit.add_argument("repo_urls", nargs="*")
+    p_submit.add_argument("--from-file", default=None, help="One repository URL per line")
+    p_submit.add_argument("--coordinator", default=f"127.0.0.1:{DEFAULT_PORT}")
+    p_status = sub.add_parser("status")
+    p_status.add_argument("--coordinator", default=f"127.0.0.1:{DEFAULT_PORT}")
+    args = parser.parse_args()
+
+    if args.command == "coordinator":
+        from artifact_store import ArtifactStore
+        from baseline import DEFAULT_BASELINE, Baseline
+        from jobstore import JobStore
+
+        data_dir = Path(args.data_dir)
+        coordinator = Coordinator(JobStore(data_dir / "jobs.db"), ArtifactStore(data_dir / "store"),
+                                  Baseline.load(args.baseline or DEFAULT_BASELINE), args.shard_commits)
+        serve_coordinator(coordinator, args.host, args.port, args.token)
+    elif args.command == "worker":
+        try:
+            Worker(args.coordinator, args.workdir, args.name, args.token).run()
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "submit":
+        urls = list(args.repo_urls)
+        if args.from_file:
+            with open(args.from_file, encoding="utf-8") as f:
+                urls += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        reply = request(args.coordinator, {"op": "submit", "repo_urls": urls}, args.token)
+        print(f"[✓] Queued {len(reply['jobs'])} job(s): {' '.join(reply['jobs'])}")
+    else:
+        print(json.dumps(request(args.coordinator, {"op": "status"}, args.token), indent=1))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
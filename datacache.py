@@ -0,0 +1,263 @@
+"""
+Columnar training-data cache for leakhawk_dataset.csv.
+
+The CSV is parsed once into an Arrow IPC file with explicit types
+(dictionary-encoded categoricals, narrow integers, dates) and each feature
+mode's train/test matrices are precomputed as CSR arrays in .npy files.
+Everything is memory-mapped on load, so iterating on models skips parsing,
+label encoding and featurization entirely.
+
+Each mode also keeps the split --search uses (training.validation_split
+of the training rows) with its own preprocessor, fitted on the training part
+only, so no validation row leaks into the features trials are selected on.
+
+Layout (one directory per source content hash):
+    .leakhawk_cache/<sha256[:16]>/manifest.json
+                                 /table.arrow
+                                 /<mode>/preprocessor.pkl, X_train.*.npy, X_test.*.npy, y_*.npy
+                                 /<mode>/search/preprocessor.pkl, X_{train,val,test}.*.npy, y_*.npy
+
+The encodings make table.arrow smaller than the CSV, but the precomputed
+feature matrices are not: the whole cache is many times the CSV's size
+(about 6 MB for a 420 KB CSV, 1.5 MB with --compress), traded for load
+time. By default nothing is block-compressed, because that forces a
+decompress copy and defeats zero-copy loads; --compress writes a
+zstd-compressed table and compressed .npz matrices for when disk matters
+more than load time.
+
+Run `python datacache.py` to (re)build the cache for every feature mode.
+"""
+import argparse
+import hashlib
+import json
+import shutil
+import time
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+
+CACHE_DIR = Path(".leakhawk_cache")
+CACHE_VERSION = 2
+CATEGORY_COLUMNS = ["Source_Platform", "Leak_Type", "Pattern_Matched", "Anomaly_Flag", "False_Positive"]
+
+CachedDataset = namedtuple(
+    "CachedDataset", "table label_encoder preprocessor X_train X_test y_train y_test search"
+)
+# --search's split of the training rows, featurized by a preprocessor fitted on X_train only
+SearchSplit = namedtuple("SearchSplit", "preprocessor X_train X_val X_test y_train y_val")
+
+
+def file_sha256(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _arrow_schema():
+    import pyarrow as pa
+    types = {c: pa.dictionary(pa.int32(), pa.string()) for c in CATEGORY_COLUMNS}
+    types.update({
+        "Leak_ID": pa.int64(),
+        "Data_Snippet": pa.string(),
+        "Risk_Score": pa.int8(),
+        "Date_Detected": pa.date32(),
+    })
+    return types
+
+
+def _save_csr(directory, name, X, compress=False):
+    X = sp.csr_matrix(X, dtype=np.float32)
+    parts = {"data": X.data, "indices": X.indices.astype(np.int32), "indptr": X.indptr.astype(np.int64)}
+    if compress:
+        np.savez_compressed(directory / f"{name}.npz", **parts)
+    else:
+        for part, values in parts.items():
+            np.save(directory / f"{name}.{part}.npy", values)
+    return list(X.shape)
+
+
+def _load_csr(directory, name, shape):
+    if (directory / f"{name}.npz").exists():
+        with np.load(directory / f"{name}.npz") as npz:
+            parts = [npz[p] for p in ("data", "indices", "indptr")]
+    else:
+        parts = [np.load(directory / f"{name}.{p}.npy", mmap_mode="r") for p in ("data", "indices", "indptr")]
+    return sp.csr_matrix(tuple(parts), shape=tuple(shape), copy=False)
+
+
+def cache_path(csv_path, cache_dir=CACHE_DIR, digest=None):
+    digest = digest or file_sha256(csv_path)
+    return Path(cache_dir) / digest[:16]
+
+
+def build_cache(csv_path, modes=("tfidf", "hashed"), cache_dir=CACHE_DIR, compress=False):
+    """
+    Parse, encode and featurize `csv_path` once; returns the cache directory.
+    `compress` trades zero-copy loads for a smaller cache (see above).
+    """
+    import joblib
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    from sklearn.preprocessing import LabelEncoder
+
+    from training import build_preprocessor, split_dataset, validation_split
+
+    digest = file_sha256(csv_path)
+    target = cache_path(csv_path, cache_dir, digest)
+    tmp = target.with_name(target.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    try:
+        table = pacsv.read_csv(csv_path, convert_options=pacsv.ConvertOptions(column_types=_arrow_schema()))
+        with pa.OSFile(str(tmp / "table.arrow"), "wb") as sink:
+            options = pa.ipc.IpcWriteOptions(compression="zstd" if compress else None)
+            with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
+
+        df = table.to_pandas()
+        for col in CATEGORY_COLUMNS:
+            df[col] = df[col].astype(str)
+        manifest = {
+            "version": CACHE_VERSION,
+            "source": str(Path(csv_path).resolve()),
+            "sha256": digest,
+            "rows": table.num_rows,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "compressed": compress,
+            "modes": {},
+        }
+        for mode in modes:
+            mode_dir = tmp / mode
+            mode_dir.mkdir()
+            label_encoder = LabelEncoder()
+            X_train, X_test, y_train, y_test = split_dataset(df, label_encoder)
+            preprocessor = build_preprocessor(mode).fit(X_train)
+            manifest["modes"][mode] = {
+                "classes": [str(c) for c in label_encoder.classes_],
+                "X_train": _save_csr(mode_dir, "X_train", preprocessor.transform(X_train), compress),
+                "X_test": _save_csr(mode_dir, "X_test", preprocessor.transform(X_test), compress),
+            }
+            np.save(mode_dir / "y_train.npy", np.asarray(y_train))
+            np.save(mode_dir / "y_test.npy", np.asarray(y_test))
+            joblib.dump(preprocessor, mode_dir / "preprocessor.pkl")
+            joblib.dump(label_encoder, mode_dir / "label_encoder.pkl")
+
+            search_dir = mode_dir / "search"
+            search_dir.mkdir()
+            X_tr, X_val, y_tr, y_val = validation_split(X_train, y_train)
+            search_preprocessor = build_preprocessor(mode).fit(X_tr)
+            manifest["modes"][mode]["search"] = {
+                name: _save_csr(search_dir, name, search_preprocessor.transform(X), compress)
+                for name, X in (("X_train", X_tr), ("X_val", X_val), ("X_test", X_test))
+            }
+            np.save(search_dir / "y_train.npy", np.asarray(y_tr))
+            np.save(search_dir / "y_val.npy", np.asarray(y_val))
+            joblib.dump(search_preprocessor, search_dir / "preprocessor.pkl")
+
+        (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    # Swap in atomically, then drop caches of older contents of the same source
+    shutil.rmtree(target, ignore_errors=True)
+    tmp.rename(target)
+    for other in Path(cache_dir).glob("*/manifest.json"):
+        if other.parent == target:
+            continue
+        try:
+            if json.loads(other.read_text(encoding="utf-8")).get("source") == manifest["source"]:
+                shutil.rmtree(other.parent, ignore_errors=True)
+        except (OSError, ValueError):
+            pass
+    return target
+
+
+def load_cache(csv_path, mode="tfidf", cache_dir=CACHE_DIR, build=True):
+    """
+    Memory-map the cache for `csv_path`, building it first when the CSV
+    content hash has no valid cache (or returning None if `build` is False).
+    """
+    import joblib
+    import pyarrow as pa
+
+    target = cache_path(csv_path, cache_dir)
+    manifest_file = target / "manifest.json"
+    manifest = None
+    if manifest_file.exists():
+        manifest = json.loads(manifest_file.read_text(encoding="utf-8"))
+        if manifest.get("version") != CACHE_VERSION or mode not in manifest["modes"]:
+            manifest = None
+    if manifest is None:
+        if not build:
+            return None
+        previous = json.loads(manifest_file.read_text(encoding="utf-8")) if manifest_file.exists() else {}
+        build_cache(csv_path, sorted(set(previous.get("modes", ())) | {mode}), cache_dir,
+                    compress=previous.get("compressed", False))
+        manifest = json.loads(manifest_file.read_text(encoding="utf-8"))
+
+    table = pa.ipc.open_file(pa.memory_map(str(target / "table.arrow"))).read_all()
+    mode_dir = target / mode
+    search_dir = mode_dir / "search"
+    info = manifest["modes"][mode]
+    search = SearchSplit(
+        preprocessor=joblib.load(search_dir / "preprocessor.pkl"),
+        X_train=_load_csr(search_dir, "X_train", info["search"]["X_train"]),
+        X_val=_load_csr(search_dir, "X_val", info["search"]["X_val"]),
+        X_test=_load_csr(search_dir, "X_test", info["search"]["X_test"]),
+        y_train=np.load(search_dir / "y_train.npy", mmap_mode="r"),
+        y_val=np.load(search_dir / "y_val.npy", mmap_mode="r"),
+    )
+    return CachedDataset(
+        table=table,
+        label_encoder=joblib.load(mode_dir / "label_encoder.pkl"),
+        preprocessor=joblib.load(mode_dir / "preprocessor.pkl"),
+        X_train=_load_csr(mode_dir, "X_train", info["X_train"]),
+        X_test=_load_csr(mode_dir, "X_test", info["X_test"]),
+        y_train=np.load(mode_dir / "y_train.npy", mmap_mode="r"),
+        y_test=np.load(mode_dir / "y_test.npy", mmap_mode="r"),
+        search=search,
+    )
+
+
+def main():
+    import pandas as pd
+    from sklearn.preprocessing import LabelEncoder
+
+    from training import FEATURE_MODES, build_preprocessor, split_dataset
+
+    parser = argparse.ArgumentParser(description="Build the columnar training-data cache.")
+    parser.add_argument("--data", default="leakhawk_dataset.csv")
+    parser.add_argument("--modes", default=",".join(FEATURE_MODES))
+    parser.add_argument("--cache-dir", default=str(CACHE_DIR))
+    parser.add_argument("--compress", action="store_true",
+                        help="zstd table and compressed matrices: smaller on disk, no zero-copy loads")
+    args = parser.parse_args()
+    modes = [m for m in args.modes.split(",") if m]
+
+    t0 = time.perf_counter()
+    target = build_cache(args.data, modes, args.cache_dir, compress=args.compress)
+    build_s = time.perf_counter() - t0
+    size_kb = sum(p.stat().st_size for p in target.rglob("*") if p.is_file()) / 1024
+    print(f"[✓] Cache built in {build_s:.2f}s at {target} ({size_kb:,.0f} KB, CSV {Path(args.data).stat().st_size / 1024:,.0f} KB)")
+
+    for mode in modes:
+        t0 = time.perf_counter()
+        load_cache(args.data, mode, args.cache_dir, build=False)
+        cached_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        df = pd.read_csv(args.data)
+        X_train, X_test, _, _ = split_dataset(df, LabelEncoder())
+        pre = build_preprocessor(mode).fit(X_train)
+        pre.transform(X_train), pre.transform(X_test)
+        fresh_s = time.perf_counter() - t0
+        print(f"    {mode:7s} load from cache {cached_s * 1e3:8.1f} ms  vs parse+featurize {fresh_s * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
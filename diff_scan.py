@@ -0,0 +1,148 @@
+"""
+Scan only what a change adds: the staged diff or a commit range.
+
+`git diff --cached -U0` (or `git log -p -U0` for a range) lists exactly the
+added lines of each hunk with their line numbers in the new file, so the
+rules (rules.py) run over a few hundred bytes instead of a checkout or its
+history. Paths excluded by the repo's path filter (.leakhawkignore) are
+skipped and baselined findings (baseline.py) are dropped, as in full scans.
+
+Line numbers and fingerprints match what a full scan of the resulting tree
+(staged) or history (range) reports, so baselines carry over.
+
+This module only imports the rules; precommit.py runs it inside a warm
+daemon with the model loaded.
+
+    python diff_scan.py                        # staged changes of the current repo
+    python diff_scan.py --range origin/main..HEAD
+    python diff_scan.py --range abc123^!       # one commit
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+from rules import scan_bytes
+
+_HUNK = re.compile(rb"^@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@")
+# Commit header line of `git log` below; cannot start a diff line
+_COMMIT_MARK = b"\x01"
+_LOG_FORMAT = "--format=%x01%H%x1f%an%x1f%ae%x1f%aI%x1f%s"
+_DIFF_ARGS = ["-U0", "--no-color", "--no-ext-diff", "--no-renames"]
+
+
+def repo_root(path="."):
+    result = subprocess.run(["git", "-C", path, "rev-parse", "--show-toplevel"],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise ValueError(result.stderr.strip() or f"{path} is not a git repository")
+    return result.stdout.strip()
+
+
+def git_diff(root, rev_range=None, commits=None):
+    """
+    Raw -U0 patch of the staged changes, of every commit in `rev_range`, or
+    of exactly the given `commits` (a shard, see cluster.py).
+    """
+    git = ["git", "-C", root, "-c", "core.quotePath=false"]
+    stdin = None
+    if commits:
+        cmd = git + ["log", "-p", "--no-walk=unsorted", "--stdin", _LOG_FORMAT, *_DIFF_ARGS]
+        stdin = "\n".join(commits).encode() + b"\n"
+    elif rev_range:
+        cmd = git + ["log", "-p", _LOG_FORMAT, *_DIFF_ARGS, rev_range]
+    else:
+        cmd = git + ["diff", "--cached", *_DIFF_ARGS]
+    result = subprocess.run(cmd, input=stdin, capture_output=True)
+    if result.returncode != 0:
+        raise ValueError(result.stderr.decode("utf-8", errors="replace").strip())
+    return result.stdout
+
+
+def _path(header):
+    """New-side path from a '+++ b/path' line; None for deleted files."""
+    name = header[4:].rstrip(b"\r")
+    if name.startswith(b'"') and name.endswith(b'"'):
+        name = name[1:-1]
+    if name == b"/dev/null":
+        return None
+    return name[2:].decode("utf-8", errors="replace")
+
+
+def iter_hunks(patch):
+    """
+    Yield (commit_meta, path, first_line, added_bytes) per hunk with added
+    lines. commit_meta holds Gitleaks' git fields for `git log` output and
+    is empty for a staged diff.
+    """
+    meta, path, first, added = {}, None, None, []
+    for line in patch.split(b"\n"):
+        if line[:1] == b"+" and first is not None:
+            # Inside a hunk ("+++" here is an added line starting with "++")
+            if path is not None:
+                added.append(line[1:])
+            continue
+        if added:
+            yield meta, path, first, b"\n".join(added) + b"\n"
+            added = []
+        if line.startswith(b"@@ "):
+            m = _HUNK.match(line)
+            first = int(m.group(1)) if m else None
+        elif line.startswith(b"+++ "):
+            path, first = _path(line), None
+        elif line.startswith(b"diff --git "):
+            path, first = None, None
+        elif line.startswith(_COMMIT_MARK):
+            commit, author, email, date, subject = (line[1:].decode("utf-8", errors="replace").split("\x1f") + [""] * 5)[:5]
+            meta = {"Commit": commit, "Author": author, "Email": email, "Date": date, "Message": subject}
+            path, first = None, None
+    if added:
+        yield meta, path, first, b"\n".join(added) + b"\n"
+
+
+def scan_patch(patch, path_filter=None, entropy=False):
+    """Findings for the added lines of a -U0 patch (see iter_hunks)."""
+    findings = []
+    for meta, path, first, added in iter_hunks(patch):
+        if path_filter is not None and path_filter.path_excluded(path):
+            continue
+        findings += scan_bytes(added, path, entropy=entropy, first_line=first, **meta)
+    return findings
+
+
+def scan_changes(root, rev_range=None, entropy=False, baseline_path=None):
+    """
+    (new findings, suppressed count) for the staged diff or `rev_range` of
+    the repo at `root`, after the repo's path filter and baseline.
+    """
+    from baseline import DEFAULT_BASELINE, Baseline
+    from path_filter import PathFilter
+
+    findings = scan_patch(git_diff(root, rev_range), PathFilter.for_repo(root), entropy)
+    if not findings:
+        return [], 0
+    return Baseline.for_repo(root, baseline_path or os.path.join(root, DEFAULT_BASELINE)).split(findings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan the staged diff or a commit range for secrets.")
+    parser.add_argument("repo", nargs="?", default=".")
+    parser.add_argument("--range", default=None, help="Commit range, e.g. origin/main..HEAD (default: staged changes)")
+    parser.add_argument("--entropy", action="store_true", help="Also report high-entropy tokens")
+    parser.add_argument("-b", "--baseline", default=None)
+    args = parser.parse_args()
+
+    try:
+        findings, suppressed = scan_changes(repo_root(args.repo), args.range, args.entropy, args.baseline)
+    except ValueError as e:
+        print(f"[✗] {e}", file=sys.stderr)
+        return 2
+    json.dump(findings, sys.stdout, indent=1)
+    print(f"\n[{'✗' if findings else '✓'}] {len(findings)} finding(s), {suppressed} baselined", file=sys.stderr)
+    return 1 if findings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
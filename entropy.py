@@ -0,0 +1,216 @@
+"""
+High-entropy token detector, vectorized with NumPy.
+
+Candidate tokens are maximal runs of a charset (base64, hex, ...) found with
+one bytes.translate pass and one vectorized edge scan. Tokens longer than WINDOW are cut into
+overlapping windows, and every token/window of a batch gets its byte
+histogram from a single np.bincount over (row, symbol) codes. Entropies
+are then one batched log2 over the histogram matrix. A token is reported
+when its best window reaches the detector's threshold.
+
+Random hex tops out at 4 bits/char, so a threshold cannot tell a hex
+secret from a git SHA or a sha256 digest: hex tokens of exactly 40 or 64
+characters are skipped (the detector's skip_lengths). The trade-off is that
+hex secrets of those exact lengths (e.g. 40-char legacy GitHub tokens,
+64-char hex keys) are left to the regex rules. Lockfiles, where most
+checksums live, are already excluded by the path filter.
+
+Findings come out in the Gitleaks schema with RuleID "high-entropy-<charset>"
+(classifier.flag_anomaly already knows the prefix), via rules.make_finding.
+
+    python entropy.py --mb 32          # benchmark vs a pure-Python per-token loop
+"""
+import argparse
+import math
+import re
+import time
+from collections import Counter, namedtuple
+
+import numpy as np
+
+from rules import Rule
+
+WINDOW = 32
+STRIDE = 16
+# Token/window bytes whose histograms are built in one bincount
+BATCH_BYTES = 256 * 1024
+
+# skip_lengths: exact token lengths never reported (digests, not secrets)
+Detector = namedtuple("Detector", "name charset min_len threshold require_digit skip_lengths", defaults=((),))
+
+DETECTORS = [
+    Detector("base64", b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=", 20, 4.5, True),
+    # SHA-1 (commit ids) and SHA-256 digests
+    Detector("hex", b"0123456789abcdefABCDEF", 32, 3.5, True, (40, 64)),
+]
+
+_DIGITS = np.zeros(256, dtype=bool)
+_DIGITS[np.frombuffer(b"0123456789", dtype=np.uint8)] = True
+
+
+def _rule(detector):
+    return Rule(f"high-entropy-{detector.name}",
+                f"High-entropy {detector.name} string (>= {detector.threshold} bits/char), possibly a secret.",
+                None, (), 0, detector.threshold, False)
+
+
+def _tables(detector):
+    # bytes.translate table mapping charset bytes to 1 and everything else to 0
+    member = bytes(1 if b in detector.charset else 0 for b in range(256))
+    # Symbol index inside the charset, so histograms are len(charset) wide instead of 256
+    code = np.zeros(256, dtype=np.int64)
+    code[np.frombuffer(detector.charset, dtype=np.uint8)] = np.arange(len(detector.charset))
+    return member, code
+
+
+def window_entropies(arr, starts, lengths, code, n_symbols):
+    """Shannon entropy (bits/char) of arr[s:s+l] for every (s, l), batched."""
+    out = np.empty(len(starts), dtype=np.float64)
+    if not len(starts):
+        return out
+    # H = log2(n) - sum(c * log2(c)) / n, with c * log2(c) looked up per count
+    clog = np.arange(int(lengths.max()) + 1, dtype=np.float64)
+    clog[1:] *= np.log2(clog[1:])
+    cum = np.cumsum(lengths)
+    i = 0
+    while i < len(starts):
+        # Batches of ~BATCH_BYTES token bytes keep the (rows x symbols) histogram in cache
+        j = max(i + 1, int(np.searchsorted(cum, (cum[i - 1] if i else 0) + BATCH_BYTES)))
+        s, l = starts[i:j], lengths[i:j]
+        rows = np.repeat(np.arange(len(s)), l)
+        pos = np.arange(int(l.sum())) - np.repeat(np.cumsum(l) - l, l) + np.repeat(s, l)
+        counts = np.bincount(rows * n_symbols + code[arr[pos]], minlength=len(s) * n_symbols)
+        out[i:j] = np.log2(l) - clog[counts].reshape(len(s), n_symbols).sum(axis=1) / l
+        i = j
+    return out
+
+
+def find_high_entropy(chunk, base=0, limit=None, prev_byte=None, detectors=DETECTORS):
+    """
+    Yield (rule, start, end, token) like rules.find_matches for high-entropy
+    tokens in `chunk` (bytes). Offsets are shifted by `base`; only tokens
+    starting before `limit` (absolute) are kept, and a token touching the
+    chunk start is dropped when `prev_byte` shows it began in the previous chunk.
+    """
+    chunk = bytes(chunk)
+    arr = np.frombuffer(chunk, dtype=np.uint8)
+    if not len(arr):
+        return
+    limit = base + len(arr) if limit is None else limit
+    for det in detectors:
+        member, code = _tables(det)
+        # Charset mask via bytes.translate (C speed), then run edges where it toggles
+        mask = np.frombuffer(chunk.translate(member), dtype=bool)
+        toggles = np.flatnonzero(mask[1:] != mask[:-1]) + 1
+        if mask[0]:
+            toggles = np.concatenate(([0], toggles))
+        if mask[-1]:
+            toggles = np.concatenate((toggles, [len(mask)]))
+        starts, ends = toggles[0::2], toggles[1::2]
+        keep = (ends - starts >= det.min_len) & (starts + base < limit)
+        if det.skip_lengths:
+            keep &= ~np.isin(ends - starts, det.skip_lengths)
+        if prev_byte is not None and member[prev_byte]:
+            keep &= starts > 0
+        starts, ends = starts[keep], ends[keep]
+        if det.require_digit and len(starts):
+            lengths = ends - starts
+            rows = np.repeat(np.arange(len(starts)), lengths)
+            pos = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+            has_digit = np.bincount(rows, weights=_DIGITS[arr[pos]], minlength=len(starts)) > 0
+            starts, ends = starts[has_digit], ends[has_digit]
+        if not len(starts):
+            continue
+
+        # Expand long tokens into WINDOW-sized windows every STRIDE bytes
+        lengths = ends - starts
+        n_win = np.where(lengths > WINDOW, (lengths - WINDOW + STRIDE - 1) // STRIDE + 1, 1)
+        first = np.cumsum(n_win) - n_win
+        owner = np.repeat(np.arange(len(starts)), n_win)
+        step = np.arange(len(owner)) - np.repeat(first, n_win)
+        w_len = np.minimum(lengths[owner], WINDOW)
+        w_start = np.minimum(starts[owner] + step * STRIDE, ends[owner] - w_len)
+        ent = window_entropies(arr, w_start, w_len, code, len(det.charset))
+        best = np.maximum.reduceat(ent, first)
+
+        rule = _rule(det)
+        hits = np.flatnonzero(best >= det.threshold)
+        for s, e in zip(starts[hits].tolist(), ends[hits].tolist()):
+            yield rule, base + s, base + e, chunk[s:e]
+
+
+# ---------- pure-Python reference (benchmark and parity check) ----------
+
+def _py_entropy(token):
+    n = len(token)
+    return -sum(c / n * math.log2(c / n) for c in Counter(token).values())
+
+
+def find_high_entropy_python(chunk, detectors=DETECTORS):
+    """Same results as find_high_entropy, one token at a time."""
+    for det in detectors:
+        pattern = re.compile(b"[" + re.escape(det.charset) + b"]{%d,}" % det.min_len)
+        rule = _rule(det)
+        for m in pattern.finditer(chunk):
+            token = m.group()
+            if len(token) in det.skip_lengths:
+                continue
+            if det.require_digit and not any(48 <= b <= 57 for b in token):
+                continue
+            if len(token) <= WINDOW:
+                best = _py_entropy(token)
+            else:
+                offsets = list(range(0, len(token) - WINDOW + 1, STRIDE))
+                if offsets[-1] != len(token) - WINDOW:
+                    offsets.append(len(token) - WINDOW)
+                best = max(_py_entropy(token[o:o + WINDOW]) for o in offsets)
+            if best >= det.threshold - 1e-9:
+                yield rule, m.start(), m.end(), token
+
+
+def synthetic_text(n_bytes, seed=0):
+    """
+    Source/lockfile-like text: code lines, commit SHAs (skipped by length)
+    and integrity hashes (many candidate tokens) and a few random secrets.
+    """
+    rng = np.random.default_rng(seed)
+    words = [b"def", b"return", b"self", b"config", b"value", b"import", b"os", b"path", b"=", b"(", b")",
+             b"if", b"else", b"for", b"in", b"range", b"print", b"user_id", b"timestamp", b"0", b"1", b"42"]
+    b64 = np.frombuffer(DETECTORS[0].charset[:-3], dtype=np.uint8)
+    hexdigits = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+    out, size = [], 0
+    while size < n_bytes:
+        line = b" ".join(words[i] for i in rng.integers(0, len(words), rng.integers(3, 12)))
+        r = rng.random()
+        if r < 0.01:
+            line += b' = "' + bytes(rng.choice(b64, rng.integers(24, 64))) + b'"'
+        elif r < 0.25:
+            line += b" resolved " + bytes(rng.choice(hexdigits, 40))
+        elif r < 0.40:
+            line += b" version2" + bytes(rng.choice(b64[:26], rng.integers(20, 120)))
+        out.append(line + b"\n")
+        size += len(out[-1])
+    return b"".join(out)[:n_bytes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized entropy detector.")
+    parser.add_argument("--mb", type=float, default=16, help="Size of the synthetic corpus")
+    args = parser.parse_args()
+
+    data = synthetic_text(int(args.mb * 1024 * 1024))
+    t0 = time.perf_counter()
+    fast = [(r.id, s, e) for r, s, e, _ in find_high_entropy(data)]
+    fast_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    slow = [(r.id, s, e) for r, s, e, _ in find_high_entropy_python(data)]
+    slow_s = time.perf_counter() - t0
+
+    mb = len(data) / 1e6
+    print(f"[✓] {len(fast)} high-entropy tokens in {mb:.1f} MB; results {'match' if sorted(fast) == sorted(slow) else 'DIFFER'}")
+    print(f"    numpy        {mb / fast_s:8.1f} MB/s")
+    print(f"    pure python  {mb / slow_s:8.1f} MB/s  ({slow_s / fast_s:.1f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Compact in-memory representation of Gitleaks findings.
+
+A Finding is a slotted, read-only record that behaves like the dict it was
+built from (`f["File"]`, `f.get("RuleID")`, `dict(f)`, iteration), so code
+written against plain findings keeps working. Compared with a dict:
+
+  * no per-finding hash table: the 19 fields live in one tuple;
+  * repeated strings (rule, file, commit, author, email, message, date, ...)
+    are interned, so every finding of a commit shares one copy;
+  * Fingerprint and Link are not stored when they follow Gitleaks' own
+    format ("<commit>:<file>:<rule>:<line>", "<repo>/blob/<commit>/<file>#L<line>");
+    they are rebuilt on access from the other fields.
+
+load_findings() parses a Gitleaks JSON report incrementally, turning each
+object into a Finding as soon as it is decoded, so the full list of dicts
+never exists at once.
+
+    python finding_record.py gitleaks-report.json     # compare memory with plain dicts
+"""
+import json
+import sys
+from collections.abc import Mapping
+
+FIELDS = (
+    "RuleID", "Description", "StartLine", "EndLine", "StartColumn", "EndColumn",
+    "Match", "Secret", "File", "SymlinkFile", "Commit", "Link", "Entropy",
+    "Author", "Email", "Date", "Message", "Tags", "Fingerprint",
+)
+# Values shared by many findings of the same repo/commit
+INTERNED_FIELDS = frozenset((
+    "RuleID", "Description", "File", "SymlinkFile", "Commit", "Author", "Email", "Date", "Message",
+))
+_FIELD_SET = frozenset(FIELDS)
+_INDEX = {name: i for i, name in enumerate(FIELDS)}
+_INTERNED_IDX = tuple(_INDEX[name] for name in INTERNED_FIELDS)
+_TAGS, _LINK, _FINGERPRINT = _INDEX["Tags"], _INDEX["Link"], _INDEX["Fingerprint"]
+_MISSING = object()
+_tag_pool = {}
+
+
+class Finding(Mapping):
+    """Read-only, dict-compatible Gitleaks finding backed by one tuple of field values."""
+
+    __slots__ = ("_values", "_link_prefix", "_extra")
+
+    def __init__(self, fields):
+        intern = sys.intern
+        values = [fields.get(name, _MISSING) for name in FIELDS]
+        for i in _INTERNED_IDX:
+            if type(values[i]) is str:
+                values[i] = intern(values[i])
+        if type(values[_TAGS]) is list:
+            tags = tuple(values[_TAGS])
+            values[_TAGS] = _tag_pool.setdefault(tags, tags)
+
+        # Drop the two per-finding strings Gitleaks derives from other fields
+        get = fields.get
+        link_prefix = None
+        if values[_FINGERPRINT] == f"{get('Commit')}:{get('File')}:{get('RuleID')}:{get('StartLine')}":
+            values[_FINGERPRINT] = None
+        link = values[_LINK]
+        if type(link) is str:
+            suffix = f"/blob/{get('Commit')}/{get('File')}#L{get('StartLine')}"
+            if link.endswith(suffix) and len(link) > len(suffix):
+                link_prefix = intern(link[:-len(suffix)])
+                values[_LINK] = None
+
+        set_ = object.__setattr__
+        set_(self, "_values", tuple(values))
+        set_(self, "_link_prefix", link_prefix)
+        set_(self, "_extra", None if _FIELD_SET.issuperset(fields)
+             else {k: v for k, v in fields.items() if k not in _FIELD_SET})
+
+    @classmethod
+    def from_dict(cls, d):
+        return d if isinstance(d, cls) else cls(d)
+
+    def __getitem__(self, key):
+        i = _INDEX.get(key)
+        if i is None:
+            if self._extra and key in self._extra:
+                return self._extra[key]
+            raise KeyError(key)
+        value = self._values[i]
+        if value is _MISSING:
+            raise KeyError(key)
+        if value is None:
+            v = self._values
+            if i == _FINGERPRINT:
+                return f"{v[_INDEX['Commit']]}:{v[_INDEX['File']]}:{v[_INDEX['RuleID']]}:{v[_INDEX['StartLine']]}"
+            if i == _LINK and self._link_prefix is not None:
+                return f"{self._link_prefix}/blob/{v[_INDEX['Commit']]}/{v[_INDEX['File']]}#L{v[_INDEX['StartLine']]}"
+        elif i == _TAGS and type(value) is tuple:
+            return list(value)
+        return value
+
+    def __iter__(self):
+        for name, value in zip(FIELDS, self._values):
+            if value is not _MISSING:
+                yield name
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Finding is read-only; use dict(finding) for a mutable copy")
+
+    def __reduce__(self):
+        return (Finding, (dict(self),))
+
+    def __repr__(self):
+        return f"Finding({dict(self)!r})"
+
+    def to_dict(self):
+        return dict(self)
+
+
+def json_default(obj):
+    """`default=` hook for json.dumps so Finding records serialize like dicts."""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    return str(obj)
+
+
+def to_findings(findings):
+    """Convert a list of finding dicts into Finding records (non-dicts are dropped)."""
+    return [Finding.from_dict(f) for f in findings if isinstance(f, Mapping)]
+
+
+def iter_findings(fp, chunk_size=1 << 20):
+    """
+    Decode a Gitleaks JSON report (array of objects, or a single object)
+    from a text file object one finding at a time.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    while True:
+        # Skip whitespace and array punctuation between objects
+        while pos < len(buf) and buf[pos] in " \t\r\n,[]":
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                return
+            buf = fp.read(chunk_size)
+            pos = 0
+            eof = not buf
+            continue
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more = fp.read(chunk_size)
+            eof = not more
+            buf = buf[pos:] + more
+            pos = 0
+            continue
+        pos = end
+        if isinstance(obj, dict):
+            yield Finding(obj)
+        if pos > chunk_size:
+            buf = buf[pos:]
+            pos = 0
+
+
+def load_findings(path):
+    """Parse a Gitleaks JSON report into a list of Finding records."""
+    with open(path, "r", encoding="utf-8") as f:
+        return list(iter_findings(f))
+
+
+def main():
+    import time
+    import tracemalloc
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "gitleaks-report.json"
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with open(path, "r", encoding="utf-8") as f:
+        plain = json.load(f)
+    plain_s = time.perf_counter() - t0
+    plain_bytes = tracemalloc.get_traced_memory()[0]
+    del plain
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    records = load_findings(path)
+    record_s = time.perf_counter() - t0
+    record_bytes, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"[✓] {len(records):,} findings")
+    print(f"    dicts   {plain_bytes / 1e6:8.1f} MB  ({plain_s:.2f}s)")
+    print(f"    records {record_bytes / 1e6:8.1f} MB  peak {peak / 1e6:.1f} MB  ({record_s:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Filter, sort and page through a scan's findings without rendering them all.
+
+mllh.py used to put every finding into an HTML table, a second
+st.dataframe and a JSON dump, which stalls both the server and the browser
+at tens of thousands of findings. FindingsView is built once per result
+(kept in st.session_state) and answers each widget change from indexes:
+
+- every indexed column (rule, file, author, predicted type, risk, tier) is
+  dictionary-encoded: sorted distinct values, an int code per finding and
+  the positions holding each code (a posting list);
+- a filter is a union of posting lists per column and an intersection
+  across columns; a file search matches the distinct paths, not the rows;
+- sort orders are argsort permutations, computed once per key.
+
+Only the rows of the requested page are turned into display dicts, so
+render time and memory per rerun do not grow with the result set.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from classifier import flag_anomaly, prob_to_risk
+
+DEFAULT_PAGE_SIZE = 50
+PAGE_SIZES = (25, 50, 100, 250)
+Page = namedtuple("Page", "positions total page pages")
+
+
+def _truncate(text, n):
+    return text[:n] + "..." if len(text) > n else text
+
+
+class FindingsView:
+    """Indexed view over findings plus optional per-finding ML predictions (ui_scans.predict)."""
+
+    def __init__(self, findings, labels=None, confidences=None, tiers=None):
+        self.findings = findings
+        self.has_ml = labels is not None
+        columns = {
+            "Rule": [f.get("RuleID", "N/A") for f in findings],
+            "File": [f.get("File", "N/A") for f in findings],
+            "Author": [f.get("Author", "N/A") or "N/A" for f in findings],
+        }
+        self.numeric = {"Line": np.array([int(f.get("StartLine") or 0) for f in findings], dtype=np.int64)}
+        if self.has_ml:
+            self.labels = [str(label) for label in labels]
+            self.numeric["Confidence"] = np.asarray(confidences, dtype=np.float64)
+            columns["Predicted_Type"] = self.labels
+            columns["Risk"] = [prob_to_risk(c) for c in self.numeric["Confidence"]]
+            columns["Tier"] = list(tiers) if tiers is not None else ["full"] * len(findings)
+        self.values, self.codes, self._lookup, self._postings = {}, {}, {}, {}
+        # (sort key, descending) -> permutation
+        self._orders = {}
+        for name, column in columns.items():
+            self._index(name, column)
+
+    def __len__(self):
+        return len(self.findings)
+
+    def _index(self, name, column):
+        values = sorted(set(column))
+        lookup = {v: i for i, v in enumerate(values)}
+        codes = np.fromiter((lookup[v] for v in column), dtype=np.int32, count=len(column))
+        # Positions grouped by code: the posting list of code c is order[starts[c]:starts[c + 1]]
+        order = np.argsort(codes, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(values)))))
+        self.values[name], self.codes[name], self._lookup[name] = values, codes, lookup
+        self._postings[name] = (order, starts)
+        # Codes follow the sorted values, so this is also the column's sort order
+        self._orders[(name, False)] = order
+
+    def postings(self, name, value):
+        """Positions of the findings whose `name` column equals value."""
+        i = self._lookup[name].get(value)
+        if i is None:
+            return np.empty(0, dtype=np.int64)
+        order, starts = self._postings[name]
+        return order[starts[i]:starts[i + 1]]
+
+    def counts(self, name):
+        """{value: number of findings} for an indexed column."""
+        _, starts = self._postings[name]
+        return dict(zip(self.values[name], np.diff(starts).tolist()))
+
+    def filterable(self):
+        return [name for name in self.values if name != "File"]
+
+    def sort_keys(self):
+        keys = ["Risk", "Confidence"] if self.has_ml else []
+        return keys + ["Rule", "File", "Line", "Author"] + (["Predicted_Type"] if self.has_ml else [])
+
+    def _order(self, key, descending):
+        if (key, descending) not in self._orders:
+            values = self.numeric[key] if key in self.numeric else self.codes[key]
+            # Stable either way: ties keep scan order
+            self._orders[(key, descending)] = np.argsort(-values if descending else values, kind="stable")
+        return self._orders[(key, descending)]
+
+    def _mask(self, filters, file_search):
+        mask = None
+        for name, wanted in (filters or {}).items():
+            if not wanted:
+                continue
+            hit = np.zeros(len(self), dtype=bool)
+            for value in wanted:
+                hit[self.postings(name, value)] = True
+            mask = hit if mask is None else mask & hit
+        if file_search:
+            needle = file_search.lower()
+            codes = [i for i, path in enumerate(self.values["File"]) if needle in path.lower()]
+            hit = np.isin(self.codes["File"], codes)
+            mask = hit if mask is None else mask & hit
+        return mask
+
+    def query(self, filters=None, file_search="", sort=None, descending=True, page=1,
+              page_size=DEFAULT_PAGE_SIZE):
+        """
+        One page of matching positions. `filters` maps indexed columns to
+        accepted values; `sort` defaults to risk then confidence with ML, scan
+        order without.
+        """
+        mask = self._mask(filters, file_search)
+        if sort is None and self.has_ml:
+            if (None, True) not in self._orders:
+                self._orders[(None, True)] = np.lexsort((-self.numeric["Confidence"], -self.codes["Risk"]))
+            order = self._orders[(None, True)]
+        elif sort is None:
+            order = np.arange(len(self))
+        else:
+            order = self._order(sort, descending)
+        matches = order if mask is None else order[mask[order]]
+        total = len(matches)
+        pages = max(1, -(-total // page_size))
+        page = min(max(1, int(page)), pages)
+        return Page(matches[(page - 1) * page_size:page * page_size], total, page, pages)
+
+    def rows(self, positions):
+        """Display dicts for the given positions (one page); same fields as the former full tables."""
+        rows = []
+        for i in positions:
+            f = self.findings[i]
+            secret = f.get("Match", "") or f.get("Secret", "")
+            start_line, end_line = f.get("StartLine", ""), f.get("EndLine", "")
+            commit = f.get("Commit", "N/A") or "N/A"
+            row = {
+                "Rule_ID": f.get("RuleID", "N/A"),
+                "File": f.get("File", "N/A"),
+                "Line": f"{start_line}-{end_line}" if start_line and end_line else start_line,
+                "Match/Secret": _truncate(secret, 100),
+                "Description": _truncate(f.get("Description", "N/A") or "N/A", 80),
+                "Commit": commit[:12] if commit != "N/A" else commit,
+                "Author": f.get("Author", "N/A"),
+                "Email": f.get("Email", "N/A"),
+                "Commit_Date": (f.get("Date", "N/A") or "N/A").split("T")[0],
+                "Commit_Message": _truncate(f.get("Message", "N/A") or "N/A", 50),
+                "Link": f.get("Link", ""),
+            }
+            if self.has_ml:
+                conf = float(self.numeric["Confidence"][i])
+                row = {"Rule_ID": row["Rule_ID"], "Predicted_Type": self.labels[i],
+                       "Confidence": round(conf, 3), "Risk_Score(1-10)": prob_to_risk(conf), **row,
+                       "Anomaly_Flag": flag_anomaly(row["Rule_ID"], self.labels[i], conf),
+                       "Tier": self.values["Tier"][self.codes["Tier"][i]]}
+            rows.append(row)
+        return rows
+
+    def iter_rows(self, batch_size=1000):
+        """All display rows in scan order, built a batch at a time (for CSV export)."""
+        for start in range(0, len(self), batch_size):
+            yield from self.rows(range(start, min(start + batch_size, len(self))))
@@ -1,45 +1,29 @@
 import streamlit as st
-import subprocess
-import os
-import shutil
 import json
+import uuid
 from datetime import datetime
 import base64
+from finding_record import json_default
+import ui_scans
 
-# =============== UTILITY FUNCTIONS ===============
+# Seconds between progress refreshes while the scan runs
+JOB_POLL_SECONDS = 1.5
 
-def clone_repo(repo_url, clone_dir="repo-temp"):
-    if os.path.exists(clone_dir):
-        shutil.rmtree(clone_dir)
-    subprocess.run(["git", "clone", repo_url, clone_dir], check=True)
-    return clone_dir
-
-def run_trufflehog(repo_url):
-    try:
-        result = subprocess.run(["trufflehog", repo_url], capture_output=True, text=True)
-        return result.stdout or "No output from TruffleHog."
-    except FileNotFoundError:
-        return "[✗] TruffleHog not installed."
-
-def run_gitleaks(local_path):
-    try:
-        subprocess.run(
-            ["gitleaks", "detect", "--source", local_path, "--report-format", "json", "--report-path", "gitleaks-report.json"],
-            capture_output=True, text=True
-        )
-        if os.path.exists("gitleaks-report.json"):
-            with open("gitleaks-report.json", "r") as f:
-                data = f.read()
-                return json.loads(data) if data.strip() else []
-        return []
-    except FileNotFoundError:
-        return "[✗] Gitleaks not installed."
+# =============== UTILITY FUNCTIONS ===============
 
 def download_button(data, filename, label):
     b64 = base64.b64encode(data.encode()).decode()
     href = f'<a href="data:file/txt;base64,{b64}" download="{filename}">{label}</a>'
     st.markdown(href, unsafe_allow_html=True)
 
+@st.cache_resource(show_spinner=False)
+def get_scan_runner():
+    """Background scan queue of this server, shared with mllh.py's (see ui_scans.py)."""
+    from artifact_store import ArtifactStore
+    from scan_cache import ScanCache
+    cache, artifacts = ScanCache(), ArtifactStore()
+    return ui_scans.start(cache, artifacts) + (cache, artifacts)
+
 # =============== STREAMLIT UI ===============
 
 st.set_page_config(
@@ -64,44 +48,63 @@ st.markdown("Detect secrets & sensitive data in public/private repositories usin
 
 repo_url = st.text_input("Enter GitHub Repository URL", placeholder="https://github.com/user/repo")
 
+# The scan runs in the background; its job id is kept in the URL so a refresh finds it again
+job_id = st.session_state.get("job_id") or st.query_params.get("job")
+
 if st.button("🚀 Run Scan", use_container_width=True):
     if not repo_url.strip():
         st.error("Please enter a valid GitHub repository URL.")
     else:
-        with st.spinner("Running  scan..."):
-            trufflehog_output = run_trufflehog(repo_url)
-
-        st.subheader("🔍  Results")
-        with st.expander("📜 View Raw Output"):
-            st.markdown(f"<div class='result-box'>{trufflehog_output}</div>", unsafe_allow_html=True)
-            download_button(trufflehog_output, "trufflehog_output.txt", "📥 Download TruffleHog Output")
-
-        with st.spinner("Cloning repository and running Gitleaks..."):
-            try:
-                local_path = clone_repo(repo_url)
-                gitleaks_results = run_gitleaks(local_path)
-                shutil.rmtree(local_path)
-            except subprocess.CalledProcessError:
-                st.error("Failed to clone repository.")
-                gitleaks_results = []
-
-        st.subheader("🛡️ Gitleaks Results")
-        if isinstance(gitleaks_results, list) and gitleaks_results:
-            st.write(f"Found **{len(gitleaks_results)}** potential leaks:")
-            st.dataframe([{
-                "Rule": f.get("RuleID", "N/A"),
-                "File": f.get("File", "N/A"),
-                "Secret": f.get("Secret", "N/A"),
-                "Commit": f.get("Commit", "N/A")
-            } for f in gitleaks_results])
-            
-            with st.expander("📜 View Full JSON Output"):
-                json_str = json.dumps(gitleaks_results, indent=2)
-                st.code(json_str, language="json")
-                download_button(json_str, "gitleaks_results.json", "📥 Download Gitleaks JSON")
-        elif isinstance(gitleaks_results, str):
-            st.error(gitleaks_results)
-        else:
-            st.success("✅ No leaks found by Gitleaks.")
-
-        st.markdown(f"**Scan completed:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        store, runner, _, _ = get_scan_runner()
+        # The result is kept in the scan cache under this key until the page reads it
+        job_id = store.submit(repo_url, options={"cache_key": uuid.uuid4().hex})["job_id"]
+        runner.notify()
+        st.session_state["job_id"] = st.query_params["job"] = job_id
+
+def show_progress(polling=False):
+    store, _, _, _ = get_scan_runner()
+    job = store.get(job_id)
+    fraction, label = ui_scans.progress_of(job)
+    st.progress(fraction, text=f"{job['repo_url']} — {label}")
+    if polling and job["status"] in ("done", "failed"):
+        st.rerun()
+
+job = get_scan_runner()[0].get(job_id) if job_id else None
+if job is not None and job["status"] in ("queued", "running"):
+    if hasattr(st, "fragment"):
+        st.fragment(run_every=JOB_POLL_SECONDS)(show_progress)(polling=True)
+    else:
+        show_progress()
+        st.button("🔄 Refresh progress")
+elif job is not None:
+    _, _, cache, artifacts = get_scan_runner()
+    result = ui_scans.load_result(job, cache, artifacts) if job["status"] == "done" else None
+    trufflehog_output = result["trufflehog_output"] if result else ""
+
+    st.subheader("🔍  Results")
+    with st.expander("📜 View Raw Output"):
+        st.markdown(f"<div class='result-box'>{trufflehog_output}</div>", unsafe_allow_html=True)
+        download_button(trufflehog_output, "trufflehog_output.txt", "📥 Download TruffleHog Output")
+
+    st.subheader("🛡️ Gitleaks Results")
+    gitleaks_results = result["findings"] if result else job["error"]
+    if isinstance(gitleaks_results, list) and gitleaks_results:
+        st.write(f"Found **{len(gitleaks_results)}** potential leaks:")
+        st.dataframe([{
+            "Rule": f.get("RuleID", "N/A"),
+            "File": f.get("File", "N/A"),
+            "Secret": f.get("Secret", "N/A"),
+            "Commit": f.get("Commit", "N/A")
+        } for f in gitleaks_results])
+
+        with st.expander("📜 View Full JSON Output"):
+            json_str = json.dumps(gitleaks_results, indent=2, default=json_default)
+            st.code(json_str, language="json")
+            download_button(json_str, "gitleaks_results.json", "📥 Download Gitleaks JSON")
+    elif isinstance(gitleaks_results, str):
+        st.error(gitleaks_results)
+    else:
+        st.success("✅ No leaks found by Gitleaks.")
+
+    finished_at = datetime.fromisoformat(job["finished_at"]) if job["finished_at"] else datetime.now()
+    st.markdown(f"**Scan completed:** {finished_at.strftime('%Y-%m-%d %H:%M:%S')}")
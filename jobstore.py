@@ -0,0 +1,324 @@
+"""
+Persistent scan job queue for the API.
+
+POST /scan used to fork one `scan.py` per request with no limit and no way
+to ask what happened to it. Jobs now go into a SQLite table
+(scan_artifacts/jobs.db) and a fixed pool of JobRunner threads claims them
+oldest first, runs the scanner and records the outcome:
+
+    queued -> running -> done (scan_id of the stored findings) | failed (error)
+
+The queue depth per status is one indexed GROUP BY, so it is cheap enough
+to poll. Findings of finished jobs go to the artifact store, so
+/scans/<scan_id>/report serves them.
+
+Scanners are callables (repo_url, timer, **job_options) -> (findings,
+engine_output) that record their stages on the metrics.ScanTimer; the
+breakdown is stored with the scan, and each stage's start and end updates
+the job's progress column while it runs (polled by the Streamlit apps, see
+ui_scans.py). scan_subprocess runs scan.py in a private working directory;
+fake_scanner sleeps and returns synthetic findings, for load tests (see
+loadtest.py).
+
+    python jobstore.py list [--status queued]
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+JOBS_DB = Path("scan_artifacts") / "jobs.db"
+STATUSES = ("queued", "running", "done", "failed")
+JOB_COLUMNS = ("job_id", "repo_url", "status", "worker", "submitted_at", "started_at", "finished_at",
+               "n_findings", "scan_id", "error", "heartbeat_at", "options", "progress")
+# Stored as JSON text
+JSON_COLUMNS = ("options", "progress")
+# How often idle runners look for jobs submitted by another process
+POLL_SECONDS = 1.0
+SCAN_PY = Path(__file__).resolve().parent / "scan.py"
+
+
+def _now():
+    return datetime.now().isoformat(timespec="milliseconds")
+
+
+def _job(row):
+    job = dict(zip(JOB_COLUMNS, row))
+    for c in JSON_COLUMNS:
+        if job[c] is not None:
+            job[c] = json.loads(job[c])
+    return job
+
+
+class JobStore:
+    def __init__(self, path=JOBS_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    repo_url TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    worker TEXT,
+                    submitted_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    n_findings INTEGER,
+                    scan_id TEXT,
+                    error TEXT,
+                    heartbeat_at TEXT,
+                    options TEXT,
+                    progress TEXT
+                )""")
+            # Queues created before heartbeats (cluster.py) or per-job options and progress lack the columns
+            existing = {row[1] for row in db.execute("PRAGMA table_info(jobs)")}
+            for column in ("heartbeat_at", "options", "progress"):
+                if column not in existing:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, submitted_at)")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:  # commit on success, roll back on error
+                yield db
+        finally:
+            db.close()
+
+    def submit(self, repo_url, options=None):
+        """Queue a scan; `options` (JSON-serializable dict) is passed to the scanner as keyword arguments."""
+        job = dict.fromkeys(JOB_COLUMNS)
+        job.update(job_id=uuid.uuid4().hex[:12], repo_url=repo_url, status="queued", submitted_at=_now(),
+                   options=options)
+        with self._connect() as db:
+            db.execute(f"INSERT INTO jobs VALUES ({', '.join('?' * len(JOB_COLUMNS))})",
+                       [json.dumps(job[c]) if c in JSON_COLUMNS and job[c] is not None else job[c]
+                        for c in JOB_COLUMNS])
+        return job
+
+    def claim(self, worker):
+        """Move the oldest queued job to running for `worker`; None when the queue is empty."""
+        with self._lock, self._connect() as db:
+            row = db.execute(
+                f"""UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = started_at
+                    WHERE job_id = (SELECT job_id FROM jobs WHERE status = 'queued'
+                                    ORDER BY submitted_at LIMIT 1)
+                    RETURNING {', '.join(JOB_COLUMNS)}""",
+                (worker, _now()),
+            ).fetchone()
+        return _job(row) if row else None
+
+    def heartbeat(self, job_id):
+        """Mark a running job as still making progress (see requeue_stale)."""
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET heartbeat_at = ? WHERE job_id = ? AND status = 'running'", (_now(), job_id))
+
+    def requeue_stale(self, max_age_seconds, worker_prefix=""):
+        """
+        Put running jobs back in the queue when their worker (name starting
+        with `worker_prefix`) has not sent a heartbeat for `max_age_seconds`.
+        Returns how many were requeued.
+        """
+        cutoff = datetime.fromtimestamp(time.time() - max_age_seconds).isoformat(timespec="milliseconds")
+        with self._lock, self._connect() as db:
+            cur = db.execute(
+                """UPDATE jobs SET status = 'queued', worker = NULL, started_at = NULL, heartbeat_at = NULL
+                   WHERE status = 'running' AND worker LIKE ? || '%' AND COALESCE(heartbeat_at, started_at) < ?""",
+                (worker_prefix, cutoff),
+            )
+        return cur.rowcount
+
+    def set_progress(self, job_id, progress):
+        """Record a running job's stage progress ({"stage": current, "done": [finished stages]})."""
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE job_id = ?",
+                       (json.dumps(progress), _now(), job_id))
+
+    def finish(self, job_id, n_findings, scan_id=None):
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = 'done', finished_at = ?, n_findings = ?, scan_id = ? WHERE job_id = ?",
+                       (_now(), n_findings, scan_id, job_id))
+
+    def fail(self, job_id, error):
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE job_id = ?",
+                       (_now(), str(error)[:2000], job_id))
+
+    def get(self, job_id):
+        with self._connect() as db:
+            row = db.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _job(row) if row else None
+
+    def list_jobs(self, status=None, limit=50):
+        query, params = f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs", []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += f" ORDER BY submitted_at DESC LIMIT {int(limit)}"
+        with self._connect() as db:
+            rows = db.execute(query, params).fetchall()
+        return [_job(r) for r in rows]
+
+    def depth(self):
+        """Job count per status (every status present, zero if none)."""
+        with self._connect() as db:
+            rows = db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(rows)
+        return counts
+
+
+class JobRunner:
+    """Fixed pool of threads claiming jobs from a JobStore and running `scanner` on them."""
+
+    def __init__(self, store, scanner, artifact_store=None, workers=2, name=None, baseline=None):
+        self.store = store
+        self.scanner = scanner
+        self.artifact_store = artifact_store
+        # baseline.Baseline of accepted findings, dropped before they are stored
+        self.baseline = baseline
+        self.workers = workers
+        self.name = name or f"{os.uname().nodename}-{os.getpid()}"
+        self._wake = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._loop, args=(f"{self.name}-{i}",), daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.notify()
+
+    def notify(self):
+        """Wake an idle runner thread (called after submit)."""
+        with self._wake:
+            self._wake.notify()
+
+    def _loop(self, worker):
+        while not self._stop.is_set():
+            job = self.store.claim(worker)
+            if job is None:
+                with self._wake:
+                    self._wake.wait(POLL_SECONDS)
+                continue
+            self.run_job(job)
+
+    def run_job(self, job):
+        from metrics import ScanTimer
+
+        progress = {"stage": None, "done": []}
+
+        def on_stage(stage, finished):
+            if finished:
+                progress["done"].append(stage)
+            progress["stage"] = None if finished else stage
+            self.store.set_progress(job["job_id"], progress)
+
+        timer = ScanTimer(on_stage=on_stage)
+        try:
+            findings, engine_output = self.scanner(job["repo_url"], timer, **(job["options"] or {}))
+            if self.baseline is not None and len(self.baseline):
+                with timer.stage("baseline") as rec:
+                    findings, rec["findings"] = self.baseline.split(findings)
+            scan_id = None
+            if self.artifact_store is not None:
+                scan_id = self.artifact_store.save_scan(job["repo_url"], engine_output, findings, timer=timer)
+            self.store.finish(job["job_id"], len(findings), scan_id)
+        except Exception as e:
+            self.store.fail(job["job_id"], f"{e.__class__.__name__}: {e}")
+            traceback.print_exc()
+
+
+def scan_subprocess(repo_url, timer, archives=False, timeout=3600):
+    """
+    Run scan.py on repo_url in a private working directory (its report paths
+    are relative). `archives` (job option) also scans inside archive blobs.
+    """
+    from finding_record import load_findings
+    from metrics import TIMINGS_FILE
+    from scan_cache import is_remote_url
+
+    if not is_remote_url(repo_url):
+        raise ValueError(f"Not a remote repository URL: {repo_url!r}")
+    workdir = tempfile.mkdtemp(prefix="leakhawk-job-")
+    try:
+        cmd = [sys.executable, str(SCAN_PY)] + (["--archives"] if archives else []) + ["--", repo_url]
+        result = subprocess.run(cmd, cwd=workdir,
+                                capture_output=True, text=True, timeout=timeout)
+        timings_path = os.path.join(workdir, TIMINGS_FILE)
+        if os.path.exists(timings_path):
+            with open(timings_path, encoding="utf-8") as f:
+                for stage, rec in json.load(f).items():
+                    # The report is parsed again below, in this process
+                    if stage != "report_parse":
+                        timer.record(stage, **rec)
+        report = os.path.join(workdir, "gitleaks-report.json")
+        # No report means the clone or Gitleaks failed: the job fails instead of reporting a clean repo
+        if result.returncode != 0 or not os.path.exists(report):
+            output = (result.stdout + result.stderr).strip().splitlines()
+            raise RuntimeError(f"scan.py exited with {result.returncode}: " + " | ".join(output[-5:]))
+        with timer.stage("report_parse") as rec:
+            findings = load_findings(report)
+            rec["bytes"], rec["findings"] = os.path.getsize(report), len(findings)
+        return findings, result.stdout
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def fake_scanner(delay_ms=200, n_findings=5):
+    """
+    Scanner that sleeps `delay_ms` and returns `n_findings` synthetic findings
+    (load tests). Job options such as archives are accepted and ignored.
+    """
+    from rules import RULES, make_finding
+
+    def scan(repo_url, timer, **options):
+        with timer.stage("gitleaks") as rec:
+            time.sleep(delay_ms / 1000)
+            findings = [make_finding(RULES[i % len(RULES)], f"src/file_{i}.py", i + 1, 1, b"token = x", b"x")
+                        for i in range(n_findings)]
+            rec["findings"] = len(findings)
+        return findings, f"fake scan of {repo_url}\n"
+    return scan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the LeakHawk scan job queue.")
+    parser.add_argument("--db", default=str(JOBS_DB))
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_list = sub.add_parser("list")
+    p_list.add_argument("--status", choices=STATUSES, default=None)
+    p_list.add_argument("--limit", type=int, default=50)
+    sub.add_parser("depth")
+    args = parser.parse_args()
+
+    store = JobStore(args.db)
+    if args.command == "list":
+        for j in store.list_jobs(args.status, args.limit):
+            print(f"{j['submitted_at']}  {j['job_id']}  {j['status']:8s}  {j['n_findings'] or 0:>6} findings  {j['repo_url']}")
+    else:
+        print(json.dumps(store.depth()))
+
+
+if __name__ == "__main__":
+    main()
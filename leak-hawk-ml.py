@@ -1,64 +1,146 @@
+import argparse
+import time
+import pickle
+
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.preprocessing import OneHotEncoder, LabelEncoder
-from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import LabelEncoder
+from sklearn.metrics import classification_report, accuracy_score
 from sklearn.pipeline import Pipeline
-from xgboost import XGBClassifier
-from sklearn.metrics import classification_report
 import joblib
 
-# 1. Load dataset
-df = pd.read_csv("leakhawk_dataset.csv")
+from training import (FEATURE_MODES, build_model, build_pipeline, search_hyperparameters,
+                      split_dataset, train_out_of_core)
+
+parser = argparse.ArgumentParser(description="Train the LeakHawk leak-type classifier.")
+parser.add_argument("--features", choices=FEATURE_MODES, default="tfidf",
+                    help="tfidf: 5000-term vocabulary (default); hashed: vocabulary-free word+char hashing")
+parser.add_argument("--compare-features", action="store_true",
+                    help="Train every feature mode on the same split and compare speed/accuracy/size; saves nothing")
+parser.add_argument("--search", action="store_true",
+                    help="hist trees on all cores, early stopping on a validation split and a parallel "
+                         "random search; saves the smallest model meeting --min-accuracy (else the most accurate)")
+parser.add_argument("--time-budget", type=float, default=120, help="Seconds after which --search starts no new trials")
+parser.add_argument("--max-trials", type=int, default=40)
+parser.add_argument("--min-accuracy", type=float, default=None,
+                    help="Validation accuracy bar for --search (default: best accuracy found)")
+parser.add_argument("--report", default="training_report.csv", help="Where --search writes its trial report")
+parser.add_argument("--data", default="leakhawk_dataset.csv", help="CSV or Parquet training data")
+parser.add_argument("--out-of-core", action="store_true",
+                    help="Stream --data in chunks into an external-memory DMatrix (hashed features); memory stays bounded")
+parser.add_argument("--chunksize", type=int, default=100_000, help="Rows per chunk in --out-of-core mode")
+parser.add_argument("--rounds", type=int, default=300, help="Boosting rounds in --out-of-core mode")
+parser.add_argument("--cache-dir", default=None, help="External-memory cache directory (default: temp dir)")
+parser.add_argument("--cache", action="store_true",
+                    help="Load encoded data and precomputed features from the columnar cache (datacache.py), "
+                         "building it on first use or when the CSV content changes")
+args = parser.parse_args()
+if args.cache and (args.out_of_core or args.compare_features):
+    parser.error("--cache only applies to the default and --search modes")
+
+if args.out_of_core:
+    pipeline, label_encoder, report = train_out_of_core(
+        args.data, chunksize=args.chunksize, num_boost_round=args.rounds, cache_dir=args.cache_dir
+    )
+    print(f"Trained on {report['train_rows']:,} rows in {report['seconds']:.1f}s, "
+          f"validation accuracy {report['val_accuracy']:.4f} on {report['val_rows']:,} held-out rows, "
+          f"peak RSS {report['peak_rss_mb']:.0f} MB")
+    joblib.dump(pipeline, "leakhawk_model.pkl")
+    joblib.dump(label_encoder, "label_encoder.pkl")
+    print("✅ Model saved as leakhawk_model.pkl (hashed features, out-of-core)")
+    print("✅ Label encoder saved as label_encoder.pkl")
+    raise SystemExit(0)
 
-# 2. Encode target labels
-label_encoder = LabelEncoder()
-df['Leak_Type_Encoded'] = label_encoder.fit_transform(df['Leak_Type'])
+cached = None
+if args.cache:
+    # 1-4 (+5). Parsed, encoded, split and featurized once; memory-mapped here
+    from datacache import load_cache
+    cached = load_cache(args.data, args.features)
+    label_encoder = cached.label_encoder
+    X_train, X_test, y_train, y_test = cached.X_train, cached.X_test, cached.y_train, cached.y_test
+else:
+    # 1. Load dataset
+    df = pd.read_csv(args.data)
 
-# 3. Features & target
-X = df[['Data_Snippet', 'Pattern_Matched', 'Risk_Score', 'Anomaly_Flag']]
-y = df['Leak_Type_Encoded']
+    # 2-4. Encode target labels, features & target, train-test split
+    label_encoder = LabelEncoder()
+    X_train, X_test, y_train, y_test = split_dataset(df, label_encoder)
 
-# 4. Train-test split
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
+if args.compare_features:
+    rows = []
+    for mode in FEATURE_MODES:
+        pipeline = build_pipeline(mode)
+        t0 = time.perf_counter()
+        pipeline.fit(X_train, y_train)
+        fit_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        Xt = pipeline.named_steps["preprocessor"].transform(X_test)
+        featurize_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        y_pred = pipeline.predict(X_test)
+        predict_s = time.perf_counter() - t0
+        rows.append({
+            "features": mode,
+            "fit_s": fit_s,
+            "featurize_rows_per_s": len(X_test) / featurize_s,
+            "predict_rows_per_s": len(X_test) / predict_s,
+            "accuracy": accuracy_score(y_test, y_pred),
+            "n_features": Xt.shape[1],
+            "preprocessor_kb": len(pickle.dumps(pipeline.named_steps["preprocessor"])) / 1024,
+            "model_kb": len(pickle.dumps(pipeline)) / 1024,
+        })
+    with pd.option_context("display.width", 200, "display.float_format", "{:,.3f}".format):
+        print(pd.DataFrame(rows).to_string(index=False))
+    raise SystemExit(0)
 
-# 5. Preprocessing
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('text', TfidfVectorizer(max_features=5000, ngram_range=(1, 2)), 'Data_Snippet'),
-        ('cat', OneHotEncoder(handle_unknown='ignore'), ['Pattern_Matched', 'Anomaly_Flag']),
-        ('num', 'passthrough', ['Risk_Score'])
-    ]
-)
+if args.search:
+    if cached:
+        # Cached features of the search split, preprocessor fitted without the validation rows
+        split = cached.search
+        pipeline, report = search_hyperparameters(
+            split.X_train, split.y_train, split.X_test, y_test, time_budget=args.time_budget,
+            max_trials=args.max_trials, min_accuracy=args.min_accuracy,
+            preprocessor=split.preprocessor, validation=(split.X_val, split.y_val)
+        )
+        X_test = split.X_test
+    else:
+        pipeline, report = search_hyperparameters(
+            X_train, y_train, X_test, y_test, mode=args.features, time_budget=args.time_budget,
+            max_trials=args.max_trials, min_accuracy=args.min_accuracy
+        )
+    cols = ["trial", "max_depth", "learning_rate", "rounds", "n_trees", "model_kb", "val_accuracy",
+            "test_accuracy", "latency_ms_batch1", "latency_ms_per_row_batch1k", "fit_s", "selected"]
+    with pd.option_context("display.width", 250, "display.float_format", "{:,.4f}".format):
+        print(report[cols].to_string(index=False))
+    report.to_csv(args.report, index=False)
+    print(f"Trial report written to {args.report}")
 
-# 6. Model
-model = XGBClassifier(
-    eval_metric='mlogloss',
-    use_label_encoder=False,
-    n_estimators=300,
-    learning_rate=0.1,
-    max_depth=6,
-    subsample=0.8,
-    colsample_bytree=0.8
-)
+    y_pred = pipeline[-1].predict(X_test) if cached else pipeline.predict(X_test)
+    print(classification_report(y_test, y_pred, target_names=label_encoder.classes_))
+    joblib.dump(pipeline, "leakhawk_model.pkl")
+    joblib.dump(label_encoder, "label_encoder.pkl")
+    print(f"✅ Model saved as leakhawk_model.pkl ({args.features} features, searched)")
+    print("✅ Label encoder saved as label_encoder.pkl")
+    raise SystemExit(0)
 
-# 7. Pipeline
-pipeline = Pipeline([
-    ('preprocessor', preprocessor),
-    ('classifier', model)
-])
+if cached:
+    # 6-8. Model on the cached features, pipeline around the cached preprocessor
+    model = build_model()
+    model.fit(X_train, y_train)
+    pipeline = Pipeline([("preprocessor", cached.preprocessor), ("classifier", model)])
+    y_pred = model.predict(X_test)
+else:
+    # 5-7. Preprocessing, model, pipeline
+    pipeline = build_pipeline(args.features)
 
-# 8. Train
-pipeline.fit(X_train, y_train)
+    # 8. Train
+    pipeline.fit(X_train, y_train)
 
-# 9. Evaluate
-y_pred = pipeline.predict(X_test)
+    # 9. Evaluate
+    y_pred = pipeline.predict(X_test)
 print(classification_report(y_test, y_pred, target_names=label_encoder.classes_))
 
 # 10. Save model & label encoder
 joblib.dump(pipeline, "leakhawk_model.pkl")
 joblib.dump(label_encoder, "label_encoder.pkl")
-print("✅ Model saved as leakhawk_model.pkl")
+print(f"✅ Model saved as leakhawk_model.pkl ({args.features} features)")
 print("✅ Label encoder saved as label_encoder.pkl")
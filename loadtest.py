@@ -0,0 +1,260 @@
+"""
+Load generator for the backend.py API.
+
+Drives POST /scan, GET /results, GET /jobs/<id> and GET /jobs against a local
+instance and reports per-endpoint latency percentiles, throughput and error
+rates, plus the job queue depth sampled over the run.
+
+By default it starts its own backend (in a temporary data dir, with a fake
+scanner that sleeps --scan-ms per job) so only the API, the job queue and
+the scheduler are measured. --url targets an already running instance.
+
+Arrivals are open-loop (Poisson at --rate requests/s, latency measured from
+the scheduled arrival, so a stalled server is not hidden by the client
+backing off), or closed-loop with --rate 0 (--concurrency clients, each
+sending its next request as soon as the previous one returns).
+
+    python loadtest.py --rate 50 --duration 30
+    python loadtest.py --rate 0 --concurrency 32 --scan-workers 4 --scan-ms 500
+    python loadtest.py --url http://127.0.0.1:5000 --mix scan=1,results=1
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+DEFAULT_MIX = "scan=1,results=2,job=4,jobs=1"
+BACKEND_PY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend.py")
+
+
+class Recorder:
+    """Thread-safe per-endpoint latency / status log."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}  # endpoint -> list of (latency_s, ok)
+        self.job_ids = []
+        self.depth = []    # (t, {status: n})
+
+    def add(self, endpoint, latency, ok):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((latency, ok))
+
+    def add_job(self, job_id):
+        with self._lock:
+            self.job_ids.append(job_id)
+
+    def random_job(self):
+        with self._lock:
+            return random.choice(self.job_ids) if self.job_ids else None
+
+
+def _request(base, method, path, body=None, timeout=30):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base + path, data=data, method=method,
+                                 headers={"Content-Type": "application/json"} if data else {})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def send(base, endpoint, recorder, scheduled=None):
+    """One request of the given kind; latency counts from `scheduled` when given (open loop)."""
+    start = scheduled if scheduled is not None else time.perf_counter()
+    ok = False
+    try:
+        if endpoint == "scan":
+            status, body = _request(base, "POST", "/scan",
+                                    {"repo_url": f"https://github.com/loadtest/repo-{random.randrange(1000)}"})
+            ok = status == 200
+            if ok:
+                recorder.add_job(json.loads(body)["job_id"])
+        elif endpoint == "results":
+            status, _ = _request(base, "GET", "/results")
+            ok = status == 200
+        elif endpoint == "job":
+            job_id = recorder.random_job()
+            if job_id is None:
+                return
+            status, _ = _request(base, "GET", f"/jobs/{job_id}")
+            ok = status == 200
+        else:
+            status, _ = _request(base, "GET", "/jobs?limit=20")
+            ok = status == 200
+    except (OSError, ValueError):
+        ok = False
+    recorder.add(endpoint, time.perf_counter() - start, ok)
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("scan", "results", "job", "jobs"):
+            raise ValueError(f"Unknown endpoint in mix: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def run_open_loop(base, mix, rate, duration, concurrency, recorder):
+    names, weights = list(mix), list(mix.values())
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        t0 = time.perf_counter()
+        next_at = t0
+        while next_at - t0 < duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, base, random.choices(names, weights)[0], recorder, next_at)
+            next_at += random.expovariate(rate)
+
+
+def run_closed_loop(base, mix, duration, concurrency, recorder):
+    names, weights = list(mix), list(mix.values())
+    stop_at = time.perf_counter() + duration
+
+    def client():
+        while time.perf_counter() < stop_at:
+            send(base, random.choices(names, weights)[0], recorder)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def sample_depth(base, recorder, interval, stop):
+    t0 = time.perf_counter()
+    while not stop.wait(interval):
+        try:
+            status, body = _request(base, "GET", "/jobs?limit=0", timeout=10)
+            if status == 200:
+                recorder.depth.append((round(time.perf_counter() - t0, 2), json.loads(body)["depth"]))
+        except (OSError, ValueError):
+            pass
+
+
+def summarize(recorder, elapsed):
+    report = {}
+    for endpoint, samples in sorted(recorder.samples.items()):
+        lat = np.array([s[0] for s in samples]) * 1000
+        errors = sum(1 for s in samples if not s[1])
+        p50, p90, p99 = np.percentile(lat, [50, 90, 99])
+        report[endpoint] = {
+            "requests": len(samples), "errors": errors, "error_rate": round(errors / len(samples), 4),
+            "rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(p50, 2), "p90_ms": round(p90, 2), "p99_ms": round(p99, 2), "max_ms": round(lat.max(), 2),
+        }
+    return report
+
+
+def print_report(report, depth, elapsed):
+    total = sum(r["requests"] for r in report.values())
+    print(f"[✓] {total:,} requests in {elapsed:.1f}s ({total / elapsed:,.1f} req/s)")
+    print(f"    {'endpoint':9s} {'reqs':>7s} {'rps':>8s} {'err%':>6s} {'p50':>8s} {'p90':>8s} {'p99':>8s} {'max':>8s}  (ms)")
+    for name, r in report.items():
+        print(f"    {name:9s} {r['requests']:7d} {r['rps']:8.1f} {r['error_rate'] * 100:6.2f} "
+              f"{r['p50_ms']:8.1f} {r['p90_ms']:8.1f} {r['p99_ms']:8.1f} {r['max_ms']:8.1f}")
+    if depth:
+        print("    queue depth (t: queued/running/done/failed)")
+        step = max(1, len(depth) // 15)
+        for t, d in depth[::step]:
+            print(f"      {t:7.1f}s  {d['queued']:5d} / {d['running']:3d} / {d['done']:6d} / {d['failed']:4d}")
+        print(f"    max queued: {max(d['queued'] for _, d in depth)}")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_backend(scan_ms, workers, data_dir, timeout=120):
+    """Launch backend.py with the fake scanner; returns (process, base_url) once it answers."""
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, BACKEND_PY, "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+         "--data-dir", data_dir, "--fake-scanner-ms", str(scan_ms)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("backend.py exited during startup")
+        try:
+            if _request(base, "GET", "/jobs?limit=0", timeout=2)[0] == 200:
+                return proc, base
+        except OSError:
+            time.sleep(0.3)
+    proc.terminate()
+    raise RuntimeError("backend.py did not come up in time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the LeakHawk API.")
+    parser.add_argument("--url", default=None, help="Target a running instance instead of starting one")
+    parser.add_argument("--rate", type=float, default=20, help="Arrivals per second (0 = closed loop)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Max in-flight requests / closed-loop clients")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Endpoint weights, e.g. scan=1,results=2,job=4,jobs=1")
+    parser.add_argument("--scan-ms", type=float, default=200, help="Fake scan duration (own backend only)")
+    parser.add_argument("--scan-workers", type=int, default=2, help="Scan job workers (own backend only)")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Queue depth sampling period")
+    parser.add_argument("--out", default=None, help="Write the report as JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    mix = parse_mix(args.mix)
+
+    proc, data_dir, base = None, None, args.url
+    if base is None:
+        data_dir = tempfile.mkdtemp(prefix="leakhawk-loadtest-")
+        print("[*] Starting backend with a fake scanner...")
+        proc, base = start_backend(args.scan_ms, args.scan_workers, data_dir)
+    recorder = Recorder()
+    stop = threading.Event()
+    sampler = threading.Thread(target=sample_depth, args=(base, recorder, args.sample_interval, stop), daemon=True)
+    try:
+        print(f"[🔍] {'open' if args.rate else 'closed'} loop against {base} for {args.duration:.0f}s")
+        sampler.start()
+        t0 = time.perf_counter()
+        if args.rate:
+            run_open_loop(base, mix, args.rate, args.duration, args.concurrency, recorder)
+        else:
+            run_closed_loop(base, mix, args.duration, args.concurrency, recorder)
+        elapsed = time.perf_counter() - t0
+    finally:
+        stop.set()
+        sampler.join()
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = summarize(recorder, elapsed)
+    print_report(report, recorder.depth, elapsed)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "endpoints": report,
+                       "queue_depth": [{"t": t, **d} for t, d in recorder.depth]}, f, indent=1)
+        print(f"[✓] Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
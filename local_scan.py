@@ -0,0 +1,200 @@
+"""
+Scan a local directory, checkout or single file in place (no clone).
+
+Files are opened with mmap and searched in CHUNK_BYTES windows that overlap
+by OVERLAP_BYTES, so a multi-GB dump, SQL export or log is never copied into
+one Python object: at most one chunk (plus its lowercased copy for the
+keyword prefilter) is materialised at a time. Matches are reported by the
+window they start in, so one crossing a window edge is found exactly once.
+
+Work is split into (file, byte range) segments of at most SEGMENT_BYTES and
+spread over a process pool. Each segment reports its own newline count, and
+line numbers are fixed up in file order afterwards, so even a single huge
+file is scanned in parallel.
+
+Findings use the Gitleaks JSON schema (see rules.py). Files are enumerated
+through path_filter, so vendored and binary files are skipped and counted
+as for clone scans. There is no size cutoff by default: large dumps are
+what this mode is for.
+
+    python local_scan.py ~/src/project --report-path gitleaks-report.json
+    python local_scan.py /var/dumps/prod.sql
+    python local_scan.py ~/src/project --max-mb 50
+    python local_scan.py ~/src/project --archives      # also inside zip/jar/tar.gz
+"""
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from path_filter import PathFilter, ScanStats, enumerate_tree
+from rules import MAX_MATCH_BYTES, find_matches, make_finding
+
+CHUNK_BYTES = 8 * 1024 * 1024
+OVERLAP_BYTES = MAX_MATCH_BYTES + 4096
+SEGMENT_BYTES = 64 * 1024 * 1024
+
+
+def scan_segment(path, rel_path, start, end, chunk_bytes=CHUNK_BYTES, entropy=False, profile=None):
+    """
+    Scan bytes [start, end) of one file. Returns (newline_count, findings)
+    with StartLine/EndLine relative to the segment (0-based; the caller adds
+    the number of lines before `start` and 1). With `entropy`, high-entropy
+    tokens not already covered by a rule match are reported too. `profile`
+    is a rule_profiler.RuleProfile to record per-rule cost in.
+    """
+    findings = []
+    newlines = 0
+    with open(path, "rb") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        if size == 0 or start >= size:
+            return 0, []
+        end = min(end, size)
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Position just past the last newline before the current chunk, for columns
+            line_start = mm.rfind(b"\n", 0, start) + 1
+            pos = start
+            while pos < end:
+                chunk_end = min(pos + chunk_bytes, end)
+                window_end = min(chunk_end + OVERLAP_BYTES, size)
+                chunk = mm[pos:window_end]
+                hits = list(find_matches(mm, pos, window_end, chunk.lower(), limit=chunk_end, profile=profile))
+                if entropy:
+                    hits += _entropy_hits(chunk, pos, chunk_end, mm[pos - 1] if pos else None, hits)
+                hits.sort(key=lambda m: m[1])
+                cursor, line = pos, newlines
+                for rule, m_start, m_end, secret in hits:
+                    # A left-extended start never crosses a newline, so counting from pos is safe
+                    if m_start > cursor:
+                        line += _count_newlines(mm, cursor, m_start)
+                        cursor = m_start
+                    nl = mm.rfind(b"\n", line_start, m_start)
+                    column = m_start - (nl + 1 if nl >= 0 else line_start) + 1
+                    findings.append(make_finding(rule, rel_path, line, column, mm[m_start:m_end], secret))
+                newlines += _count_newlines(mm, pos, chunk_end)
+                last_nl = mm.rfind(b"\n", pos, chunk_end)
+                if last_nl >= 0:
+                    line_start = last_nl + 1
+                pos = chunk_end
+    return newlines, findings
+
+
+def _entropy_hits(chunk, pos, chunk_end, prev_byte, rule_hits):
+    from entropy import find_high_entropy
+
+    spans = sorted((h[1], h[2]) for h in rule_hits)
+    out = []
+    for hit in find_high_entropy(chunk, base=pos, limit=chunk_end, prev_byte=prev_byte):
+        if not any(s <= hit[1] and hit[2] <= e for s, e in spans):
+            out.append(hit)
+    return out
+
+
+def _count_newlines(mm, start, end, block=1 << 20):
+    count = 0
+    for pos in range(start, end, block):
+        count += mm[pos:min(pos + block, end)].count(b"\n")
+    return count
+
+
+def _scan_segment_task(segment, entropy=False):
+    return scan_segment(*segment, entropy=entropy)
+
+
+def plan_segments(root, path_filter=None, stats=None, segment_bytes=SEGMENT_BYTES):
+    """(abs_path, rel_path, start, end) work items for every file the filter keeps."""
+    if os.path.isfile(root):
+        size = os.path.getsize(root)
+        if stats is not None:
+            stats.scan(size)
+        files = [(root, os.path.basename(root), size)]
+    else:
+        files = [(os.path.join(root, rel), rel, size) for rel, size in enumerate_tree(root, path_filter, stats)]
+    for abs_path, rel, size in files:
+        for start in range(0, max(size, 1), segment_bytes):
+            yield abs_path, rel, start, start + segment_bytes
+
+
+def scan_local(root, path_filter=None, workers=None, stats=None, segment_bytes=SEGMENT_BYTES, entropy=False,
+               profile=None):
+    """
+    Scan a directory (or one file) in place; returns Gitleaks-style findings in file order.
+    Profiling (`profile`, a rule_profiler.RuleProfile) runs in this process only.
+    """
+    stats = stats if stats is not None else ScanStats()
+    if path_filter is None and os.path.isdir(root):
+        path_filter = PathFilter.for_repo(root, max_bytes=0)
+    segments = list(plan_segments(root, path_filter, stats, segment_bytes))
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(segments) <= 1 or profile is not None:
+        results = [scan_segment(*seg, entropy=entropy, profile=profile) for seg in segments]
+    else:
+        task = partial(_scan_segment_task, entropy=entropy)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(task, segments, chunksize=max(1, len(segments) // (workers * 8))))
+
+    # Segments of a file are consecutive: shift their lines by the newlines before them
+    findings = []
+    lines_before, current = 0, None
+    for (_, rel, _, _), (newlines, seg_findings) in zip(segments, results):
+        if rel != current:
+            lines_before, current = 0, rel
+        for f in seg_findings:
+            f["StartLine"] += lines_before + 1
+            f["EndLine"] += lines_before + 1
+            f["Fingerprint"] = f"{rel}:{f['RuleID']}:{f['StartLine']}"
+            findings.append(f)
+        lines_before += newlines
+    return findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan a local directory or file in place with LeakHawk's rules.")
+    parser.add_argument("source", help="Directory, existing checkout or single file")
+    parser.add_argument("--report-path", default="gitleaks-report.json")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--exclude", action="append", default=[], help="Extra gitignore-style glob (repeatable)")
+    parser.add_argument("--max-mb", type=float, default=0, help="Skip files larger than this (default: no limit)")
+    parser.add_argument("--entropy", action="store_true", help="Also report high-entropy tokens (see entropy.py)")
+    parser.add_argument("--archives", action="store_true", help="Also scan inside zip/jar/tar archives (see archive_scan.py)")
+    parser.add_argument("--baseline", default=None,
+                        help="Drop findings whose fingerprint is in this baseline file (see baseline.py)")
+    parser.add_argument("--profile-rules", action="store_true",
+                        help="Record per-rule cost and print a report (single process, see rule_profiler.py)")
+    args = parser.parse_args()
+
+    path_filter = None
+    if os.path.isdir(args.source):
+        path_filter = PathFilter.for_repo(args.source, args.exclude, max_bytes=int(args.max_mb * 1024 * 1024))
+    stats = ScanStats()
+    t0 = time.perf_counter()
+    profile = None
+    if args.profile_rules:
+        from rule_profiler import RuleProfile
+        profile = RuleProfile()
+    findings = scan_local(args.source, path_filter, args.workers, stats, entropy=args.entropy, profile=profile)
+    if args.archives and os.path.isdir(args.source):
+        from archive_scan import scan_tree_archives
+        findings += scan_tree_archives(args.source, path_filter, stats=stats, entropy=args.entropy)
+    elapsed = time.perf_counter() - t0
+    if args.baseline:
+        from baseline import Baseline
+        findings, suppressed = Baseline.load(args.baseline).split(findings)
+        print(f"[✓] Baseline: {suppressed} known finding(s) suppressed")
+    with open(args.report_path, "w", encoding="utf-8") as f:
+        json.dump(findings, f, indent=1)
+    print(f"[✓] {len(findings)} findings in {elapsed:.1f}s "
+          f"({stats.scanned_bytes / 1e6 / elapsed if elapsed else 0:,.0f} MB/s); {stats.summary()}")
+    print(f"[✓] Report written to {args.report_path}")
+    if profile is not None:
+        print(profile.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
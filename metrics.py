@@ -0,0 +1,144 @@
+"""
+Per-stage timing for the scan pipeline, exported in Prometheus' text format.
+
+Each scan gets a ScanTimer; pipeline code wraps its stages in
+`with timer.stage("gitleaks") as rec:` and may set rec["bytes"] /
+rec["findings"]. The timer keeps the per-scan breakdown (stored with the
+scan record, see ArtifactStore.save_scan) and feeds process-wide histograms
+that backend.py serves on /metrics:
+
+    leakhawk_stage_duration_seconds{stage=...}   histogram
+    leakhawk_stage_bytes{stage=...}              histogram
+    leakhawk_stage_findings{stage=...}           histogram
+
+Stages: clone, trufflehog, gitleaks, report_parse, ml_featurize, ml_predict,
+artifact_write (plus archives, baseline and cache_lookup where used). The exposition format is
+simple enough to write here, so prometheus_client is not required.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+STAGES = ("clone", "trufflehog", "gitleaks", "report_parse", "ml_featurize", "ml_predict", "artifact_write")
+TIMINGS_FILE = "scan-timings.json"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(13))  # 1 KB .. 16 GB
+FINDINGS_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+
+def _format_float(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one label dimension set, thread-safe."""
+
+    def __init__(self, name, help_text, buckets, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self.labelnames = tuple(labelnames)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for key, series in items:
+            labels = [f'{n}="{v}"' for n, v in zip(self.labelnames, key)]
+            for bound, count in zip(self.buckets, series):
+                le = ",".join(labels + [f'le="{_format_float(bound)}"'])
+                lines.append(f"{self.name}_bucket{{{le}}} {count}")
+            suffix = "{" + ",".join(labels) + "}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {series[-2]}")
+            lines.append(f"{self.name}_count{suffix} {series[-1]}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("leakhawk_stage_duration_seconds", "Wall time of one pipeline stage of a scan.",
+                          DURATION_BUCKETS, ("stage",))
+STAGE_BYTES = Histogram("leakhawk_stage_bytes", "Bytes a pipeline stage read or wrote.", BYTES_BUCKETS, ("stage",))
+STAGE_FINDINGS = Histogram("leakhawk_stage_findings", "Findings a pipeline stage produced or handled.",
+                           FINDINGS_BUCKETS, ("stage",))
+REGISTRY = [STAGE_SECONDS, STAGE_BYTES, STAGE_FINDINGS]
+
+
+def render(extra_lines=()):
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
+
+
+class ScanTimer:
+    """Per-scan stage breakdown: {stage: {"seconds", "bytes"?, "findings"?}}."""
+
+    def __init__(self, on_stage=None):
+        self.timings = {}
+        # Called as on_stage(name, finished) when a stage starts and ends (job progress, see jobstore.py)
+        self.on_stage = on_stage
+
+    @contextmanager
+    def stage(self, name):
+        rec = {}
+        if self.on_stage is not None:
+            self.on_stage(name, False)
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            self.record(name, time.perf_counter() - t0, **rec)
+            if self.on_stage is not None:
+                self.on_stage(name, True)
+
+    def record(self, name, seconds, bytes=None, findings=None):
+        """Add a stage measured elsewhere (e.g. by a scan.py subprocess)."""
+        rec = {"seconds": round(seconds, 4)}
+        STAGE_SECONDS.observe(seconds, stage=name)
+        if bytes is not None:
+            rec["bytes"] = int(bytes)
+            STAGE_BYTES.observe(bytes, stage=name)
+        if findings is not None:
+            rec["findings"] = int(findings)
+            STAGE_FINDINGS.observe(findings, stage=name)
+        self.timings[name] = rec
+
+    def total_seconds(self):
+        return round(sum(r["seconds"] for r in self.timings.values()), 4)
+
+    def save(self, path=TIMINGS_FILE):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.timings, f, indent=1)
+
+    def summary(self):
+        return " · ".join(f"{name} {rec['seconds']:.2f}s" for name, rec in self.timings.items())
+
+
+def dir_bytes(path):
+    """Total size of the files under path (e.g. a fresh clone)."""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return total
@@ -1,172 +1,145 @@
 
 import streamlit as st
-import subprocess
 import os
-import shutil
 import json
-import base64
+import html
+import io
+import tempfile
+import uuid
 from datetime import datetime
-from pathlib import Path
 import pandas as pd
+from finding_record import json_default, to_findings
+from findings_view import DEFAULT_PAGE_SIZE, PAGE_SIZES, FindingsView
+from baseline import DEFAULT_BASELINE, Baseline, fingerprint
+from metrics import ScanTimer
+from path_filter import DEFAULT_MAX_BYTES
+from scan_cache import cache_key, resolve_head
+import ui_scans
+
+# Seconds between progress refreshes while background scans are running
+JOB_POLL_SECONDS = 1.5
+# Columns of the findings table (FindingsView.rows) and of the ML table and its CSV
+COMPACT_COLUMNS = ["Rule_ID", "File", "Line", "Match/Secret", "Commit", "Link"]
+ML_COLUMNS = [
+    "Rule_ID", "Predicted_Type", "Confidence", "Risk_Score(1-10)",
+    "File", "Line", "Match/Secret", "Description",
+    "Author", "Commit", "Commit_Date", "Commit_Message",
+    "Email", "Anomaly_Flag", "Tier", "Link"
+]
+ML_CSV_COLUMNS = [
+    "Rule_ID", "Predicted_Type", "Confidence", "Risk_Score(1-10)", "Anomaly_Flag",
+    "File", "Line", "Match/Secret", "Description", "Commit", "Author", "Email",
+    "Commit_Date", "Commit_Message", "Link", "Tier"
+]
 
 # ========= Optional ML (Secondary Feature) =========
-MODEL_PATH = Path("leakhawk_model.pkl")
-ENCODER_PATH = Path("label_encoder.pkl")
-model = None
-label_encoder = None
+# Models are served from the versioned registry in models/ (or the fixed
+# leakhawk_model.pkl / label_encoder.pkl) and hot-swapped when a new version
+# is activated, see registry.py. Each rerun takes one consistent snapshot.
+@st.cache_resource(show_spinner=False)
+def get_model_registry():
+    from registry import ModelRegistry
+    return ModelRegistry().start()
+
+active_model = None
+cascade = None
+model_version = None
 ml_ready = False
 try:
-    import joblib
-    if MODEL_PATH.exists() and ENCODER_PATH.exists():
-        model = joblib.load(MODEL_PATH)
-        label_encoder = joblib.load(ENCODER_PATH)
+    active_model = get_model_registry().get()
+    if active_model is not None:
+        # Optional cheap first tiers (rule lookup + linear model), see cascade.py
+        cascade = active_model.cascade
+        model_version = active_model.version
         ml_ready = True
 except Exception:
     ml_ready = False
 
 # ========= Helpers =========
-def clone_repo(repo_url, clone_dir="repo-temp"):
-    if os.path.exists(clone_dir):
-        shutil.rmtree(clone_dir)
-    subprocess.run(
-        ["git", "clone", repo_url, clone_dir],
-        check=True,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL
-    )
-    return clone_dir
-
-def run_trufflehog(repo_url):
-    try:
-        # Using basic trufflehog command without --no-update
-        result = subprocess.run(
-            ["trufflehog", repo_url],
-            capture_output=True,
-            text=True,
-            check=False
-        )
-        out = (result.stdout or "").strip()
-        err = (result.stderr or "").strip()
-        return out if out else (err if err else "No output from TruffleHog.")
-    except FileNotFoundError:
-        return "[✗] LeakHawk detection engine not installed or not in PATH."
-
-def run_gitleaks(local_path):
-    try:
-        report_path = "gitleaks-report.json"
-        if os.path.exists(report_path):
-            os.remove(report_path)
-
-        result = subprocess.run(
-            [
-                "gitleaks", "detect",
-                "--source", local_path,
-                "--report-format", "json",
-                "--report-path", report_path
-            ],
-            capture_output=True,
-            text=True,
-            check=False
-        )
-
-        # Prefer the file if present
-        if os.path.exists(report_path):
-            with open(report_path, "r") as f:
-                data = f.read().strip()
-                return json.loads(data) if data and data != "[]" else []
-        # Fallback: try stdout
-        if result.stdout:
-            try:
-                return json.loads(result.stdout)
-            except json.JSONDecodeError:
-                return []
-        return []
-    except FileNotFoundError:
-        return "[✗] LeakHawk analysis engine not installed or not in PATH."
-
 def to_json_str(obj) -> str:
     try:
-        return json.dumps(obj, indent=2, ensure_ascii=False)
+        return json.dumps(obj, indent=2, ensure_ascii=False, default=json_default)
     except Exception:
         return str(obj)
 
 def download_text_button(text_data: str, filename: str, label: str):
-    b64 = base64.b64encode(text_data.encode()).decode()
-    href = f'<a href="data:file/txt;base64,{b64}" download="{filename}">{label}</a>'
-    st.markdown(href, unsafe_allow_html=True)
-
-def download_bytes_button(bytes_data: bytes, filename: str, label: str, mime: str = "text/plain"):
-    b64 = base64.b64encode(bytes_data).decode()
-    href = f'<a href="data:{mime};base64,{b64}" download="{filename}">{label}</a>'
-    st.markdown(href, unsafe_allow_html=True)
-
-def extract_text_for_ml(finding: dict) -> str:
-    """
-    Build the text fed to the ML model from a LeakHawk finding.
-    Prioritize matched content, then context.
-    """
-    parts = []
-    for key in ("Match", "Secret", "Description"):
-        v = finding.get(key)
-        if v:
-            parts.append(str(v))
-    for k in ("RuleID", "File", "Message", "Commit"):
-        v = finding.get(k)
-        if v:
-            parts.append(str(v))
-    text = " | ".join(parts).strip()
-    return text if text else str(finding)
-
-def prob_to_risk(prob: float) -> int:
-    if prob >= 0.90: return 10
-    if prob >= 0.80: return 9
-    if prob >= 0.70: return 8
-    if prob >= 0.60: return 7
-    if prob >= 0.50: return 6
-    if prob >= 0.40: return 5
-    if prob >= 0.30: return 4
-    if prob >= 0.20: return 3
-    if prob >= 0.10: return 2
-    return 1
-
-def flag_anomaly(rule_id: str, pred_label: str, confidence: float) -> bool:
-    if confidence < 0.25:
-        return True
-    if rule_id and pred_label:
-        rid = str(rule_id).lower()
-        weird_pairs = [
-            ("generic-api-key", "Payment Info"),
-            ("high-entropy", "Payment Info"),
-            ("password", "Payment Info"),
-        ]
-        if any(rid.startswith(p0) and pred_label == p1 for p0, p1 in weird_pairs):
-            return True
-    return False
-
-def save_scan_artifacts(repo_url: str, trufflehog_out: str, gitleaks_list: list):
-    """Save scan outputs locally as artifacts."""
-    artifacts_dir = Path("scan_artifacts")
-    artifacts_dir.mkdir(exist_ok=True)
-    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
-    safe_name = repo_url.replace("://", "_").replace("/", "_")
-    # trufflehog
-    truf_path = artifacts_dir / f"trufflehog_{safe_name}_{ts}.txt"
-    truf_path.write_text(trufflehog_out, encoding="utf-8")
-    # gitleaks json
-    gl_json_path = artifacts_dir / f"gitleaks_{safe_name}_{ts}.json"
-    gl_json_path.write_text(to_json_str(gitleaks_list), encoding="utf-8")
-    # gitleaks compact csv
-    compact_rows = []
-    for f in gitleaks_list:
-        compact_rows.append({
-            "Rule": f.get("RuleID", "N/A"),
-            "File": f.get("File", "N/A"),
-            "Line": f.get("StartLine", ""),
-            "Match_Secret": f.get("Match") or f.get("Secret") or "",
-            "Commit": f.get("Commit", "N/A"),
-            "Link": f.get("Link", "")
-        })
-    pd.DataFrame(compact_rows).to_csv(artifacts_dir / f"gitleaks_compact_{safe_name}_{ts}.csv", index=False)
+    st.download_button(label, data=text_data, file_name=filename, mime="text/plain", on_click="ignore")
+
+def download_report_button(findings, fmt: str, filename: str, label: str, **kwargs):
+    """Stream findings through report_writers into a temp file and offer it for download."""
+    from report_writers import FORMATS, write_report
+    tmp = tempfile.TemporaryFile()
+    text = io.TextIOWrapper(tmp, encoding="utf-8", newline="")
+    write_report(findings, text, fmt, **kwargs)
+    text.flush()
+    text.detach()
+    tmp.seek(0)
+    st.download_button(label, data=tmp, file_name=filename, mime=FORMATS[fmt][1], on_click="ignore")
+
+def cached_view(slot, token, build):
+    """FindingsView kept in the session while `token` (what it was built from) is unchanged."""
+    cached = st.session_state.get(slot)
+    if cached is None or cached[0] != token:
+        view = build()
+        if view is None:
+            return None  # failed: try again on the next rerun
+        cached = st.session_state[slot] = (token, view)
+    return cached[1]
+
+def link_html(url):
+    return f'<a href="{html.escape(url)}" target="_blank">🔗 View</a>' if url else ""
+
+def render_findings_view(view, key, columns, as_html=False):
+    """Filter, sort and page controls for a FindingsView; only the requested page is rendered."""
+    filter_cols = st.columns(len(view.filterable()) + 1)
+    filters = {}
+    for col, name in zip(filter_cols, view.filterable()):
+        counts = view.counts(name)
+        filters[name] = col.multiselect(name.replace("_", " "), list(counts), key=f"{key}-{name}",
+                                        format_func=lambda v, c=counts: f"{v} ({c[v]})")
+    file_search = filter_cols[-1].text_input("File contains", key=f"{key}-file")
+    col_sort, col_order, col_size, col_page = st.columns([2, 1, 1, 1])
+    sort = col_sort.selectbox(
+        "Sort by", [None] + view.sort_keys(), key=f"{key}-sort",
+        format_func=lambda k: k.replace("_", " ") if k else ("Risk, then confidence" if view.has_ml else "Scan order"))
+    descending = col_order.selectbox("Order", [True, False], key=f"{key}-desc",
+                                     format_func=lambda d: "Descending" if d else "Ascending")
+    page_size = col_size.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                                   key=f"{key}-size")
+    page_no = col_page.number_input("Page", min_value=1, value=1, step=1, key=f"{key}-page")
+    page = view.query(filters, file_search, sort, descending, page_no, page_size)
+    st.caption(f"{page.total} of {len(view)} findings match · page {page.page} of {page.pages}")
+    if not page.total:
+        st.info("No findings match the filters.")
+        return page
+    df_page = pd.DataFrame(view.rows(page.positions))
+    if as_html:
+        # Escaped cells and clickable links; one page of rows, so the HTML stays small
+        df_page = df_page.apply(lambda c: c.map(lambda v: html.escape(v) if isinstance(v, str) else v))
+        df_page["Link"] = [link_html(f.get("Link", "")) for f in map(view.findings.__getitem__, page.positions)]
+        st.markdown(df_page[columns].to_html(escape=False, index=False), unsafe_allow_html=True)
+    else:
+        st.dataframe(df_page[columns], use_container_width=True, hide_index=True)
+    return page
+
+@st.cache_resource(show_spinner=False)
+def get_artifact_store():
+    from artifact_store import ArtifactStore
+    return ArtifactStore()
+
+@st.cache_resource(show_spinner=False)
+def get_scan_cache():
+    from scan_cache import ScanCache
+    return ScanCache()
+
+@st.cache_resource(show_spinner=False)
+def get_scan_runner():
+    """Background scan queue shared by every session of this server (see ui_scans.py)."""
+    try:
+        registry = get_model_registry()
+    except Exception:
+        registry = None
+    return ui_scans.start(get_scan_cache(), get_artifact_store(), registry)
 
 # ========= Streamlit UI =========
 st.set_page_config(
@@ -212,12 +185,55 @@ st.sidebar.header("Display Options")
 show_raw_trufflehog = st.sidebar.checkbox("🔍 Show raw engine output", value=False)
 show_full_gitleaks_json = st.sidebar.checkbox("📄 Show full JSON results", value=False)
 
+st.sidebar.header("Scan Filters")
+use_default_excludes = st.sidebar.checkbox(
+    "Skip vendored dirs, lockfiles, minified bundles and media", value=True,
+    help="Built-in excludes; the repo's own .leakhawkignore is always applied."
+)
+extra_excludes = st.sidebar.text_area("Extra excludes (gitignore-style, one per line)", value="")
+max_file_mb = st.sidebar.number_input("Max file size (MB)", min_value=1, max_value=1024,
+                                      value=DEFAULT_MAX_BYTES // (1024 * 1024))
+scan_archives = st.sidebar.checkbox(
+    "Scan inside archives (zip/jar/tar.gz)", value=False,
+    help="Walks archive blobs from the whole history in memory, with size and nesting limits."
+)
+
+use_scan_cache = st.sidebar.checkbox(
+    "♻️ Reuse cached results", value=True,
+    help="Rescanning a repo whose HEAD, engines and filters are unchanged returns the stored result "
+         "(kept 24 h, see scan_cache.py)."
+)
+
+st.sidebar.header("Baseline")
+use_baseline = st.sidebar.checkbox(
+    "Show only new since baseline", value=True,
+    help="Findings whose fingerprint is in the baseline file (or the repo's .leakhawkbaseline) are dropped "
+         "by the scan, before ML, storage and display. Applies to the next scan."
+)
+baseline_path = st.sidebar.text_input("Baseline file", value=DEFAULT_BASELINE)
+
 st.sidebar.header("ML Options")
 enable_ml = st.sidebar.checkbox("Enable ML post-processing", value=True if ml_ready else False)
 st.sidebar.markdown(
-    f"<span class='small-muted'>ML status: {'✅ Loaded' if ml_ready else '⚠️ Missing leakhawk_model.pkl / label_encoder.pkl'}</span>",
+    f"<span class='small-muted'>ML status: {f'✅ Loaded (model {model_version})' if ml_ready else '⚠️ Missing leakhawk_model.pkl / label_encoder.pkl'}</span>",
     unsafe_allow_html=True
 )
+if cascade is not None:
+    cascade_threshold = st.sidebar.slider(
+        "Cascade escalation threshold", 0.5, 1.0, float(cascade.threshold), 0.01,
+        help="Findings the cheap tiers classify below this confidence go to the full model."
+    )
+
+st.sidebar.header("Scan History")
+try:
+    past_scans = get_artifact_store().list_scans(limit=50)
+except Exception:
+    past_scans = []
+history_choice = st.sidebar.selectbox(
+    "Previous scans",
+    [None] + past_scans,
+    format_func=lambda s: "—" if s is None else f"{s['scanned_at'].replace('T', ' ')} · {s['n_findings']} · {s['repo']}",
+)
 
 st.sidebar.header("Offline ML on Existing JSON")
 uploaded_scan_json = st.sidebar.file_uploader("Upload LeakHawk JSON results(beta testing!!)", type=["json"])
@@ -229,230 +245,228 @@ run_clicked = col_run.button("🚀 Run Scan", use_container_width=True)
 clear_clicked = col_clear.button("🧹 Clear Results", use_container_width=True)
 
 if clear_clicked:
+    st.session_state.pop("scan", None)
     st.rerun()
 
 gitleaks_results = []
+# Predictions the background job made for the shown scan (ui_scans.make_scanner)
+ml_result = None
+# Per-stage breakdown of what this rerun does (cache lookup, classification)
+scan_timer = ScanTimer()
 
 # ========= Primary: Run Tools =========
+# Scans run as background jobs (ui_scans.py); their ids are kept in the URL so
+# a refresh, or coming back to the link later, finds them again
+if "jobs" not in st.session_state:
+    st.session_state["jobs"] = [j for j in st.query_params.get("jobs", "").split(",") if j]
+
+def show_job(job):
+    """Make a finished job's result the page's current scan."""
+    st.session_state["scan"] = {
+        "repo_url": job["repo_url"], "head": (job["options"] or {}).get("head") or "", "fresh": True,
+        "result": ui_scans.load_result(job, get_scan_cache(), get_artifact_store()),
+        "finished_at": (job["finished_at"] or "").replace("T", " ")[:19],
+    }
+    st.session_state.pop("follow_job", None)
+
 if run_clicked:
     if not repo_url.strip():
         st.error("Please enter a valid GitHub repository URL.")
     else:
-        # --- Secret Detection ---
-        with st.spinner("Running LeakHawk secret detection…"):
-            trufflehog_output = run_trufflehog(repo_url)
-
-        st.subheader("🔍 Secret Detection Results")
-        if show_raw_trufflehog:
-            with st.expander("📜 Raw Output (toggle)", expanded=False):
-                st.markdown(f"<div class='result-box'>{trufflehog_output}</div>", unsafe_allow_html=True)
-                download_text_button(trufflehog_output, "leakhawk_engine_output.txt", "📥 Download Engine Output")
+        # Same repo, same HEAD, same engines and options: same findings
+        scan_options = {
+            "default_excludes": use_default_excludes,
+            "extra_excludes": sorted(p.strip() for p in extra_excludes.splitlines() if p.strip()),
+            "max_file_mb": int(max_file_mb),
+            "archives": scan_archives,
+            "baseline_path": baseline_path if use_baseline else None,
+        }
+        with scan_timer.stage("cache_lookup"):
+            head = resolve_head(repo_url)
+            # The repo's .leakhawkbaseline is pinned by HEAD; the local file's contents go into the key
+            local_fps = sorted(Baseline.load(baseline_path).fingerprints) if use_baseline else []
+            key = cache_key(repo_url, head, {**scan_options, "baseline": local_fps}) if head else None
+            result = get_scan_cache().get(key) if key and use_scan_cache else None
+        if result is not None:
+            result["findings"] = to_findings(result["findings"])
+            st.session_state["scan"] = {"repo_url": repo_url, "head": head, "result": result, "fresh": False,
+                                        "finished_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         else:
-            st.caption("Raw engine output is hidden (enable in sidebar).")
+            store, runner = get_scan_runner()
+            job = store.submit(repo_url, options={
+                **scan_options, "cache_key": key or uuid.uuid4().hex, "head": head,
+                "classify": bool(enable_ml and ml_ready),
+                "cascade_threshold": cascade_threshold if cascade is not None else None,
+            })
+            runner.notify()
+            st.session_state["jobs"].append(job["job_id"])
+            st.query_params["jobs"] = ",".join(st.session_state["jobs"])
+            # Shown as soon as it finishes, unless another scan is picked meanwhile
+            st.session_state["follow_job"] = job["job_id"]
+
+def job_pending(job):
+    return job["status"] in ("queued", "running")
+
+def render_jobs(polling=False):
+    store, _ = get_scan_runner()
+    jobs = [job for job in map(store.get, st.session_state["jobs"]) if job is not None]
+    followed = st.session_state.get("follow_job")
+    for job in reversed(jobs):
+        fraction, label = ui_scans.progress_of(job)
+        col_bar, col_show = st.columns([4, 1])
+        col_bar.progress(fraction, text=f"{job['repo_url']} — {label}")
+        if job["status"] == "failed":
+            col_bar.caption(f"❌ {job['error']}")
+        elif job["status"] == "done":
+            if job["job_id"] == followed:
+                show_job(job)
+                st.rerun()
+            if col_show.button("Show", key=f"show-{job['job_id']}", use_container_width=True):
+                show_job(job)
+                st.rerun()
+    if not any(map(job_pending, jobs)):
+        if polling:
+            st.rerun()  # everything finished: stop polling
+    elif not polling:
+        st.button("🔄 Refresh progress")
+
+if st.session_state["jobs"]:
+    st.subheader("⏳ Background Scans")
+    store, _ = get_scan_runner()
+    pending = any(job is not None and job_pending(job) for job in map(store.get, st.session_state["jobs"]))
+    if pending and hasattr(st, "fragment"):
+        # Only this panel reruns while polling; the results below stay as they are
+        st.fragment(run_every=JOB_POLL_SECONDS)(render_jobs)(polling=True)
+    else:
+        render_jobs()
+
+# Rendered on every rerun from the session's last scan: display toggles and ML need no new scan
+scan = st.session_state.get("scan")
+if scan is not None:
+    result = scan["result"]
+    trufflehog_output = result["trufflehog_output"]
+
+    st.subheader("🔍 Secret Detection Results")
+    if not scan["fresh"]:
+        st.caption(f"♻️ Cached result for {scan['repo_url']} at {scan['head'][:12]} "
+                   f"(scanned {datetime.fromtimestamp(result['cached_at']).strftime('%Y-%m-%d %H:%M:%S')}); "
+                   "untick “Reuse cached results” to rescan.")
+    if show_raw_trufflehog:
+        with st.expander("📜 Raw Output (toggle)", expanded=False):
+            st.markdown(f"<div class='result-box'>{trufflehog_output}</div>", unsafe_allow_html=True)
             download_text_button(trufflehog_output, "leakhawk_engine_output.txt", "📥 Download Engine Output")
-
-        # --- Repository Analysis ---
-        with st.spinner("Cloning repository and running LeakHawk analysis…"):
-            try:
-                local_path = clone_repo(repo_url)
-                gitleaks_results = run_gitleaks(local_path)
-            except subprocess.CalledProcessError:
-                st.error("Failed to clone repository. Check URL or access.")
-                gitleaks_results = []
-            finally:
-                try:
-                    if os.path.exists("repo-temp"):
-                        shutil.rmtree("repo-temp")
-                except Exception:
-                    pass
-
-        st.subheader("🛡️ Repository Analysis")
-        if isinstance(gitleaks_results, list) and gitleaks_results:
-            st.success(f"Found **{len(gitleaks_results)}** potential findings.")
-            compact_rows = []
-            for f in gitleaks_results:
-                compact_rows.append({
-                    "Rule": f.get("RuleID", "N/A"),
-                    "File": f.get("File", "N/A"),
-                    "Line": f.get("StartLine", ""),
-                    "Match/Secret": f.get("Match") or f.get("Secret") or "",
-                    "Commit": f.get("Commit", "N/A"),
-                    "Link": f.get("Link", "")
-                })
-            df_compact = pd.DataFrame(compact_rows)
-            st.dataframe(df_compact, use_container_width=True)
-
-            if show_full_gitleaks_json:
-                with st.expander("📦 Full Gitleaks JSON", expanded=False):
-                    json_str = to_json_str(gitleaks_results)
-                    st.code(json_str, language="json")
-                    download_text_button(json_str, "leakhawk_results.json", "📥 Download LeakHawk JSON")
-            else:
-                st.caption("Full Gitleaks JSON is hidden (enable in sidebar).")
-                json_str = to_json_str(gitleaks_results)
-                download_text_button(json_str, "leakhawk_results.json", "📥 Download LeakHawk JSON")
-
-            # Save artifacts locally
-            try:
-                save_scan_artifacts(repo_url, trufflehog_output, gitleaks_results)
-            except Exception:
-                pass
-
-            # Also offer compact CSV download directly
-            csv_bytes = df_compact.to_csv(index=False).encode()
-            download_bytes_button(csv_bytes, "leakhawk_compact.csv", "📥 Download LeakHawk Compact CSV", mime="text/csv")
-        elif isinstance(gitleaks_results, str):
-            st.error(gitleaks_results)
-            gitleaks_results = []
+    else:
+        st.caption("Raw engine output is hidden (enable in sidebar).")
+        download_text_button(trufflehog_output, "leakhawk_engine_output.txt", "📥 Download Engine Output")
+
+    gitleaks_results = result["findings"]
+    ml_result = result.get("ml")
+    # Baselined findings were already dropped by the scan job (ui_scans.scan_repository)
+    baseline_info = result.get("baseline")
+    view_token = (id(result), scan["finished_at"])
+
+    st.subheader("🛡️ Repository Analysis")
+    if result["filter_summary"]:
+        st.caption(f"Blob filter: {result['filter_summary']}")
+    if baseline_info and baseline_info["fingerprints"]:
+        st.caption(f"Baseline: {baseline_info['suppressed']} known finding(s) suppressed; showing new since "
+                   f"baseline ({baseline_info['fingerprints']} fingerprints).")
+    if result["error"] is not None:
+        st.error(result["error"])
+        gitleaks_results = []
+    elif gitleaks_results:
+        st.success(f"Found **{len(gitleaks_results)}** potential findings.")
+        findings_view = cached_view("findings_view", view_token, lambda: FindingsView(gitleaks_results))
+        page = render_findings_view(findings_view, "findings", COMPACT_COLUMNS)
+
+        if show_full_gitleaks_json:
+            # The whole result set is in the downloads below
+            with st.expander("📦 Gitleaks JSON of this page", expanded=False):
+                st.code(to_json_str([gitleaks_results[i] for i in page.positions]), language="json")
         else:
-            st.info("✅ No secrets found by LeakHawk.")
-            gitleaks_results = []
+            st.caption("Gitleaks JSON is hidden (enable in sidebar).")
+        col_json, col_jsonl, col_sarif = st.columns(3)
+        with col_json:
+            download_report_button(gitleaks_results, "json", "leakhawk_results.json", "📥 Download LeakHawk JSON")
+        with col_jsonl:
+            download_report_button(gitleaks_results, "jsonl", "leakhawk_results.jsonl", "📥 Download JSON Lines")
+        with col_sarif:
+            download_report_button(gitleaks_results, "sarif", "leakhawk_results.sarif", "📥 Download SARIF")
+        if baseline_info is not None:
+            # Accept everything this scan reported: save as the baseline file to suppress it next time
+            accepted = Baseline.load(baseline_path).fingerprints | {fingerprint(f) for f in gitleaks_results}
+            st.download_button(
+                "📥 Download updated baseline",
+                data="".join(f"{fp}\n" for fp in sorted(accepted)),
+                file_name=os.path.basename(baseline_path) or DEFAULT_BASELINE,
+                mime="text/plain", on_click="ignore",
+            )
 
-        st.markdown(f"**Scan completed:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        # Also offer compact CSV download directly
+        compact_rows = ({
+            "Rule": f.get("RuleID", "N/A"),
+            "File": f.get("File", "N/A"),
+            "Line": f.get("StartLine", ""),
+            "Match/Secret": f.get("Match") or f.get("Secret") or "",
+            "Commit": f.get("Commit", "N/A"),
+            "Link": f.get("Link", "")
+        } for f in gitleaks_results)
+        download_report_button(compact_rows, "csv", "leakhawk_compact.csv", "📥 Download LeakHawk Compact CSV",
+                               fields=["Rule", "File", "Line", "Match/Secret", "Commit", "Link"])
+    else:
+        st.info("✅ No secrets found by LeakHawk.")
 
-# ========= Secondary: ML Classification =========
-def classify_findings(findings: list):
-    if not findings:
-        st.info("No findings to classify.")
-        return
-
-    # Build feature vectors for ML (4 features expected by the model)
-    ml_data = []
-    for f in findings:
-        # Extract the 4 features the model expects:
-        # 1. Data_Snippet (text content)
-        data_snippet = extract_text_for_ml(f)
-        
-        # 2. Pattern_Matched (rule ID or pattern)
-        pattern_matched = f.get("RuleID", "unknown")
-        
-        # 3. Risk_Score (numerical - derive from available data)
-        # For now, use a default risk score based on rule type
-        risk_score = 5  # Default medium risk
-        
-        # 4. Anomaly_Flag (Yes/No - derive from context)
-        anomaly_flag = "No"  # Default to No
-        
-        ml_data.append({
-            'Data_Snippet': data_snippet,
-            'Pattern_Matched': pattern_matched,
-            'Risk_Score': risk_score,
-            'Anomaly_Flag': anomaly_flag
-        })
-    
-    # Convert to DataFrame (format expected by the model)
-    import pandas as pd
-    X_pred = pd.DataFrame(ml_data)
+    st.markdown(f"**Scan completed:** {scan['finished_at']}")
+    st.caption(f"⏱️ {result['timing_summary']}")
 
-    try:
-        # Predict using the trained pipeline
-        preds = model.predict(X_pred)
-        proba = None
-        if hasattr(model, "predict_proba"):
-            proba = model.predict_proba(X_pred)
-    except Exception as e:
-        st.error(f"ML prediction failed: {e}")
-        return
 
-    try:
-        preds_decoded = (
-            label_encoder.inverse_transform(preds)
-            if hasattr(label_encoder, "inverse_transform") else preds
-        )
-    except Exception:
-        preds_decoded = preds
+# ========= Scan History =========
+if history_choice is not None and not run_clicked:
+    st.subheader("🗂️ Stored Scan")
+    st.caption(f"{history_choice['repo']} — {history_choice['scanned_at'].replace('T', ' ')} ({history_choice['scan_id']})")
+    # Only the columns the table shows are read from the stored partition
+    st.dataframe(get_artifact_store().read_findings(scan_id=history_choice["scan_id"]), use_container_width=True)
 
-    confidences = []
-    if proba is not None:
-        for row in proba:
-            best = float(row.max()) if len(row) else 0.0
-            confidences.append(best)
+# ========= Secondary: ML Classification =========
+def classify_findings(findings: list, timer=None, ml=None):
+    """FindingsView with predictions: `ml` from the background job if given, else predicted here."""
+    if ml is not None:
+        preds_decoded, confidences, tiers = ml["labels"], ml["confidences"], ml["tiers"]
     else:
-        confidences = [0.5] * len(preds_decoded)
-
-    ml_rows = []
-    for finding, pred_label, conf in zip(findings, preds_decoded, confidences):
-        # Extract all available fields from Gitleaks JSON
-        rule = finding.get("RuleID", "N/A")
-        file_ = finding.get("File", "N/A")
-        secret = finding.get("Match", "") or finding.get("Secret", "")
-        commit = finding.get("Commit", "N/A")
-        link = finding.get("Link", "")
-        start_line = finding.get("StartLine", "")
-        end_line = finding.get("EndLine", "")
-        author = finding.get("Author", "N/A")
-        email = finding.get("Email", "N/A")
-        commit_date = finding.get("Date", "N/A")
-        commit_message = finding.get("Message", "N/A")
-        description = finding.get("Description", "N/A")
-        
-        risk = prob_to_risk(conf)
-        anomaly = flag_anomaly(rule, pred_label, conf)
-        
-        ml_rows.append({
-            "Rule_ID": rule,
-            "Predicted_Type": pred_label,
-            "Confidence": round(conf, 3),
-            "Risk_Score(1-10)": risk,
-            "Anomaly_Flag": anomaly,
-            "File": file_,
-            "Line": f"{start_line}-{end_line}" if start_line and end_line else start_line,
-            "Match/Secret": secret[:100] + "..." if len(secret) > 100 else secret,
-            "Description": description[:80] + "..." if len(description) > 80 else description,
-            "Commit": commit[:12] if commit != "N/A" else commit,
-            "Author": author,
-            "Email": email,
-            "Commit_Date": commit_date.split("T")[0] if commit_date != "N/A" and "T" in commit_date else commit_date,
-            "Commit_Message": commit_message[:50] + "..." if len(commit_message) > 50 else commit_message,
-            "Link": link
-        })
-
-    df_ml = pd.DataFrame(ml_rows)
-    
+        try:
+            preds_decoded, confidences, tiers = ui_scans.predict(
+                findings, active_model, cascade_threshold if cascade is not None else None, timer)
+        except Exception as e:
+            st.error(f"ML prediction failed: {e}")
+            return None
+
+    return FindingsView(findings, preds_decoded, confidences, tiers)
+
+def render_ml_view(ml_view, key):
+    if cascade is not None:
+        tier_counts = ml_view.counts("Tier")
+        st.caption(" · ".join(
+            f"{name}: {tier_counts.get(name, 0)} ({tier_counts.get(name, 0) / len(ml_view):.0%})"
+            for name in ("rule", "linear", "full")
+        ) + " — findings answered per cascade tier")
+
     # Display the results with enhanced formatting
     st.markdown("**🎯 ML Predictions with Complete Details:**")
-    
-    # Create clickable links for display
-    if len(df_ml) > 0:
-        # Sort by risk score and confidence
-        df_display = df_ml.sort_values(by=["Risk_Score(1-10)", "Confidence"], ascending=[False, False]).copy()
-        
-        # Make links clickable if they exist
-        if 'Link' in df_display.columns:
-            df_display['Clickable_Link'] = df_display['Link'].apply(
-                lambda x: f'<a href="{x}" target="_blank">🔗 View</a>' if x and x != "" else ""
-            )
-        
-        # Display with better column order
-        column_order = [
-            "Rule_ID", "Predicted_Type", "Confidence", "Risk_Score(1-10)", 
-            "File", "Line", "Match/Secret", "Description", 
-            "Author", "Commit", "Commit_Date", "Commit_Message", 
-            "Email", "Anomaly_Flag", "Clickable_Link"
-        ]
-        
-        # Only include columns that exist
-        display_columns = [col for col in column_order if col in df_display.columns]
-        df_final = df_display[display_columns]
-        
-        # Display as HTML to render clickable links
-        st.markdown(df_final.to_html(escape=False, index=False), unsafe_allow_html=True)
-        
-        # Also provide the regular dataframe for sorting/filtering
-        with st.expander("📊 Interactive Table (sortable)"):
-            st.dataframe(df_ml.sort_values(by=["Risk_Score(1-10)", "Confidence"], ascending=[False, False]), use_container_width=True)
-    
-    else:
-        st.info("No data to display")
-    
-    csv_bytes = df_ml.to_csv(index=False).encode()
-    download_bytes_button(csv_bytes, "leakhawk_ml_results.csv", "📥 Download ML Results (CSV)", mime="text/csv")
+    render_findings_view(ml_view, key, ML_COLUMNS, as_html=True)
+    download_report_button(ml_view.iter_rows(), "csv", "leakhawk_ml_results.csv", "📥 Download ML Results (CSV)",
+                           fields=ML_CSV_COLUMNS)
 
 if enable_ml and ml_ready:
     st.subheader("🧠 ML Classification (Secondary Feature)")
-    # Case 1: classify fresh scan results (if we just ran)
+    # Case 1: classify the shown scan's results; the job's own predictions when made with this model
     if gitleaks_results:
-        classify_findings(gitleaks_results)
+        current_threshold = cascade_threshold if cascade is not None else None
+        if ml_result and (ml_result["model_version"], ml_result["cascade_threshold"]) != (model_version, current_threshold):
+            ml_result = None
+        ml_view = cached_view("ml_view", view_token + (model_version, current_threshold),
+                              lambda: classify_findings(gitleaks_results, scan_timer, ml_result))
+        if ml_view is not None:
+            render_ml_view(ml_view, "ml")
     # Case 2: classify uploaded JSON (offline, no scan)
     elif uploaded_scan_json is not None:
         try:
@@ -462,8 +476,13 @@ if enable_ml and ml_ready:
                 findings = [findings]
             if not isinstance(findings, list):
                 st.error("Uploaded JSON must be a list of Gitleaks findings.")
+            elif not findings:
+                st.info("No findings to classify.")
             else:
-                classify_findings(findings)
+                ml_view = cached_view("upload_ml_view", (uploaded_scan_json.name, uploaded_scan_json.size, model_version),
+                                      lambda: classify_findings(to_findings(findings)))
+                if ml_view is not None:
+                    render_ml_view(ml_view, "upload-ml")
         except Exception as e:
             st.error(f"Failed to parse uploaded JSON: {e}")
 else:
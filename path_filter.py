@@ -0,0 +1,372 @@
+"""
+Decide which blobs are worth content-scanning before any engine reads them.
+
+Three cheap checks, applied while blobs are enumerated:
+  * path: gitignore-style globs (vendored dirs, lockfiles, minified bundles,
+    media, plus the repo's own .leakhawkignore), precompiled into one regex;
+  * size: blobs above max_bytes are skipped;
+  * content: magic-byte / NUL sniffing of the first 8 KB marks binaries.
+
+enumerate_tree() walks a working tree and enumerate_history() lists every
+blob reachable in a clone's history (git rev-list --objects). Both yield only
+the blobs to scan and fill a ScanStats with scanned vs skipped bytes.
+gitleaks_args() hands the path/size limits to Gitleaks through an
+allowlist config and --max-target-megabytes; "!" re-includes and the binary
+sniff cannot be forwarded. scan_stats() reports what that Gitleaks run skips,
+from git's object listing alone (no blob is read).
+
+    python path_filter.py repo-temp            # print what a scan would skip
+"""
+import argparse
+import os
+import re
+import subprocess
+import tempfile
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+SNIFF_BYTES = 8000
+IGNORE_FILE = ".leakhawkignore"
+
+# Generated, vendored or non-text content that never holds hand-written secrets
+DEFAULT_EXCLUDES = [
+    "node_modules/", "bower_components/", "vendor/", "third_party/",
+    ".venv/", "venv/", "__pycache__/", ".tox/",
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml",
+    "composer.lock", "Gemfile.lock", "Cargo.lock", "poetry.lock", "Pipfile.lock", "go.sum",
+    "*.min.js", "*.min.css", "*.map", "*.bundle.js",
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.ico", "*.bmp", "*.webp", "*.svgz",
+    "*.woff", "*.woff2", "*.ttf", "*.eot", "*.otf",
+    "*.mp3", "*.mp4", "*.mov", "*.avi", "*.wav", "*.pdf", "*.psd",
+    "*.pyc", "*.class", "*.o", "*.so", "*.dll", "*.dylib", "*.exe",
+]
+
+# (prefix, kind); only signatures that cannot start a text file. PE and other
+# formats without one are caught by the NUL-byte check.
+MAGIC_BYTES = [
+    (b"\x89PNG\r\n\x1a\n", "png"), (b"\xff\xd8\xff", "jpeg"), (b"GIF87a", "gif"), (b"GIF89a", "gif"),
+    (b"%PDF-", "pdf"), (b"PK\x03\x04", "zip"), (b"\x1f\x8b", "gzip"),
+    (b"\xfd7zXZ\x00", "xz"), (b"7z\xbc\xaf\x27\x1c", "7z"), (b"Rar!\x1a\x07", "rar"),
+    (b"\x7fELF", "elf"), (b"\xca\xfe\xba\xbe", "java-class"), (b"\xcf\xfa\xed\xfe", "mach-o"),
+    (b"\x00asm", "wasm"), (b"SQLite format 3\x00", "sqlite"),
+]
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Translate one gitignore-style glob into an (RE2-compatible) regex over '/'-separated paths."""
+    directory = pattern.endswith("/")
+    pattern = pattern.strip("/") if directory else pattern
+    anchored = pattern.startswith("/") or "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    out, i = [], 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                out.append("[" + ("^" + body[1:] if body.startswith("!") else body) + "]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    body = "".join(out)
+    prefix = "^" if anchored else "(?:^|/)"
+    # A directory pattern excludes everything below it; a file pattern also matches directories
+    suffix = "/" if directory else "(?:/|$)"
+    return prefix + body + suffix
+
+
+def parse_ignore(lines):
+    """Patterns of a .leakhawkignore given as lines (blank lines and '#' comments dropped)."""
+    return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+
+def read_ignore_file(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return parse_ignore(f)
+    except OSError:
+        return []
+
+
+class PathFilter:
+    """Precompiled exclude globs plus size and binary checks."""
+
+    def __init__(self, patterns=(), use_defaults=True, max_bytes=DEFAULT_MAX_BYTES, sniff_binary=True):
+        patterns = (DEFAULT_EXCLUDES if use_defaults else []) + list(patterns)
+        excludes = [p for p in patterns if not p.startswith("!")]
+        # "!pattern" re-includes matching paths (applied after every exclude)
+        includes = [p[1:] for p in patterns if p.startswith("!")]
+        self.exclude_patterns = excludes
+        self.include_patterns = includes
+        self._exclude = re.compile("|".join(map(glob_to_regex, excludes))) if excludes else None
+        self._include = re.compile("|".join(map(glob_to_regex, includes))) if includes else None
+        self.max_bytes = max_bytes
+        self.sniff_binary = sniff_binary
+
+    @classmethod
+    def for_repo(cls, root, patterns=(), **kwargs):
+        """Filter with the defaults, the repo's .leakhawkignore and any extra patterns."""
+        return cls(read_ignore_file(os.path.join(root, IGNORE_FILE)) + list(patterns), **kwargs)
+
+    def path_excluded(self, path: str) -> bool:
+        path = path.replace(os.sep, "/")
+        if self._exclude is None or not self._exclude.search(path):
+            return False
+        return not (self._include and self._include.search(path))
+
+    def size_excluded(self, size: int) -> bool:
+        return bool(self.max_bytes) and size > self.max_bytes
+
+    def skip_reason(self, path: str, size: int, head: bytes = None):
+        """'path', 'size', 'binary' or None (scan it). `head` is the blob's first bytes, if read."""
+        if self.path_excluded(path):
+            return "path"
+        if self.size_excluded(size):
+            return "size"
+        if self.sniff_binary and head is not None and binary_kind(head):
+            return "binary"
+        return None
+
+    def allowlist_regexes(self):
+        """
+        Exclude patterns as Go-compatible regexes for a Gitleaks allowlist.
+        RE2 has no lookahead, so "!" re-includes cannot be forwarded.
+        """
+        return [glob_to_regex(p) for p in self.exclude_patterns]
+
+    def engine_megabytes(self):
+        """The size cutoff as Gitleaks' whole-megabyte --max-target-megabytes, or None."""
+        return max(1, self.max_bytes // (1024 * 1024)) if self.max_bytes else None
+
+    def engine_view(self):
+        """The filter Gitleaks actually applies with gitleaks_args(): no re-includes, no sniffing."""
+        megabytes = self.engine_megabytes()
+        return PathFilter(self.exclude_patterns, use_defaults=False,
+                          max_bytes=megabytes * 1024 * 1024 if megabytes else 0, sniff_binary=False)
+
+
+def binary_kind(head: bytes):
+    """Magic-byte type of binary content, 'binary' for NUL-containing data, None for text."""
+    for magic, kind in MAGIC_BYTES:
+        if head.startswith(magic):
+            return kind
+    # Git's own heuristic: a NUL byte in the first 8000 bytes means binary
+    if b"\x00" in head[:SNIFF_BYTES]:
+        return "binary"
+    return None
+
+
+class ScanStats:
+    """Scanned vs skipped file and byte counts for one scan."""
+
+    def __init__(self):
+        self.scanned_files = 0
+        self.scanned_bytes = 0
+        self.skipped = {"path": [0, 0], "size": [0, 0], "binary": [0, 0]}
+        # Excluded working-tree directories, skipped unread: their files and bytes are not counted
+        self.pruned_dirs = 0
+        # Caveats appended to summary()
+        self.notes = []
+
+    def scan(self, size):
+        self.scanned_files += 1
+        self.scanned_bytes += size
+
+    def skip(self, reason, size):
+        entry = self.skipped[reason]
+        entry[0] += 1
+        entry[1] += size
+
+    @property
+    def skipped_files(self):
+        return sum(n for n, _ in self.skipped.values())
+
+    @property
+    def skipped_bytes(self):
+        return sum(b for _, b in self.skipped.values())
+
+    def to_dict(self):
+        return {
+            "scanned_files": self.scanned_files,
+            "scanned_bytes": self.scanned_bytes,
+            "skipped_files": self.skipped_files,
+            "skipped_bytes": self.skipped_bytes,
+            "skipped_by_reason": {k: {"files": n, "bytes": b} for k, (n, b) in self.skipped.items()},
+            "pruned_dirs": self.pruned_dirs,
+        }
+
+    def summary(self):
+        parts = ", ".join(f"{reason} {n:,} ({b / 1e6:.1f} MB)" for reason, (n, b) in self.skipped.items() if n)
+        if self.pruned_dirs:
+            parts += f"{', ' if parts else ''}{self.pruned_dirs:,} excluded dir(s) not walked"
+        return (f"scanned {self.scanned_files:,} files ({self.scanned_bytes / 1e6:.1f} MB), "
+                f"skipped {self.skipped_files:,} ({self.skipped_bytes / 1e6:.1f} MB){': ' + parts if parts else ''}"
+                + "".join(f"; {note}" for note in self.notes))
+
+
+def _read_head(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(SNIFF_BYTES)
+    except OSError:
+        return None
+
+
+def enumerate_tree(root, path_filter=None, stats=None):
+    """
+    Yield (relative_path, size) for working-tree files worth scanning.
+    Excluded directories are pruned without descending into them, so they
+    are counted in stats.pruned_dirs, not by files and bytes.
+    """
+    path_filter = path_filter or PathFilter.for_repo(root)
+    stats = stats if stats is not None else ScanStats()
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        rel_dir = "" if rel_dir == "." else rel_dir + "/"
+        kept = []
+        for d in dirnames:
+            if d == ".git":
+                continue
+            if path_filter.path_excluded(rel_dir + d + "/"):
+                stats.pruned_dirs += 1
+            else:
+                kept.append(d)
+        dirnames[:] = kept
+        for name in filenames:
+            full = os.path.join(dirpath, name)
+            if os.path.islink(full) or not os.path.isfile(full):
+                continue
+            rel, size = rel_dir + name, os.path.getsize(full)
+            reason = path_filter.skip_reason(rel, size)
+            if reason is None and path_filter.sniff_binary and binary_kind(_read_head(full) or b""):
+                reason = "binary"
+            if reason:
+                stats.skip(reason, size)
+            else:
+                stats.scan(size)
+                yield rel, size
+
+
+def enumerate_history(repo, path_filter=None, stats=None):
+    """
+    Yield (blob_sha, path, size) for every distinct blob reachable from any ref
+    that passes the filter. Path and size are checked from git's object listing;
+    only the survivors are read, and only their first bytes are sniffed.
+    """
+    path_filter = path_filter or PathFilter.for_repo(repo)
+    stats = stats if stats is not None else ScanStats()
+    listing = subprocess.run(
+        "git rev-list --objects --all | git cat-file --batch-check='%(objecttype) %(objectname) %(objectsize) %(rest)'",
+        cwd=repo, shell=True, capture_output=True, text=True, check=True,
+    ).stdout
+
+    candidates = []
+    for line in listing.splitlines():
+        kind, sha, size, *rest = line.split(" ", 3)
+        if kind != "blob":
+            continue
+        path, size = (rest[0] if rest else ""), int(size)
+        reason = path_filter.skip_reason(path, size)
+        if reason:
+            stats.skip(reason, size)
+        else:
+            candidates.append((sha, path, size))
+    if not path_filter.sniff_binary:
+        for sha, path, size in candidates:
+            stats.scan(size)
+            yield sha, path, size
+        return
+
+    # One long-lived cat-file process; read each candidate blob's content once
+    proc = subprocess.Popen(["git", "cat-file", "--batch"], cwd=repo,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    try:
+        for sha, path, size in candidates:
+            proc.stdin.write(sha.encode() + b"\n")
+            proc.stdin.flush()
+            proc.stdout.readline()
+            head = proc.stdout.read(min(size, SNIFF_BYTES))
+            remaining = size - len(head)
+            while remaining > 0:
+                remaining -= len(proc.stdout.read(min(remaining, 1 << 20)))
+            proc.stdout.read(1)
+            if binary_kind(head):
+                stats.skip("binary", size)
+            else:
+                stats.scan(size)
+                yield sha, path, size
+    finally:
+        proc.stdin.close()
+        proc.wait()
+
+
+def scan_stats(source, path_filter=None):
+    """
+    Scanned/skipped totals of a Gitleaks run with gitleaks_args(path_filter),
+    for a clone (history) or a plain directory (working tree). Paths and sizes
+    come from git's object listing / os.stat; no content is read.
+    """
+    path_filter = path_filter or PathFilter.for_repo(source)
+    stats = ScanStats()
+    if path_filter.include_patterns:
+        stats.notes.append(f"{len(path_filter.include_patterns)} '!' re-include(s) not applied by Gitleaks")
+    engine_filter = path_filter.engine_view()
+    if os.path.isdir(os.path.join(source, ".git")):
+        for _ in enumerate_history(source, engine_filter, stats):
+            pass
+    else:
+        for _ in enumerate_tree(source, engine_filter, stats):
+            pass
+    return stats
+
+
+def gitleaks_args(path_filter, config_dir=None):
+    """
+    Extra `gitleaks detect` arguments applying the filter's path excludes
+    (an allowlist on top of the default rules) and its size cutoff.
+    """
+    lines = ["[extend]", "useDefault = true", "", "[allowlist]",
+             'description = "LeakHawk path filter"', "paths = ["]
+    for regex in path_filter.allowlist_regexes():
+        lines.append("    '''%s'''," % regex)
+    lines.append("]")
+    fd, config_path = tempfile.mkstemp(prefix="leakhawk-gitleaks-", suffix=".toml", dir=config_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    args = ["--config", config_path]
+    if path_filter.engine_megabytes():
+        args += ["--max-target-megabytes", str(path_filter.engine_megabytes())]
+    return args
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show what LeakHawk's path filter would skip.")
+    parser.add_argument("source", help="Cloned repo (history is listed) or plain directory")
+    parser.add_argument("--exclude", action="append", default=[], help="Extra gitignore-style glob (repeatable)")
+    parser.add_argument("--no-defaults", action="store_true", help="Do not apply the built-in excludes")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024))
+    args = parser.parse_args()
+
+    path_filter = PathFilter.for_repo(args.source, args.exclude, use_defaults=not args.no_defaults,
+                                      max_bytes=int(args.max_mb * 1024 * 1024))
+    print(f"[✓] {scan_stats(args.source, path_filter).summary()}")
+
+
+if __name__ == "__main__":
+    main()
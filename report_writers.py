@@ -0,0 +1,176 @@
+"""
+Streaming report writers for Gitleaks-style findings.
+
+Every format is a generator of text chunks that consumes a findings
+iterator one finding at a time, so memory stays flat however many findings
+a scan has. The same generators back file exports (write_report), the
+Streamlit downloads and the Flask report endpoint (stream_report).
+
+    json    JSON array, one finding per line (Gitleaks --report-format json)
+    jsonl   one finding per line
+    csv     fixed Gitleaks columns, Tags JSON-encoded
+    sarif   SARIF 2.1.0, rules collected while streaming results
+
+    python report_writers.py <scan_id> --format sarif -o report.sarif
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+
+from finding_record import json_default
+
+# Gitleaks finding fields, in report order
+REPORT_FIELDS = [
+    "RuleID", "Description", "StartLine", "EndLine", "StartColumn", "EndColumn",
+    "Match", "Secret", "File", "SymlinkFile", "Commit", "Link", "Entropy",
+    "Author", "Email", "Date", "Message", "Tags", "Fingerprint",
+]
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+CHUNK_BYTES = 64 * 1024
+
+
+def iter_jsonl(findings):
+    for f in findings:
+        yield json.dumps(f, ensure_ascii=False, default=json_default) + "\n"
+
+
+def iter_json(findings):
+    yield "["
+    sep = "\n"
+    for f in findings:
+        yield sep + json.dumps(f, ensure_ascii=False, default=json_default)
+        sep = ",\n"
+    yield "\n]\n"
+
+
+def iter_csv(findings, fields=None):
+    fields = fields or REPORT_FIELDS
+    # One small reusable buffer: csv handles quoting, we hand out each line
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for f in findings:
+        row = {k: json.dumps(v, default=json_default) if isinstance(v, (list, dict)) else v for k, v in f.items()}
+        writer.writerow(row)
+        if buf.tell() >= CHUNK_BYTES:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def _sarif_result(f):
+    region = {}
+    for key, name in (("StartLine", "startLine"), ("EndLine", "endLine"),
+                      ("StartColumn", "startColumn"), ("EndColumn", "endColumn")):
+        if f.get(key):
+            region[name] = int(f[key])
+    if f.get("Match"):
+        region["snippet"] = {"text": f["Match"]}
+    location = {"artifactLocation": {"uri": f.get("File", "")}}
+    # SARIF 2.1.0: a region must locate something (startLine here); without one, leave it out
+    if "startLine" in region:
+        location["region"] = region
+    return {
+        "ruleId": f.get("RuleID", "unknown"),
+        "message": {"text": f"{f.get('RuleID', 'unknown')} has detected secret for file {f.get('File', '')}."},
+        "locations": [{"physicalLocation": location}],
+        "partialFingerprints": {
+            k: f[src] for k, src in (("commitSha", "Commit"), ("email", "Email"),
+                                     ("author", "Author"), ("date", "Date"),
+                                     ("commitMessage", "Message"), ("fingerprint", "Fingerprint"))
+            if f.get(src)
+        },
+    }
+
+
+def iter_sarif(findings, tool_name="LeakHawk", tool_version=None):
+    # "results" is written before "tool" so the rule list can be collected
+    # while streaming instead of needing a first pass over all findings
+    yield '{"$schema": "%s", "version": "2.1.0", "runs": [{"results": [' % SARIF_SCHEMA
+    rules = {}
+    sep = "\n"
+    for f in findings:
+        rule_id = f.get("RuleID", "unknown")
+        if rule_id not in rules:
+            rules[rule_id] = f.get("Description") or rule_id
+        yield sep + json.dumps(_sarif_result(f), ensure_ascii=False, default=json_default)
+        sep = ",\n"
+    driver = {
+        "name": tool_name,
+        "rules": [{"id": rid, "name": rid, "shortDescription": {"text": desc}} for rid, desc in rules.items()],
+    }
+    if tool_version:
+        driver["version"] = tool_version
+    yield '\n], "tool": {"driver": %s}}]}\n' % json.dumps(driver, ensure_ascii=False)
+
+
+# format -> (chunk generator, MIME type, file extension)
+FORMATS = {
+    "json": (iter_json, "application/json", ".json"),
+    "jsonl": (iter_jsonl, "application/x-ndjson", ".jsonl"),
+    "csv": (iter_csv, "text/csv", ".csv"),
+    "sarif": (iter_sarif, "application/sarif+json", ".sarif"),
+}
+
+
+def iter_report(findings, fmt="jsonl", **kwargs):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown report format {fmt!r} (expected one of {', '.join(FORMATS)})")
+    return FORMATS[fmt][0](findings, **kwargs)
+
+
+def stream_report(findings, fmt="jsonl", chunk_bytes=CHUNK_BYTES, **kwargs):
+    """Report as ~chunk_bytes UTF-8 blocks, for HTTP responses."""
+    pending, size = [], 0
+    for chunk in iter_report(findings, fmt, **kwargs):
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= chunk_bytes:
+            yield "".join(pending).encode("utf-8")
+            pending, size = [], 0
+    if pending:
+        yield "".join(pending).encode("utf-8")
+
+
+def write_report(findings, target, fmt="jsonl", **kwargs):
+    """Write findings to a path or text file object; returns the number written."""
+    count = 0
+
+    def counted():
+        nonlocal count
+        for f in findings:
+            count += 1
+            yield f
+
+    if hasattr(target, "write"):
+        for chunk in iter_report(counted(), fmt, **kwargs):
+            target.write(chunk)
+    else:
+        with open(target, "w", encoding="utf-8", newline="") as fp:
+            for chunk in iter_report(counted(), fmt, **kwargs):
+                fp.write(chunk)
+    return count
+
+
+def main():
+    from artifact_store import ArtifactStore
+
+    parser = argparse.ArgumentParser(description="Export a stored scan as a report.")
+    parser.add_argument("scan_id")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="jsonl")
+    parser.add_argument("-o", "--output", default=None, help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    findings = ArtifactStore().iter_findings(args.scan_id)
+    if args.output:
+        n = write_report(findings, args.output, args.format)
+        print(f"[✓] Wrote {n:,} findings to {args.output}")
+    else:
+        write_report(findings, sys.stdout, args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Per-rule cost profiler for LeakHawk's detection rules (rules.py).
+
+Two modes:
+
+  * corpus: scan real files (or the synthetic corpus from entropy.py) with a
+    RuleProfile attached and report, per rule, time spent, bytes examined,
+    keyword prefilter hits, regex attempts, matches and reported findings,
+    sorted by time. local_scan.py --profile-rules does the same inside a
+    real scan.
+  * adversarial: feed each rule inputs built from its own keywords (keyword
+    floods, keyword + long charset runs with no terminator, unterminated
+    blocks) at growing sizes and fit the growth exponent of its run time.
+    Rules whose cost grows clearly faster than the input are flagged.
+
+    python rule_profiler.py ~/src/project            # corpus mode on files
+    python rule_profiler.py --synthetic-mb 16        # corpus mode on synthetic text
+    python rule_profiler.py --adversarial            # super-linearity check
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+from rules import RULES, match_rule
+
+# Growth exponent (time ~ size^k) above which a rule is flagged as super-linear
+SUPERLINEAR_EXPONENT = 1.3
+# Below this run time at the largest size, timings are too noisy to judge
+NOISE_FLOOR_SECONDS = 0.005
+ADVERSARIAL_SIZES = (1024, 4 * 1024, 16 * 1024, 64 * 1024, 256 * 1024)
+# Larger sizes are not tried once one takes longer than this (enough signal, bounded cost)
+SIZE_BUDGET_SECONDS = 0.05
+# A check still running after this long is reported as catastrophic
+RULE_TIMEOUT_SECONDS = 30
+
+
+class RuleProfile:
+    """Per-rule totals: seconds, bytes, anchors, attempts, matches, reported."""
+
+    FIELDS = ("seconds", "bytes", "anchors", "attempts", "matches", "reported")
+
+    def __init__(self):
+        self.stats = {}
+
+    def run(self, rule, buf, start, end, lowered, limit):
+        """Run one rule over buf[start:end] (as rules.find_matches would) and account for it."""
+        counts = {}
+        t0 = time.perf_counter()
+        hits = list(match_rule(rule, buf, start, end, lowered, limit, counts))
+        elapsed = time.perf_counter() - t0
+        s = self.stats.setdefault(rule.id, dict.fromkeys(self.FIELDS, 0))
+        s["seconds"] += elapsed
+        s["bytes"] += end - start
+        s["anchors"] += counts["anchors"]
+        s["attempts"] += counts["attempts"]
+        s["matches"] += counts["matches"]
+        s["reported"] += len(hits)
+        return hits
+
+    def merge(self, other):
+        for rule_id, s in other.stats.items():
+            mine = self.stats.setdefault(rule_id, dict.fromkeys(self.FIELDS, 0))
+            for k in self.FIELDS:
+                mine[k] += s[k]
+
+    def rows(self):
+        """Report rows sorted by time spent, most expensive first."""
+        total = sum(s["seconds"] for s in self.stats.values()) or 1e-12
+        rows = []
+        for rule_id, s in self.stats.items():
+            mb = s["bytes"] / 1e6
+            rows.append({
+                "rule": rule_id,
+                "seconds": round(s["seconds"], 4),
+                "share": round(s["seconds"] / total, 4),
+                "mb_per_s": round(mb / s["seconds"], 1) if s["seconds"] else None,
+                "anchors_per_mb": round(s["anchors"] / mb, 1) if mb else 0,
+                # Share of prefilter hits that turned into a regex match
+                "hit_rate": round(s["matches"] / s["anchors"], 4) if s["anchors"] else None,
+                "attempts": s["attempts"],
+                "matches": s["matches"],
+                "reported": s["reported"],
+            })
+        return sorted(rows, key=lambda r: r["seconds"], reverse=True)
+
+    def report(self):
+        lines = [f"{'rule':26s} {'seconds':>9s} {'share':>6s} {'MB/s':>9s} {'anchors/MB':>11s} "
+                 f"{'hit rate':>9s} {'attempts':>9s} {'matches':>8s} {'reported':>8s}"]
+        for r in self.rows():
+            hit = f"{r['hit_rate']:.1%}" if r["hit_rate"] is not None else "-"
+            mbps = f"{r['mb_per_s']:,.1f}" if r["mb_per_s"] is not None else "-"
+            lines.append(f"{r['rule']:26s} {r['seconds']:9.3f} {r['share']:6.1%} {mbps:>9s} "
+                         f"{r['anchors_per_mb']:11,.1f} {hit:>9s} {r['attempts']:9,d} {r['matches']:8,d} {r['reported']:8,d}")
+        return "\n".join(lines)
+
+
+# ---------- adversarial inputs ----------
+
+def adversarial_inputs(rule, size):
+    """(name, bytes of about `size`) inputs aimed at one rule's prefilter and regex."""
+    kw = rule.keywords[0]
+    filler = b"A1b2" * (size // 4)
+    return [
+        # Every position is a prefilter hit
+        ("keyword-flood", (kw * (size // len(kw) + 1))[:size]),
+        # Keyword, assignment and a long valid-looking run that never terminates
+        ("unterminated-run", (kw + b" = " + filler)[:size]),
+        # Many near-misses: keyword + assignment + short run + bad terminator
+        ("near-miss", ((kw + b"_x = '" + b"A1b2" * 12 + b"\x00") * (size // (len(kw) + 55) + 1))[:size]),
+        # Block-style rules (private keys): openings that never close
+        ("unclosed-block", ((kw.upper() + b" PRIVATE KEY-----\n" + b"QUJD" * 40 + b"\n") * (size // 200 + 1))[:size]),
+    ]
+
+
+def time_rule(rule, data, repeat=3):
+    """Best-of-`repeat` seconds for one rule over `data`."""
+    lowered = data.lower()
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in match_rule(rule, data, 0, len(data), lowered, len(data)):
+            pass
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _growth(rule, kind, sizes):
+    """Seconds at each size for one input kind, stopping once a size takes longer than SIZE_BUDGET_SECONDS."""
+    seconds = []
+    for size in sizes:
+        data = dict(adversarial_inputs(rule, size))[kind]
+        seconds.append(time_rule(rule, data))
+        if seconds[-1] > SIZE_BUDGET_SECONDS:
+            break
+    return seconds
+
+
+def check_superlinear(rules=RULES, sizes=ADVERSARIAL_SIZES, timeout=RULE_TIMEOUT_SECONDS):
+    """
+    One result per (rule, input kind): seconds per size, fitted growth
+    exponent and whether it is flagged. Sorted worst first. Each check runs
+    in a child process; one that does not finish within `timeout`
+    (catastrophic backtracking) is flagged with exponent inf.
+    """
+    import multiprocessing
+
+    results = []
+    for rule in rules:
+        for kind, _ in adversarial_inputs(rule, sizes[0]):
+            pool = multiprocessing.Pool(1)
+            try:
+                seconds = pool.apply_async(_growth, (rule, kind, sizes)).get(timeout)
+            except multiprocessing.TimeoutError:
+                seconds = None
+            finally:
+                pool.terminate()
+            if seconds is None:
+                results.append({"rule": rule.id, "input": kind, "seconds": [], "exponent": float("inf"),
+                                "flagged": True, "mb_per_s": 0.0})
+                continue
+            done = sizes[:len(seconds)]
+            # Slope between the two largest sizes: small inputs are dominated by fixed costs
+            lo, hi = max(seconds[-2] if len(seconds) > 1 else 0, 1e-7), max(seconds[-1], 1e-7)
+            exponent = math.log(hi / lo) / math.log(done[-1] / done[-2]) if len(done) > 1 else float("inf")
+            flagged = exponent > SUPERLINEAR_EXPONENT and seconds[-1] > NOISE_FLOOR_SECONDS
+            results.append({"rule": rule.id, "input": kind, "seconds": [round(t, 5) for t in seconds],
+                            "exponent": round(exponent, 2), "flagged": flagged,
+                            "mb_per_s": round(done[-1] / 1e6 / hi, 1)})
+    return sorted(results, key=lambda r: (not r["flagged"], r["mb_per_s"]))
+
+
+# ---------- corpus mode ----------
+
+def profile_paths(paths, chunk_bytes=8 * 1024 * 1024):
+    """Profile every rule over files/directories (path filter applied to directories)."""
+    from path_filter import PathFilter, enumerate_tree
+
+    profile = RuleProfile()
+    for path in paths:
+        if os.path.isdir(path):
+            files = [os.path.join(path, rel) for rel, _ in enumerate_tree(path, PathFilter.for_repo(path, max_bytes=0))]
+        else:
+            files = [path]
+        for name in files:
+            with open(name, "rb") as f:
+                while True:
+                    chunk = f.read(chunk_bytes)
+                    if not chunk:
+                        break
+                    lowered = chunk.lower()
+                    for rule in RULES:
+                        profile.run(rule, chunk, 0, len(chunk), lowered, len(chunk))
+    return profile
+
+
+def profile_bytes(data):
+    profile = RuleProfile()
+    lowered = data.lower()
+    for rule in RULES:
+        profile.run(rule, data, 0, len(data), lowered, len(data))
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the cost of each detection rule.")
+    parser.add_argument("paths", nargs="*", help="Files or directories to profile on")
+    parser.add_argument("--synthetic-mb", type=float, default=None, help="Profile on synthetic text instead")
+    parser.add_argument("--adversarial", action="store_true", help="Check rules for super-linear run time")
+    args = parser.parse_args()
+
+    if args.adversarial:
+        results = check_superlinear()
+        print(f"{'rule':26s} {'input':18s} {'exponent':>8s} {'MB/s':>9s}  seconds at {', '.join(f'{s // 1024}K' for s in ADVERSARIAL_SIZES)}")
+        for r in results:
+            mark = "✗" if r["flagged"] else " "
+            print(f"{mark} {r['rule']:24s} {r['input']:18s} {r['exponent']:8.2f} {r['mb_per_s']:9.1f}  "
+                  f"{', '.join(f'{t:.4f}' for t in r['seconds'])}")
+        flagged = [r for r in results if r["flagged"]]
+        print(f"[{'✗' if flagged else '✓'}] {len(flagged)} super-linear (rule, input) pair(s) "
+              f"(exponent > {SUPERLINEAR_EXPONENT})")
+        return 1 if flagged else 0
+
+    if args.paths:
+        profile = profile_paths(args.paths)
+    else:
+        from entropy import synthetic_text
+        profile = profile_bytes(synthetic_text(int((args.synthetic_mb or 16) * 1024 * 1024)))
+    print(profile.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+LeakHawk's own detection rules, for scans that do not shell out to Gitleaks.
+
+A trimmed port of Gitleaks' default rules as bytes regexes, so they run
+directly over mmap'd files and archive members without decoding. Every
+match starts with one of its rule's lowercase keywords (or contains it
+within `lead` bytes of its start). Keyword occurrences are located with
+bytes.find on the lowercased chunk and the regex is only tried there,
+instead of searching the whole chunk; that keeps generic-api-key's
+case-insensitive pattern from dominating scan time. Each keyword costs one
+pass over the chunk, so keep the lists short.
+
+Findings use the Gitleaks JSON schema (make_finding), so everything
+downstream (classifier, artifact store, report writers) treats them alike.
+"""
+import math
+import re
+from collections import Counter, namedtuple
+
+# `lead`: how many bytes before a keyword occurrence a match may start
+Rule = namedtuple("Rule", "id description regex keywords secret_group min_entropy extend_left lead",
+                  defaults=(0,))
+
+# Longest match any rule can produce; chunked scanners overlap by more than this
+MAX_MATCH_BYTES = 12 * 1024
+# Identifier characters a generic match is extended over to the left (e.g. CLOUDINARY_API_SECRET)
+_IDENT = frozenset(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_.-")
+
+RULES = [
+    Rule("aws-access-token", "Identified a pattern that may indicate AWS credentials, risking unauthorized cloud resource access and data breaches on AWS platforms.",
+         re.compile(rb"\b((?:A3T[A-Z0-9]|AKIA|ASIA|ABIA|ACCA)[A-Z0-9]{16})\b"),
+         (b"a3t", b"akia", b"asia", b"abia", b"acca"), 1, 3.0, False),
+    Rule("github-pat", "Uncovered a GitHub Personal Access Token, potentially leading to unauthorized repository access and sensitive content exposure.",
+         re.compile(rb"\b(ghp_[0-9a-zA-Z]{36})\b"), (b"ghp_",), 1, 3.0, False),
+    Rule("github-fine-grained-pat", "Found a GitHub Fine-Grained Personal Access Token, risking unauthorized repository access and code manipulation.",
+         re.compile(rb"\b(github_pat_[0-9a-zA-Z_]{82})\b"), (b"github_pat_",), 1, 3.0, False),
+    Rule("github-oauth", "Discovered a GitHub OAuth Access Token, posing a risk of compromised GitHub account integrations and data leaks.",
+         re.compile(rb"\b(gho_[0-9a-zA-Z]{36})\b"), (b"gho_",), 1, 3.0, False),
+    Rule("gitlab-pat", "Identified a GitLab Personal Access Token, risking unauthorized access to GitLab repositories and codebase exposure.",
+         re.compile(rb"\b(glpat-[0-9a-zA-Z_-]{20})\b"), (b"glpat-",), 1, 3.0, False),
+    Rule("slack-bot-token", "Identified a Slack Bot token, which may compromise bot integrations and communication channel security.",
+         re.compile(rb"\b(xox[baprs]-[0-9a-zA-Z-]{10,72})\b"), (b"xox",), 1, 3.0, False),
+    Rule("slack-webhook-url", "Discovered a Slack Webhook, which could lead to unauthorized message posting and data leakage in Slack channels.",
+         re.compile(rb"(https?://hooks\.slack\.com/(?:services|workflows)/[A-Za-z0-9+/]{43,56})"), (b"hooks.slack.com",), 1, 0.0, False, 8),
+    Rule("stripe-access-token", "Found a Stripe Access Token, posing a risk to payment processing services and sensitive financial data.",
+         re.compile(rb"\b((?:sk|rk)_(?:test|live|prod)_[0-9a-zA-Z]{10,99})\b"), (b"sk_", b"rk_"), 1, 2.0, False),
+    Rule("gcp-api-key", "Uncovered a GCP API key, which could lead to unauthorized access to Google Cloud services and data breaches.",
+         re.compile(rb"\b(AIza[0-9A-Za-z_-]{35})\b"), (b"aiza",), 1, 3.0, False),
+    Rule("private-key", "Identified a Private Key, which may compromise cryptographic security and sensitive data encryption.",
+         re.compile(rb"(-----BEGIN[ A-Z0-9_-]{0,100}PRIVATE KEY(?: BLOCK)?-----[\s\S]{64,10240}?-----END[ A-Z0-9_-]{0,100}PRIVATE KEY(?: BLOCK)?-----)"),
+         (b"-----begin",), 1, 0.0, False),
+    Rule("jwt", "Uncovered a JSON Web Token, which may lead to unauthorized access to web applications and sensitive user data.",
+         re.compile(rb"\b(ey[a-zA-Z0-9]{17,2048}\.ey[a-zA-Z0-9/\\_-]{17,4096}\.(?:[a-zA-Z0-9/\\_-]{10,2048}={0,2})?)"),
+         (b"ey",), 1, 3.0, False),
+    Rule("generic-api-key", "Detected a Generic API Key, potentially exposing access to various services and sensitive operations.",
+         re.compile(rb"(?i)(?:access|auth|api|credential|creds|key|passwd|password|secret|token)[ \t\w.-]{0,20}[\s'\"]{0,3}"
+                    rb"(?:=|>|:{1,3}=|\|\||:|=>|\?=|,)[`'\"\s=]{0,5}([\w.=-]{10,150})(?=[`'\"\s;]|\\[nr]|$)"),
+         (b"access", b"auth", b"api", b"cred", b"key", b"pass", b"secret", b"token"),
+         1, 3.5, True),
+]
+
+
+def shannon_entropy(data: bytes) -> float:
+    """Shannon entropy in bits per byte (Gitleaks reports the same measure)."""
+    if not data:
+        return 0.0
+    n = len(data)
+    return -sum(c / n * math.log2(c / n) for c in Counter(data).values())
+
+
+def extend_left(buf, start, limit=50):
+    """Move `start` left over identifier characters, e.g. to include a variable name prefix."""
+    stop = max(0, start - limit)
+    while start > stop and buf[start - 1] in _IDENT:
+        start -= 1
+    return start
+
+
+def find_matches(buf, start=0, end=None, lowered=None, rules=RULES, limit=None, profile=None):
+    """
+    Yield (rule, match_start, match_end, secret_bytes) for matches in
+    buf[start:end]. `buf` may be bytes or an mmap; `lowered` is the
+    lowercased bytes of buf[start:end] for the keyword prefilter. With
+    `limit`, only matches whose pattern starts before it are kept (chunked
+    callers pass their chunk end so overlap regions are not reported twice).
+    `profile` (rule_profiler.RuleProfile) records per-rule cost when given.
+    """
+    end = len(buf) if end is None else end
+    if lowered is None:
+        lowered = bytes(buf[start:end]).lower()
+    limit = end if limit is None else limit
+    for rule in rules:
+        if profile is None:
+            yield from match_rule(rule, buf, start, end, lowered, limit)
+        else:
+            yield from profile.run(rule, buf, start, end, lowered, limit)
+
+
+def match_rule(rule, buf, start, end, lowered, limit, counts=None):
+    """
+    One rule's matches (see find_matches). `counts`, if given, is a dict
+    that gets "anchors" (keyword prefilter hits), "attempts" (regex match
+    calls) and "matches" (before the entropy check) added.
+    """
+    anchors = set()
+    for kw in rule.keywords:
+        i = lowered.find(kw)
+        while i != -1 and start + i - rule.lead < limit:
+            anchors.add(start + i)
+            i = lowered.find(kw, i + 1)
+    attempts = matches = 0
+    last_end = start
+    for k in sorted(anchors):
+        if k < last_end:
+            # Inside the previous match (e.g. "key" in "api_key = ..."), like finditer
+            continue
+        for p in range(max(last_end, k - rule.lead), k + 1):
+            attempts += 1
+            m = rule.regex.match(buf, p, end)
+            if m is not None:
+                break
+        if m is None or m.start() >= limit:
+            continue
+        last_end = m.end()
+        matches += 1
+        secret = m.group(rule.secret_group)
+        if rule.min_entropy and shannon_entropy(secret) < rule.min_entropy:
+            continue
+        m_start = extend_left(buf, m.start()) if rule.extend_left else m.start()
+        yield rule, m_start, m.end(), secret
+    if counts is not None:
+        counts["anchors"] = counts.get("anchors", 0) + len(anchors)
+        counts["attempts"] = counts.get("attempts", 0) + attempts
+        counts["matches"] = counts.get("matches", 0) + matches
+
+
+def make_finding(rule, path, start_line, start_column, match: bytes, secret: bytes, **extra):
+    """A finding in Gitleaks' JSON report schema; git metadata defaults to empty."""
+    match_text = match.decode("utf-8", errors="replace")
+    end_line = start_line + match_text.count("\n")
+    last_line = match_text.rsplit("\n", 1)[-1]
+    end_column = (start_column + len(last_line) - 1) if end_line == start_line else len(last_line)
+    finding = {
+        "RuleID": rule.id,
+        "Description": rule.description,
+        "StartLine": start_line,
+        "EndLine": end_line,
+        "StartColumn": start_column,
+        "EndColumn": end_column,
+        "Match": match_text,
+        "Secret": secret.decode("utf-8", errors="replace"),
+        "File": path,
+        "SymlinkFile": "",
+        "Commit": "",
+        "Link": "",
+        "Entropy": round(shannon_entropy(secret), 6),
+        "Author": "",
+        "Email": "",
+        "Date": "",
+        "Message": "",
+        "Tags": [],
+    }
+    finding.update(extra)
+    # Gitleaks' fingerprint formats for git and non-git scans
+    prefix = f"{finding['Commit']}:" if finding["Commit"] else ""
+    finding["Fingerprint"] = f"{prefix}{path}:{rule.id}:{start_line}"
+    return finding
+
+
+def scan_bytes(data: bytes, path, rules=RULES, entropy=False, first_line=1, **extra):
+    """
+    Findings for one in-memory buffer (archive member, diff hunk, blob).
+    With `entropy`, high-entropy tokens outside rule matches are added.
+    `first_line` is the line number of data's first line in `path`.
+    """
+    hits = list(find_matches(data, 0, len(data), data.lower(), rules))
+    if entropy:
+        from entropy import find_high_entropy
+        spans = [(h[1], h[2]) for h in hits]
+        hits += [h for h in find_high_entropy(data)
+                 if not any(s <= h[1] and h[2] <= e for s, e in spans)]
+    hits.sort(key=lambda h: h[1])
+    findings = []
+    line, cursor = first_line, 0
+    for rule, start, end, secret in hits:
+        line += data.count(b"\n", cursor, start)
+        cursor = start
+        column = start - (data.rfind(b"\n", 0, start) + 1) + 1
+        findings.append(make_finding(rule, path, line, column, data[start:end], secret, **extra))
+    return findings
@@ -1,88 +1,194 @@
+import argparse
 import subprocess
 import os
+import json
 import shutil
 import sys
 
-def clone_repo(repo_url, clone_dir="repo-temp"):
+from metrics import ScanTimer, dir_bytes
+from path_filter import PathFilter, gitleaks_args, scan_stats
+from scan_cache import is_remote_url
+
+REPORT_PATH = "gitleaks-report.json"
+
+def clone_repo(repo_url, clone_dir="repo-temp", timer=None):
     print("[*] Cloning repository...")
+    timer = timer or ScanTimer()
     try:
         if os.path.exists(clone_dir):
             shutil.rmtree(clone_dir)
 
-        subprocess.run(
-            ["git", "clone", repo_url, clone_dir],
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
+        with timer.stage("clone") as rec:
+            subprocess.run(
+                ["git", "clone", repo_url, clone_dir],
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            rec["bytes"] = dir_bytes(clone_dir)
         print(f"[✓] Repository cloned to: {clone_dir}")
         return clone_dir
     except subprocess.CalledProcessError:
         print("[✗] Failed to clone repository.")
         return None
 
-def run_trufflehog(repo_url):
+def run_trufflehog(repo_url, timer=None):
     print("[🔍] Running TruffleHog directly on GitHub URL...")
+    timer = timer or ScanTimer()
     try:
-        result = subprocess.run(
-            ["trufflehog", repo_url],
-            capture_output=True,
-            text=True
-        )
+        with timer.stage("trufflehog") as rec:
+            result = subprocess.run(
+                ["trufflehog", repo_url],
+                capture_output=True,
+                text=True
+            )
+            rec["bytes"] = len(result.stdout or "")
         print("[✓] TruffleHog scan completed successfully.")
         print("===== 🚨 TruffleHog Results 🚨 =====")
         print(result.stdout or "No results from TruffleHog.")
     except FileNotFoundError:
         print("[✗] TruffleHog is not installed or not in PATH.")
 
-def run_gitleaks(local_path):
+def run_gitleaks(local_path, timer=None, archives=False):
+    """True when Gitleaks ran and its report was processed."""
     print("[🔍] Running Gitleaks on local repo...")
+    timer = timer or ScanTimer()
+    path_filter = PathFilter.for_repo(local_path)
+    scanned_bytes = None
     try:
-        result = subprocess.run(
-            [
-                "gitleaks", "detect",
-                "--source", local_path,
-                "--report-format", "json",
-                "--report-path", "gitleaks-report.json"
-            ],
-            capture_output=True,
-            text=True
-        )
-
+        stats = scan_stats(local_path, path_filter)
+        scanned_bytes = stats.scanned_bytes
+        print(f"[✓] Blob filter: {stats.summary()}")
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"[⚠️] Could not enumerate blobs: {e}")
+    extra_args = gitleaks_args(path_filter)
+    try:
+        with timer.stage("gitleaks") as rec:
+            result = subprocess.run(
+                [
+                    "gitleaks", "detect",
+                    "--source", local_path,
+                    "--report-format", "json",
+                    "--report-path", REPORT_PATH
+                ] + extra_args,
+                capture_output=True,
+                text=True
+            )
+            if scanned_bytes is not None:
+                rec["bytes"] = scanned_bytes
         print("[✓] Gitleaks scan completed.")
-
-        if os.path.exists("gitleaks-report.json"):
-            with open("gitleaks-report.json", "r") as f:
-                data = f.read()
-                if data.strip() and data.strip() != "[]":
-                    print("===== 🚨 Gitleaks Results 🚨 =====")
-                    print(data)
-                else:
-                    print("No leaks found in JSON report.")
-        else:
-            print("Report file not found.")
-
         if result.stderr:
             print("STDERR:\n", result.stderr)
     except FileNotFoundError:
         print("[✗] Gitleaks is not installed or not in PATH.")
+        return False
+    finally:
+        os.remove(extra_args[1])
 
-def main():
-    if len(sys.argv) > 1:
-        repo_url = sys.argv[1]
+    if not os.path.exists(REPORT_PATH):
+        print(f"[✗] Gitleaks wrote no report (exit code {result.returncode}).")
+        return False
+    archive_findings = []
+    if archives:
+        # Its own failure must not cost the Gitleaks results
+        try:
+            archive_findings = run_archive_scan(local_path, path_filter, timer)
+        except Exception as e:
+            print(f"[⚠️] Archive scan failed: {e}")
+    process_report(local_path, timer, archive_findings)
+    return True
+
+def process_report(local_path, timer, extra_findings=()):
+    """
+    Merge extra (archive) findings into the report and drop baselined ones.
+    The report is what everything downstream reads: the job queue, the ML
+    step and the artifact store.
+    """
+    from baseline import Baseline
+    from finding_record import load_findings, to_findings
+
+    with timer.stage("report_parse") as rec:
+        rec["bytes"] = os.path.getsize(REPORT_PATH)
+        findings = load_findings(REPORT_PATH)
+        rec["findings"] = len(findings)
+    findings += to_findings(extra_findings)
+    with timer.stage("baseline") as rec:
+        findings, rec["findings"] = Baseline.for_repo(local_path).split(findings)
+    if rec["findings"]:
+        print(f"[✓] Baseline: {rec['findings']} known finding(s) suppressed")
+    if rec["findings"] or extra_findings:
+        with open(REPORT_PATH, "w", encoding="utf-8") as out:
+            json.dump([dict(f) for f in findings], out, indent=1)
+    if findings:
+        print("===== 🚨 Gitleaks Results 🚨 =====")
+        print(json.dumps([dict(f) for f in findings], indent=1))
+    else:
+        print("No leaks found in JSON report.")
+
+def run_archive_scan(local_path, path_filter, timer=None):
+    # Gitleaks skips archives as binary; walk their members in memory instead
+    from archive_scan import scan_history_archives
+    from path_filter import ScanStats
+
+    timer = timer or ScanTimer()
+    stats = ScanStats()
+    with timer.stage("archives") as rec:
+        findings = scan_history_archives(local_path, path_filter, stats=stats)
+        rec["bytes"], rec["findings"] = stats.scanned_bytes, len(findings)
+    print(f"[✓] Archive scan: {len(findings)} findings; members {stats.summary()}")
+    return findings
+
+def run_local_scan(source):
+    from local_scan import scan_local
+    from path_filter import ScanStats
+
+    print(f"[🔍] Scanning local path in place: {source}")
+    stats = ScanStats()
+    findings = scan_local(source, stats=stats)
+    print(f"[✓] Local scan completed; {stats.summary()}")
+    with open(REPORT_PATH, "w") as f:
+        json.dump(findings, f, indent=1)
+    if findings:
+        print("===== 🚨 LeakHawk Results 🚨 =====")
+        print(json.dumps(findings, indent=1))
     else:
-        repo_url = input("Enter GitHub Repo URL: ").strip()
+        print("No leaks found.")
+
+def main():
+    """Exit code 0 when the scan completed (with or without findings), 1 when clone or Gitleaks failed."""
+    parser = argparse.ArgumentParser(description="Scan a repository with TruffleHog and Gitleaks.")
+    parser.add_argument("repo_url", nargs="?", help="Repository URL (prompted for if omitted)")
+    parser.add_argument("--local", action="store_true",
+                        help="Treat repo_url as a local file or directory and scan it in place, without cloning")
+    parser.add_argument("--archives", action="store_true",
+                        help="Also scan inside zip/jar/tar.gz blobs of the history (merged into the report)")
+    args = parser.parse_args()
+    repo_url = args.repo_url or input("Enter GitHub Repo URL: ").strip()
 
-    run_trufflehog(repo_url)
+    # Local paths only on request: the API runs this script with URLs from HTTP clients
+    if args.local:
+        run_local_scan(repo_url)
+        return 0
+    if not is_remote_url(repo_url):
+        parser.error(f"{repo_url!r} is not a remote repository URL (use --local to scan a local path)")
 
-    local_path = clone_repo(repo_url)
+    timer = ScanTimer()
+    run_trufflehog(repo_url, timer)
+
+    local_path = clone_repo(repo_url, timer=timer)
+    ok = False
     if local_path:
-        run_gitleaks(local_path)
+        ok = run_gitleaks(local_path, timer, archives=args.archives)
         try:
             shutil.rmtree(local_path)
             print(f"[🧹] Removed temporary directory: {local_path}")
         except Exception as e:
             print(f"[⚠️] Failed to remove temporary directory: {e}")
 
+    # Per-stage breakdown next to the report, picked up by the API's job runner
+    timer.save()
+    print(f"[⏱️] {timer.summary()}")
+    return 0 if ok else 1
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Cache of scan results keyed by what they depend on.
+
+A scan's output is a function of (normalized repo URL, HEAD commit, engine
+and rule versions, scan options), so a repeated scan of an unchanged repo
+can be answered from disk. The HEAD is resolved with `git ls-remote`, which
+costs one round trip instead of a clone.
+
+    scan_artifacts/scan_cache/index.db          key -> entry (SQLite)
+    scan_artifacts/scan_cache/<key>.json.gz     cached result
+
+Entries expire after ttl_seconds. Beyond max_total_mb, the least recently
+used entries are evicted first. mllh.py keeps the current result in
+st.session_state as well, so widget reruns never reach this cache.
+
+    python scan_cache.py list
+    python scan_cache.py prune [--ttl-hours 24] [--max-total-mb 256]
+    python scan_cache.py clear
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+CACHE_DIR = Path("scan_artifacts") / "scan_cache"
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_TOTAL_MB = 256
+# Bump when the cached payload layout changes
+CACHE_VERSION = 1
+
+
+def normalize_repo_url(repo_url: str) -> str:
+    """One spelling per repository: no scheme, credentials, .git suffix or trailing slash; lowercase host."""
+    url = repo_url.strip()
+    m = re.match(r"^[\w.-]+@([\w.-]+):(?!//)(.+)$", url)  # scp-style git@host:owner/repo
+    if m:
+        url = f"{m.group(1)}/{m.group(2)}"
+    url = re.sub(r"^[a-z+]+://", "", url, flags=re.I)
+    url = re.sub(r"^[^/@]*@", "", url)  # user[:token]@
+    url = re.sub(r"(\.git)?/*$", "", url)
+    host, _, path = url.partition("/")
+    # GitHub / GitLab paths are case-insensitive
+    return f"{host.lower()}/{path.lower() if host.lower() in ('github.com', 'gitlab.com') else path}"
+
+
+def is_remote_url(repo_url: str) -> bool:
+    """
+    True for http(s)/ssh/git URLs and scp-style git@host:path; False for local
+    paths and file:// (or other transport) URLs, which would read the server's
+    own filesystem.
+    """
+    url = repo_url.strip()
+    return bool(re.match(r"^(https?|ssh|git)://[^/\s]+/\S+$", url, flags=re.I)
+                or re.match(r"^[\w.-]+@[\w.-]+:(?!//)[^\s]+$", url))
+
+
+def resolve_head(repo_url, timeout=20):
+    """Commit SHA the repo's HEAD points to, or None if it cannot be resolved."""
+    try:
+        result = subprocess.run(["git", "ls-remote", repo_url, "HEAD"], capture_output=True, text=True,
+                                timeout=timeout, env={**os.environ, "GIT_TERMINAL_PROMPT": "0"})
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    fields = result.stdout.split()
+    return fields[0] if result.returncode == 0 and fields else None
+
+
+def _tool_version(cmd):
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return "missing"
+    lines = (result.stdout or result.stderr).strip().splitlines()
+    return lines[0] if lines else "unknown"
+
+
+@lru_cache(maxsize=1)
+def engine_version():
+    """Gitleaks and TruffleHog versions plus a digest of rules.py's rules (computed once per process)."""
+    from rules import RULES
+
+    rules_digest = hashlib.sha256(repr([(r.id, r.regex.pattern, r.keywords, r.min_entropy) for r in RULES])
+                                  .encode()).hexdigest()[:12]
+    return (f"gitleaks={_tool_version(['gitleaks', 'version'])};"
+            f"trufflehog={_tool_version(['trufflehog', '--version'])};rules={rules_digest}")
+
+
+def cache_key(repo_url, head, options=None, engine=None):
+    """Hex key of (normalized URL, HEAD, engine version, options)."""
+    parts = [CACHE_VERSION, normalize_repo_url(repo_url), head, engine or engine_version(), options or {}]
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:32]
+
+
+class ScanCache:
+    def __init__(self, root=CACHE_DIR, ttl_seconds=DEFAULT_TTL_SECONDS, max_total_mb=DEFAULT_MAX_TOTAL_MB):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_total_mb = max_total_mb
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    repo TEXT NOT NULL,
+                    head TEXT NOT NULL,
+                    engine TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    bytes INTEGER NOT NULL
+                )""")
+            db.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (last_used)")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.root / "index.db", timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _path(self, key):
+        return self.root / f"{key}.json.gz"
+
+    def get(self, key):
+        """Cached result for key, or None when missing or expired."""
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds and now - row[0] > self.ttl_seconds:
+                self._delete(db, key)
+                return None
+            db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+        try:
+            with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._connect() as db:
+                self._delete(db, key)
+            return None
+        entry["cached_at"] = row[0]
+        return entry
+
+    def put(self, key, repo_url, head, result):
+        """Store a JSON-serializable result (Finding records included) and apply eviction."""
+        from finding_record import json_default
+
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(result, f, default=json_default)
+        tmp.replace(path)
+        now = time.time()
+        with self._lock, self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (key, normalize_repo_url(repo_url), head, engine_version(), now, now, path.stat().st_size))
+        self.prune()
+
+    def _delete(self, db, key):
+        db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._path(key).unlink(missing_ok=True)
+
+    def prune(self, ttl_seconds=None, max_total_mb=None):
+        """Drop expired entries, then least recently used ones down to max_total_mb."""
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        max_total_mb = self.max_total_mb if max_total_mb is None else max_total_mb
+        removed = 0
+        with self._lock, self._connect() as db:
+            if ttl_seconds:
+                for (key,) in db.execute("SELECT key FROM entries WHERE created_at < ?",
+                                         (time.time() - ttl_seconds,)).fetchall():
+                    self._delete(db, key)
+                    removed += 1
+            if max_total_mb:
+                total = db.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+                limit = max_total_mb * 1024 * 1024
+                for key, size in db.execute("SELECT key, bytes FROM entries ORDER BY last_used").fetchall():
+                    if total <= limit:
+                        break
+                    self._delete(db, key)
+                    total -= size
+                    removed += 1
+        return removed
+
+    def clear(self):
+        with self._lock, self._connect() as db:
+            keys = [key for (key,) in db.execute("SELECT key FROM entries").fetchall()]
+            for key in keys:
+                self._delete(db, key)
+        return len(keys)
+
+    def list_entries(self):
+        with self._connect() as db:
+            rows = db.execute("SELECT key, repo, head, engine, created_at, last_used, bytes FROM entries "
+                              "ORDER BY last_used DESC").fetchall()
+        return [dict(zip(("key", "repo", "head", "engine", "created_at", "last_used", "bytes"), r)) for r in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or prune the LeakHawk scan result cache.")
+    parser.add_argument("--root", default=str(CACHE_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    p_prune = sub.add_parser("prune")
+    p_prune.add_argument("--ttl-hours", type=float, default=DEFAULT_TTL_SECONDS / 3600)
+    p_prune.add_argument("--max-total-mb", type=float, default=DEFAULT_MAX_TOTAL_MB)
+    sub.add_parser("clear")
+    args = parser.parse_args()
+
+    cache = ScanCache(args.root)
+    if args.command == "list":
+        for e in cache.list_entries():
+            age = (time.time() - e["created_at"]) / 3600
+            print(f"{e['key']}  {e['head'][:12]}  {age:6.1f}h  {e['bytes'] / 1024:8.1f} KB  {e['repo']}")
+    elif args.command == "prune":
+        removed = cache.prune(int(args.ttl_hours * 3600), args.max_total_mb)
+        print(f"[✓] Evicted {removed} entr{'y' if removed == 1 else 'ies'}")
+    else:
+        print(f"[✓] Cleared {cache.clear()} entries")
+
+
+if __name__ == "__main__":
+    main()
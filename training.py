@@ -0,0 +1,401 @@
+"""
+Shared training building blocks for LeakHawk models.
+
+leak-hawk-ml.py and the other training tools build their preprocessing and
+XGBoost model from here so every mode trains the same thing.
+
+Feature modes:
+  tfidf  - TfidfVectorizer(max_features=5000, ngram_range=(1, 2)) on
+           Data_Snippet, one-hot categoricals (the original pipeline).
+  hashed - HashingVectorizer over word 1-2 grams and char_wb 3-5 grams,
+           hashed categoricals. No vocabulary: stateless, streamable and
+           a fixed memory footprint set by `n_features`.
+"""
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.compose import ColumnTransformer
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+from xgboost import XGBClassifier
+
+FEATURE_COLUMNS = ["Data_Snippet", "Pattern_Matched", "Risk_Score", "Anomaly_Flag"]
+CATEGORICAL_COLUMNS = ["Pattern_Matched", "Anomaly_Flag"]
+TARGET_COLUMN = "Leak_Type"
+FEATURE_MODES = ("tfidf", "hashed")
+
+# Hash space per text analyzer (word / char); categoricals get a small one
+HASH_FEATURES = 2 ** 12
+HASH_CAT_FEATURES = 2 ** 8
+
+MODEL_PARAMS = dict(
+    eval_metric="mlogloss",
+    use_label_encoder=False,
+    n_estimators=300,
+    learning_rate=0.1,
+    max_depth=6,
+    subsample=0.8,
+    colsample_bytree=0.8,
+)
+
+
+def category_tokens(X):
+    """Turn categorical columns into 'column=value' tokens for FeatureHasher."""
+    X = pd.DataFrame(X)
+    return [
+        [f"{col}={val}" for col, val in zip(X.columns, row)]
+        for row in X.astype(str).itertuples(index=False, name=None)
+    ]
+
+
+def build_preprocessor(mode="tfidf", n_features=HASH_FEATURES):
+    if mode == "tfidf":
+        return ColumnTransformer(
+            transformers=[
+                ("text", TfidfVectorizer(max_features=5000, ngram_range=(1, 2)), "Data_Snippet"),
+                ("cat", OneHotEncoder(handle_unknown="ignore"), CATEGORICAL_COLUMNS),
+                ("num", "passthrough", ["Risk_Score"]),
+            ]
+        )
+    if mode == "hashed":
+        return ColumnTransformer(
+            transformers=[
+                ("words", HashingVectorizer(ngram_range=(1, 2), n_features=n_features,
+                                            alternate_sign=False), "Data_Snippet"),
+                # Secrets rarely split into words; char n-grams see their shape
+                ("chars", HashingVectorizer(analyzer="char_wb", ngram_range=(3, 5),
+                                            n_features=n_features, alternate_sign=False), "Data_Snippet"),
+                ("cat", Pipeline([
+                    ("tokens", FunctionTransformer(category_tokens)),
+                    ("hash", FeatureHasher(n_features=HASH_CAT_FEATURES, input_type="string",
+                                           alternate_sign=False)),
+                ]), CATEGORICAL_COLUMNS),
+                ("num", "passthrough", ["Risk_Score"]),
+            ]
+        )
+    raise ValueError(f"Unknown feature mode: {mode!r} (expected one of {FEATURE_MODES})")
+
+
+def build_model(**overrides):
+    return XGBClassifier(**{**MODEL_PARAMS, **overrides})
+
+
+def build_pipeline(mode="tfidf", **model_overrides):
+    return Pipeline([
+        ("preprocessor", build_preprocessor(mode)),
+        ("classifier", build_model(**model_overrides)),
+    ])
+
+
+def split_dataset(df, label_encoder, test_size=0.2):
+    """Encode Leak_Type and split exactly like the original training script."""
+    y = label_encoder.fit_transform(df[TARGET_COLUMN])
+    X = df[FEATURE_COLUMNS]
+    return train_test_split(X, y, test_size=test_size, random_state=42, stratify=y)
+
+
+def validation_split(X_train, y_train, seed=42):
+    """(X_tr, X_val, y_tr, y_val): the validation rows search_hyperparameters carves out of training."""
+    return train_test_split(X_train, y_train, test_size=0.2, random_state=seed, stratify=y_train)
+
+
+# ========= Out-of-core training =========
+# Explicit dtypes: no inference pass, categoricals stored as small codes per chunk
+TRAIN_DTYPES = {
+    "Data_Snippet": "string",
+    "Pattern_Matched": "category",
+    "Risk_Score": "float32",
+    "Anomaly_Flag": "category",
+    TARGET_COLUMN: "category",
+}
+
+
+def iter_chunks(path, chunksize=100_000, columns=None):
+    """Yield DataFrames of at most `chunksize` rows from a CSV or Parquet file."""
+    columns = columns or list(TRAIN_DTYPES)
+    if str(path).endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas().astype({c: TRAIN_DTYPES[c] for c in columns if c in TRAIN_DTYPES})
+        return
+    yield from pd.read_csv(path, usecols=columns, chunksize=chunksize,
+                           dtype={c: TRAIN_DTYPES[c] for c in columns if c in TRAIN_DTYPES})
+
+
+def scan_classes(path, chunksize=1_000_000):
+    """First pass over the label column only: the sorted set of Leak_Type values."""
+    classes = set()
+    for chunk in iter_chunks(path, chunksize, columns=[TARGET_COLUMN]):
+        classes.update(chunk[TARGET_COLUMN].dropna().astype(str).unique())
+    return sorted(classes)
+
+
+class ChunkIter(xgb.DataIter):
+    """
+    External-memory iterator over hashed feature chunks of a CSV/Parquet file.
+
+    Every `holdout_every`-th row (by global position) belongs to the
+    validation stream (`holdout=True`) and is skipped by the training one,
+    so both stream the same file without ever materialising it.
+    """
+
+    def __init__(self, path, preprocessor, label_encoder, chunksize,
+                 holdout_every=0, holdout=False, cache_prefix=None):
+        self.path = path
+        self.preprocessor = preprocessor
+        self.label_encoder = label_encoder
+        self.chunksize = chunksize
+        self.holdout_every = holdout_every
+        self.holdout = holdout
+        self.rows = 0
+        self._chunks = None
+        self._offset = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = iter_chunks(self.path, self.chunksize)
+            self._offset = 0
+            self.rows = 0
+        for chunk in self._chunks:
+            position = np.arange(self._offset, self._offset + len(chunk))
+            self._offset += len(chunk)
+            keep = chunk[TARGET_COLUMN].notna().to_numpy().copy()
+            if self.holdout_every:
+                in_holdout = position % self.holdout_every == 0
+                keep &= in_holdout if self.holdout else ~in_holdout
+            chunk = chunk[keep]
+            if not len(chunk):
+                continue
+            y = self.label_encoder.transform(chunk[TARGET_COLUMN].astype(str))
+            X = self.preprocessor.transform(chunk[FEATURE_COLUMNS])
+            self.rows += len(chunk)
+            input_data(data=X, label=y)
+            return True
+        return False
+
+    def reset(self):
+        self._chunks = None
+
+
+def train_out_of_core(path, chunksize=100_000, num_boost_round=MODEL_PARAMS["n_estimators"],
+                      holdout_every=5, cache_dir=None, early_stopping_rounds=None):
+    """
+    Train a hashed-feature pipeline on a file of any size with bounded memory.
+
+    Features come from the stateless hashed preprocessor, one chunk at a
+    time; XGBoost builds its quantile sketch and histogram pages through an
+    external-memory DMatrix cached on disk under `cache_dir`. Returns
+    (pipeline, label_encoder, report); the pipeline has the same shape as
+    the in-memory one, so mllh.py / treecompile.py load it unchanged.
+    """
+    import resource
+    import shutil
+    import tempfile
+    import time
+    from sklearn.preprocessing import LabelEncoder
+
+    t0 = time.perf_counter()
+    label_encoder = LabelEncoder().fit(scan_classes(path))
+    preprocessor = build_preprocessor("hashed")
+    # Stateless transformers: fitting on a few rows only fixes the output layout
+    preprocessor.fit(next(iter_chunks(path, 16))[FEATURE_COLUMNS])
+
+    own_cache = cache_dir is None
+    cache_dir = cache_dir or tempfile.mkdtemp(prefix="leakhawk-xgb-")
+    train_it = ChunkIter(path, preprocessor, label_encoder, chunksize, holdout_every,
+                         holdout=False, cache_prefix=f"{cache_dir}/train")
+    dtrain = xgb.ExtMemQuantileDMatrix(train_it)
+    dval, evals = None, []
+    if holdout_every:
+        val_it = ChunkIter(path, preprocessor, label_encoder, chunksize, holdout_every,
+                           holdout=True, cache_prefix=f"{cache_dir}/val")
+        dval = xgb.ExtMemQuantileDMatrix(val_it, ref=dtrain)
+        evals = [(dval, "val")]
+
+    params = {
+        "objective": "multi:softprob",
+        "num_class": len(label_encoder.classes_),
+        "tree_method": "hist",
+        "eval_metric": ["mlogloss", "merror"],
+        "learning_rate": MODEL_PARAMS["learning_rate"],
+        "max_depth": MODEL_PARAMS["max_depth"],
+        "subsample": MODEL_PARAMS["subsample"],
+        "colsample_bytree": MODEL_PARAMS["colsample_bytree"],
+    }
+    history = {}
+    booster = xgb.train(params, dtrain, num_boost_round=num_boost_round, evals=evals,
+                        evals_result=history, early_stopping_rounds=early_stopping_rounds,
+                        verbose_eval=False)
+
+    classifier = build_model(n_estimators=booster.num_boosted_rounds(), tree_method="hist")
+    classifier.load_model(bytearray(booster.save_raw(raw_format="ubj")))
+    pipeline = Pipeline([("preprocessor", preprocessor), ("classifier", classifier)])
+
+    report = {
+        "train_rows": train_it.rows,
+        "val_rows": val_it.rows if holdout_every else 0,
+        "rounds": booster.num_boosted_rounds(),
+        "val_accuracy": 1.0 - history["val"]["merror"][-1] if evals else None,
+        "seconds": time.perf_counter() - t0,
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    # Drop the DMatrix handles before removing their page files
+    dtrain = dval = evals = None
+    if own_cache:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return pipeline, label_encoder, report
+
+
+# ========= Fast training: hist + early stopping + parallel search =========
+SEARCH_SPACE = {
+    # Upper bound on rounds; early stopping trims each trial to what validation supports
+    "n_estimators": [100, 300, 600],
+    "max_depth": [2, 3, 4, 6, 8],
+    "learning_rate": [0.05, 0.1, 0.3],
+    "subsample": [0.6, 0.8, 1.0],
+    "colsample_bytree": [0.5, 0.8, 1.0],
+    "min_child_weight": [1, 5],
+}
+EARLY_STOPPING_ROUNDS = 20
+
+_trial_data = None
+
+
+def _init_trial_worker(data):
+    global _trial_data
+    _trial_data = data
+
+
+def _run_trial(trial_id, params, n_jobs):
+    """Fit one config with early stopping; measure accuracy, size and latency."""
+    import time
+    from sklearn.metrics import accuracy_score
+
+    X_tr, y_tr, X_val, y_val, X_te, y_te = _trial_data
+    model = build_model(**params, tree_method="hist", n_jobs=n_jobs,
+                        early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+    t0 = time.perf_counter()
+    model.fit(X_tr, y_tr, eval_set=[(X_val, y_val)], verbose=False)
+    fit_s = time.perf_counter() - t0
+
+    rounds = model.best_iteration + 1
+    # Keep only the rounds early stopping selected so size/latency reflect what ships
+    booster = model.get_booster()[:rounds]
+    model.set_params(n_estimators=rounds, early_stopping_rounds=None)
+    model.load_model(bytearray(booster.save_raw(raw_format="ubj")))
+
+    def per_row_ms(X, reps):
+        model.predict_proba(X)
+        t = time.perf_counter()
+        for _ in range(reps):
+            model.predict_proba(X)
+        return (time.perf_counter() - t) / reps / X.shape[0] * 1e3
+
+    return {
+        "trial": trial_id,
+        **params,
+        "rounds": rounds,
+        "n_trees": rounds * max(len(model.classes_), 1),
+        "model_kb": len(booster.save_raw(raw_format="ubj")) / 1024,
+        "val_accuracy": accuracy_score(y_val, model.predict(X_val)),
+        "test_accuracy": accuracy_score(y_te, model.predict(X_te)),
+        "latency_ms_batch1": per_row_ms(X_te[:1], 50),
+        "latency_ms_per_row_batch1k": per_row_ms(X_te[:1000], 5),
+        "fit_s": fit_s,
+        "model": model,
+    }
+
+
+def search_hyperparameters(X_train, y_train, X_test, y_test, mode="tfidf", time_budget=120.0,
+                           max_trials=40, workers=None, min_accuracy=None, seed=42, preprocessor=None,
+                           validation=None):
+    """
+    Random search over SEARCH_SPACE in parallel processes.
+
+    No new trial starts once `time_budget` seconds have passed; trials
+    already running finish and are included.
+
+    A validation split is carved out of the training rows for early stopping
+    and model selection; test rows are only reported. Returns (pipeline,
+    report): the smallest model (by serialized size) whose validation
+    accuracy meets `min_accuracy` (default: best accuracy seen), and one
+    report row per finished trial. If no trial meets `min_accuracy`, the
+    most accurate one is returned with a warning.
+
+    The returned model is the trial's own fit on the training part of the
+    split; it is not refit on train + validation, so it keeps the number of
+    rounds early stopping chose on the validation rows.
+
+    With a `preprocessor` fitted on the training part of validation_split()
+    only, X_train is that part and `validation` is (X_val, y_val), all
+    already featurized like X_test (e.g. datacache.py's search split); `mode`
+    is ignored.
+    """
+    import os
+    import random
+    import time
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    deadline = time.monotonic() + time_budget
+    if preprocessor is not None:
+        if validation is None:
+            raise ValueError("A fitted preprocessor needs the featurized validation split")
+        data = (X_train, y_train, *validation, X_test, y_test)
+    else:
+        X_tr, X_val, y_tr, y_val = validation_split(X_train, y_train, seed)
+        # Features are fitted once, on the training part only, and shared by every trial
+        preprocessor = build_preprocessor(mode).fit(X_tr)
+        data = (preprocessor.transform(X_tr), y_tr, preprocessor.transform(X_val), y_val,
+                preprocessor.transform(X_test), y_test)
+
+    cores = os.cpu_count() or 1
+    workers = workers or max(1, min(4, cores))
+    threads = max(1, cores // workers)
+
+    rng = random.Random(seed)
+    baseline = {k: MODEL_PARAMS[k] for k in ("n_estimators", "max_depth", "learning_rate",
+                                              "subsample", "colsample_bytree")}
+    configs = [dict(baseline, min_child_weight=1)]
+    seen = {tuple(sorted(configs[0].items()))}
+    while len(configs) < max_trials and len(seen) < 10 * max_trials:
+        cfg = {k: rng.choice(v) for k, v in SEARCH_SPACE.items()}
+        key = tuple(sorted(cfg.items()))
+        if key not in seen:
+            seen.add(key)
+            configs.append(cfg)
+
+    results = []
+    pending = set()
+    todo = list(enumerate(configs))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_trial_worker, initargs=(data,)) as pool:
+        while todo or pending:
+            while todo and len(pending) < workers and time.monotonic() < deadline:
+                trial_id, cfg = todo.pop(0)
+                pending.add(pool.submit(_run_trial, trial_id, cfg, threads))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            results.extend(f.result() for f in done)
+
+    if not results:
+        raise RuntimeError("No trial finished within the time budget")
+
+    report = pd.DataFrame([{k: v for k, v in r.items() if k != "model"} for r in results])
+    bar = report["val_accuracy"].max() if min_accuracy is None else min_accuracy
+    eligible = [r for r in results if r["val_accuracy"] >= bar]
+    if eligible:
+        chosen = min(eligible, key=lambda r: (r["model_kb"], -r["val_accuracy"]))
+    else:
+        chosen = max(results, key=lambda r: (r["val_accuracy"], -r["model_kb"]))
+        print(f"[⚠️] No trial reached validation accuracy {bar:.4f}; keeping the most accurate one "
+              f"(trial {chosen['trial']}, {chosen['val_accuracy']:.4f})")
+    report["selected"] = report["trial"] == chosen["trial"]
+    report = report.sort_values(["model_kb", "val_accuracy"], ascending=[True, False]).reset_index(drop=True)
+
+    pipeline = Pipeline([("preprocessor", preprocessor), ("classifier", chosen["model"])])
+    return pipeline, report
@@ -0,0 +1,273 @@
+"""
+Background scans for the Streamlit apps (mllh.py, gui.py).
+
+"Run Scan" used to clone and run both engines inside st.spinner, freezing
+the page and one server thread per user, and a browser refresh lost the
+result. Scans are now jobs in their own queue (scan_artifacts/ui_jobs.db,
+see jobstore.py) run by a JobRunner thread pool that lives in the Streamlit
+server process and is shared by every session. Each job works in a private
+temporary directory, so several scans run at once, and its stage progress
+(clone, trufflehog, gitleaks, archives, ml_*) is written to the job row for
+the page to poll.
+
+Baselined findings (baseline.py) are dropped inside the job, right after
+detection, so they are never classified, cached, stored or shown. A finished
+job's full result (engine output, findings, filter summary, baseline counts,
+predictions) is put in the scan cache (scan_cache.py) under the key the
+page computed when submitting, and its findings in the artifact store. The
+page keeps job ids in the URL, so a refresh or a later visit finds them.
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import uuid
+from pathlib import Path
+
+from baseline import DEFAULT_BASELINE, Baseline
+from finding_record import load_findings, to_findings
+from metrics import ScanTimer, dir_bytes
+from path_filter import DEFAULT_MAX_BYTES, PathFilter, gitleaks_args, scan_stats
+
+UI_JOBS_DB = Path("scan_artifacts") / "ui_jobs.db"
+UI_SCAN_WORKERS = int(os.environ.get("LEAKHAWK_UI_SCAN_WORKERS", 2))
+# A running job whose progress has not moved for this long belonged to a server that is gone
+UI_STALE_SECONDS = 30 * 60
+# What the progress bar shows for each pipeline stage, in pipeline order
+PROGRESS_STEPS = [
+    ("Engine 1 (TruffleHog)", ("trufflehog",)),
+    ("Cloning", ("clone",)),
+    ("Engine 2 (Gitleaks)", ("gitleaks", "report_parse")),
+    ("Archives", ("archives",)),
+    ("Classification", ("ml_featurize", "ml_predict")),
+]
+
+
+def clone_repo(repo_url, clone_dir="repo-temp", timer=None):
+    timer = timer or ScanTimer()
+    if os.path.exists(clone_dir):
+        shutil.rmtree(clone_dir)
+    with timer.stage("clone") as rec:
+        subprocess.run(
+            ["git", "clone", repo_url, clone_dir],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        rec["bytes"] = dir_bytes(clone_dir)
+    return clone_dir
+
+
+def run_trufflehog(repo_url, timer=None):
+    timer = timer or ScanTimer()
+    try:
+        # Using basic trufflehog command without --no-update
+        with timer.stage("trufflehog") as rec:
+            result = subprocess.run(
+                ["trufflehog", repo_url],
+                capture_output=True,
+                text=True,
+                check=False
+            )
+            rec["bytes"] = len(result.stdout or "")
+        out = (result.stdout or "").strip()
+        err = (result.stderr or "").strip()
+        return out if out else (err if err else "No output from TruffleHog.")
+    except FileNotFoundError:
+        return "[✗] LeakHawk detection engine not installed or not in PATH."
+
+
+def run_gitleaks(local_path, path_filter=None, timer=None, report_path="gitleaks-report.json"):
+    timer = timer or ScanTimer()
+    config_path = None
+    try:
+        if os.path.exists(report_path):
+            os.remove(report_path)
+
+        # Path excludes and the size cutoff are handed to Gitleaks so it never reads those blobs
+        extra_args = gitleaks_args(path_filter) if path_filter is not None else []
+        if extra_args:
+            config_path = extra_args[1]
+        with timer.stage("gitleaks"):
+            result = subprocess.run(
+                [
+                    "gitleaks", "detect",
+                    "--source", local_path,
+                    "--report-format", "json",
+                    "--report-path", report_path
+                ] + extra_args,
+                capture_output=True,
+                text=True,
+                check=False
+            )
+
+        # Prefer the file if present; parsed straight into compact Finding records
+        if os.path.exists(report_path):
+            with timer.stage("report_parse") as rec:
+                findings = load_findings(report_path)
+                rec["bytes"], rec["findings"] = os.path.getsize(report_path), len(findings)
+            return findings
+        # Fallback: try stdout
+        if result.stdout:
+            try:
+                findings = json.loads(result.stdout)
+                return to_findings(findings if isinstance(findings, list) else [findings])
+            except json.JSONDecodeError:
+                return []
+        return []
+    except FileNotFoundError:
+        return "[✗] LeakHawk analysis engine not installed or not in PATH."
+    finally:
+        if config_path and os.path.exists(config_path):
+            os.remove(config_path)
+
+
+def scan_repository(repo_url, timer, workdir, default_excludes=True, extra_excludes=(),
+                    max_file_mb=DEFAULT_MAX_BYTES // (1024 * 1024), archives=False,
+                    baseline_path=DEFAULT_BASELINE):
+    """
+    Run both engines on repo_url inside `workdir`. The result is everything
+    the page shows and what gets cached. Findings in the baseline at
+    `baseline_path` or the repo's .leakhawkbaseline are dropped here;
+    baseline_path=None keeps them all.
+    """
+    result = {"trufflehog_output": run_trufflehog(repo_url, timer), "findings": [], "error": None,
+              "filter_summary": None, "baseline": None}
+    try:
+        local_path = clone_repo(repo_url, os.path.join(workdir, "repo"), timer)
+    except subprocess.CalledProcessError:
+        result["error"] = "Failed to clone repository. Check URL or access."
+        return result
+    path_filter = PathFilter.for_repo(local_path, list(extra_excludes), use_defaults=default_excludes,
+                                      max_bytes=int(max_file_mb) * 1024 * 1024)
+    try:
+        result["filter_summary"] = scan_stats(local_path, path_filter).summary()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    findings = run_gitleaks(local_path, path_filter, timer, os.path.join(workdir, "gitleaks-report.json"))
+    if isinstance(findings, str):
+        result["error"] = findings
+        return result
+    if archives:
+        from archive_scan import scan_history_archives
+        with timer.stage("archives") as rec:
+            archive_findings = scan_history_archives(local_path, path_filter)
+            rec["findings"] = len(archive_findings)
+        findings += to_findings(archive_findings)
+    if baseline_path is not None:
+        baseline = Baseline.for_repo(local_path, baseline_path)
+        suppressed = 0
+        if len(baseline):
+            with timer.stage("baseline") as rec:
+                findings, suppressed = baseline.split(findings)
+                rec["findings"] = suppressed
+        result["baseline"] = {"fingerprints": len(baseline), "suppressed": suppressed}
+    result["findings"] = findings
+    return result
+
+
+def predict(findings, active, threshold=None, timer=None):
+    """
+    (labels, confidences, tiers) for findings with one registry.ActiveModel
+    snapshot. With a cascade, `threshold` is its escalation threshold.
+    """
+    from classifier import findings_to_frame
+
+    timer = timer or ScanTimer()
+    with timer.stage("ml_featurize") as rec:
+        X_pred = findings_to_frame(findings)
+        rec["findings"] = len(X_pred)
+    tiers = None
+    with timer.stage("ml_predict") as rec:
+        if active.cascade is not None:
+            # Rule lookup / linear tier first, full pipeline only for ambiguous findings
+            proba, tiers = active.cascade.predict_proba(X_pred, threshold=threshold, return_tiers=True)
+            preds = proba.argmax(axis=1)
+            tiers = [str(t) for t in tiers]
+        else:
+            preds = active.model.predict(X_pred)
+            proba = active.model.predict_proba(X_pred) if hasattr(active.model, "predict_proba") else None
+        rec["findings"] = len(preds)
+    try:
+        labels = (active.label_encoder.inverse_transform(preds)
+                  if hasattr(active.label_encoder, "inverse_transform") else preds)
+    except Exception:
+        labels = preds
+    confidences = ([float(row.max()) if len(row) else 0.0 for row in proba] if proba is not None
+                   else [0.5] * len(labels))
+    return [str(label) for label in labels], confidences, tiers or ["full"] * len(labels)
+
+
+def make_scanner(cache, registry=None):
+    """
+    JobRunner scanner for page-submitted jobs. Job options: cache_key, head,
+    classify, cascade_threshold, plus scan_repository's keyword arguments.
+    """
+    def scan(repo_url, timer, cache_key=None, head=None, classify=False, cascade_threshold=None, **options):
+        workdir = tempfile.mkdtemp(prefix="leakhawk-ui-")
+        try:
+            result = scan_repository(repo_url, timer, workdir, **options)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        active = registry.get() if registry is not None and classify else None
+        if active is not None and result["findings"]:
+            labels, confidences, tiers = predict(result["findings"], active, cascade_threshold, timer)
+            result["ml"] = {"model_version": active.version, "cascade_threshold": cascade_threshold,
+                            "labels": labels, "confidences": confidences, "tiers": tiers}
+        result["timing_summary"] = timer.summary()
+        if result["error"] is not None:
+            raise RuntimeError(result["error"])
+        cache.put(cache_key or uuid.uuid4().hex, repo_url, head or "", result)
+        return result["findings"], result["trufflehog_output"]
+    return scan
+
+
+def start(cache, artifacts, registry=None, workers=UI_SCAN_WORKERS, db=UI_JOBS_DB):
+    """(JobStore, started JobRunner) for the apps; call once per server process (st.cache_resource)."""
+    from jobstore import JobRunner, JobStore
+
+    store = JobStore(db)
+    # Both apps (and restarts of them) share the queue; jobs of a server that died are picked up again
+    store.requeue_stale(UI_STALE_SECONDS, worker_prefix="ui-")
+    runner = JobRunner(store, make_scanner(cache, registry), artifacts, workers,
+                       name=f"ui-{os.uname().nodename}-{os.getpid()}").start()
+    return store, runner
+
+
+def load_result(job, cache, artifacts):
+    """A finished job's result from the scan cache, or rebuilt from the artifact store if it was evicted."""
+    from artifact_store import FINDING_COLUMNS
+
+    key = (job["options"] or {}).get("cache_key")
+    result = cache.get(key) if key else None
+    if result is not None:
+        result["findings"] = to_findings(result["findings"])
+        return result
+    if not job["scan_id"]:
+        return {"trufflehog_output": "", "findings": [], "error": None, "filter_summary": None,
+                "baseline": None, "timing_summary": ""}
+    return {"trufflehog_output": artifacts.read_engine_output(job["scan_id"]),
+            "findings": to_findings(artifacts.iter_findings(job["scan_id"], columns=FINDING_COLUMNS)),
+            "error": None, "filter_summary": None, "baseline": None, "timing_summary": ""}
+
+
+def progress_of(job):
+    """(fraction done, label of the current step) for a job's progress bar."""
+    if job["status"] == "done":
+        return 1.0, "Done"
+    if job["status"] == "failed":
+        return 1.0, "Failed"
+    if job["status"] == "queued":
+        return 0.0, "Queued"
+    progress = job["progress"] or {"stage": None, "done": []}
+    options = job["options"] or {}
+    steps = [(label, stages) for label, stages in PROGRESS_STEPS
+             if (label != "Archives" or options.get("archives"))
+             and (label != "Classification" or options.get("classify"))]
+    # report_parse is skipped when Gitleaks writes no report file
+    finished = [all(s in progress["done"] for s in stages if s != "report_parse") for _, stages in steps]
+    current = next((label for label, stages in steps if progress["stage"] in stages), None)
+    if current is None:
+        current = next((label for (label, _), done in zip(steps, finished) if not done), "Finishing")
+    return sum(finished) / len(steps), current